@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# Versioned JSON API; a breaking change gets a new blueprint under /api/v2
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+from . import routes
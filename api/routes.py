@@ -0,0 +1,223 @@
+import hashlib
+import orjson
+from flask import request, url_for, Response
+from werkzeug.exceptions import HTTPException, NotFound
+from . import api_bp
+from .fields import Resource, BadParameter, column, derived, parse_ids
+from models import db, Post, Review, Game, GameRatingSummary, GameSentiment
+from utils import post_search
+from utils.db_routing import read_only
+from utils.page_cache import cached_fragment
+from utils.pagination import keyset_page, clamp_per_page
+
+# Serialized bodies are cached under the same versions as the HTML pages,
+# so a new post or review invalidates them
+BODY_TTL = 600
+MAX_AGE = 60
+
+POSTS = Resource("post", "id", {
+    "id": column(Post.id),
+    "title": column(Post.title),
+    "subtitle": column(Post.subtitle),
+    "author": column(Post.author),
+    "date_posted": column(Post.date_posted),
+    "excerpt": column(Post.excerpt),
+    "reading_minutes": column(Post.reading_minutes),
+    "word_count": column(Post.word_count),
+    "content": column(Post.content),
+    "content_html": column(Post.content_html),
+}, default=("title", "subtitle", "author", "date_posted", "excerpt", "reading_minutes"))
+
+REVIEWS = Resource("review", "id", {
+    "id": column(Review.id),
+    "game_id": column(Review.game_id),
+    "user_name": column(Review.user_name),
+    "rating": column(Review.rating),
+    "comment": column(Review.comment),
+    "date_posted": column(Review.date_posted),
+}, default=("game_id", "user_name", "rating", "comment", "date_posted"))
+
+
+def _mean(total, count):
+    return round(total / count, 2) if count else None
+
+
+def _histogram(*buckets):
+    return [b or 0 for b in buckets] if buckets[0] is not None else None
+
+
+GAMES = Resource("game", "appid", {
+    "appid": column(Game.appid),
+    "name": column(Game.name),
+    "description": column(Game.description),
+    "release_date": column(Game.release_date),
+    "image_url": column(Game.image_url),
+    "price": column(Game.price),
+    "review_count": derived(lambda n: n or 0, GameRatingSummary.review_count),
+    "mean_rating": derived(_mean, GameRatingSummary.rating_sum, GameRatingSummary.review_count),
+    "rating_histogram": derived(_histogram, *(getattr(GameRatingSummary, f"rating_{i}") for i in range(1, 11))),
+    "sentiment": derived(_mean, GameSentiment.sentiment_sum, GameSentiment.scored_count),
+}, default=("name", "release_date", "image_url", "price", "review_count", "mean_rating", "sentiment"))
+
+
+# ---- Responses ---- #
+def json_response(body, status=200, max_age=MAX_AGE):
+    """
+    Serialized JSON with a content-hash ETag; answers 304 when the client's
+    If-None-Match already matches.
+    """
+    response = Response(body, status=status, mimetype="application/json")
+    if status != 200:
+        return response
+    response.set_etag(hashlib.sha1(body).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def cached_json(scopes, build):
+    """
+    json_response for build()'s data, reusing the serialized body until one
+    of scopes changes.
+    """
+    body = cached_fragment(f"api:{request.full_path}", scopes, BODY_TTL, lambda: orjson.dumps(build()))
+    return json_response(body)
+
+
+def error(status, message):
+    return json_response(orjson.dumps({"error": message}), status)
+
+
+@api_bp.errorhandler(BadParameter)
+def bad_parameter(e):
+    return error(400, str(e))
+
+
+@api_bp.errorhandler(HTTPException)
+def http_error(e):
+    return error(e.code, e.description if e.code != 404 else "Not found")
+
+
+def by_ids(resource, key_col, ids, query):
+    """
+    Rows for ids in one IN query, in the order asked for, plus the ids that
+    don't exist.
+    """
+    names = resource.parse_fields(request.args.get("fields"))
+    columns, serialize = resource.select(names)
+    found = {item[resource.key]: item for item in serialize(query(columns).filter(key_col.in_(ids)).all())}
+    return {"data": [found[i] for i in ids if i in found], "missing": [i for i in ids if i not in found]}
+
+
+def one(resource, key_col, key, query):
+    result = by_ids(resource, key_col, [key], query)
+    if not result["data"]:
+        raise NotFound()
+    return {"data": result["data"][0]}
+
+
+def page(resource, query, date_col, id_col):
+    """
+    A newest-first keyset page of query; ?cursor= comes from the previous
+    page's next_cursor.
+    """
+    names = resource.parse_fields(request.args.get("fields"))
+    columns, serialize = resource.select(names, extra=(date_col, id_col))
+    rows, next_cursor = keyset_page(
+        query(columns),
+        date_col,
+        id_col,
+        request.args.get("cursor"),
+        clamp_per_page(request.args.get("per_page", type=int))
+    )
+    return {"data": serialize(rows), "next_cursor": next_cursor}
+
+
+# ---- Queries ---- #
+def post_query(columns):
+    return db.session.query(*columns).select_from(Post)
+
+
+def review_query(columns):
+    return db.session.query(*columns).select_from(Review)
+
+
+def game_query(columns):
+    # Summaries and sentiment are optional; joining them unconditionally is
+    # cheap (both keyed by game id) and keeps this one statement
+    return db.session.query(*columns).select_from(Game) \
+        .outerjoin(GameRatingSummary, GameRatingSummary.game_id == Game.appid) \
+        .outerjoin(GameSentiment, GameSentiment.game_id == Game.appid)
+
+
+# ---- Routes ---- #
+@api_bp.route("/posts")
+@read_only
+def posts():
+    if request.args.get("ids"):
+        ids = parse_ids(request.args["ids"])
+        return cached_json(["posts"], lambda: by_ids(POSTS, Post.id, ids, post_query))
+    return cached_json(["posts"], lambda: page(POSTS, post_query, Post.date_posted, Post.id))
+
+
+@api_bp.route("/posts/<int:post_id>")
+@read_only
+def post(post_id):
+    return cached_json([f"post:{post_id}"], lambda: one(POSTS, Post.id, post_id, post_query))
+
+
+@api_bp.route("/reviews")
+@read_only
+def reviews():
+    ids = parse_ids(request.args.get("ids", ""))
+    return cached_json(["reviews"], lambda: by_ids(REVIEWS, Review.id, ids, review_query))
+
+
+@api_bp.route("/games/<int:appid>/reviews")
+@read_only
+def game_reviews(appid):
+    return cached_json([f"reviews:{appid}"], lambda: page(
+        REVIEWS,
+        lambda columns: review_query(columns).filter(Review.game_id == appid),
+        Review.date_posted,
+        Review.id
+    ))
+
+
+# Catalog rows and insights are written in bulk outside the ORM, so game
+# bodies aren't cached; the ETag still spares clients the download
+@api_bp.route("/games")
+@read_only
+def games():
+    ids = parse_ids(request.args.get("ids", ""))
+    return json_response(orjson.dumps(by_ids(GAMES, Game.appid, ids, game_query)))
+
+
+@api_bp.route("/games/<int:appid>")
+@read_only
+def game(appid):
+    return json_response(orjson.dumps(one(GAMES, Game.appid, appid, game_query)))
+
+
+# Ranked by the database's full-text index; an edit changes rankings and
+# highlights, so bodies aren't cached
+@api_bp.route("/search/posts")
+@read_only
+def search_posts():
+    query, page, per_page, results, has_more = post_search.search_page(db.session, request.args)
+    return json_response(orjson.dumps({
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "has_more": has_more,
+        "results": [{
+            "id": r["id"],
+            "title": r["title"],
+            "subtitle": r["subtitle"],
+            "author": r["author"],
+            "date_posted": r["date_posted"],
+            "rank": r["rank"],
+            "highlight": str(r["highlight"]),
+            "url": url_for("blog.post", post_id=r["id"])
+        } for r in results]
+    }))
@@ -0,0 +1,6 @@
+from flask import Blueprint
+
+# cli_group=None keeps the post commands at the top level (flask render-posts)
+blog_bp = Blueprint('blog', __name__, cli_group=None)
+
+from . import routes, commands
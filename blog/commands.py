@@ -0,0 +1,11 @@
+import click
+from . import blog_bp
+from models import rerender_posts
+
+
+@blog_bp.cli.command("render-posts")
+@click.option("--force", is_flag=True, help="Re-render every post, not just those whose content or pipeline changed.")
+def render_posts_command(force):
+    """Re-render stored post HTML, excerpts and reading times."""
+    count = rerender_posts(force=force)
+    click.echo(f"Rendered {count} posts")
@@ -0,0 +1,239 @@
+import logging
+import os
+import re
+from datetime import datetime
+from flask import current_app, render_template, request, redirect, url_for, flash, jsonify
+from markupsafe import Markup
+from sqlalchemy.orm import load_only
+from . import blog_bp
+from models import db, Post, ContactMessage
+from extensions import writes, submission_limiter, images
+from games.catalog import featured_games
+from games.leaderboard import leaderboard_html
+from utils import post_search, rawg_api, giantbomb_api
+from utils.db_routing import read_only
+from utils.fanout import fetch_all
+from utils.page_cache import cached_page, cached_fragment, limit_page_ttl
+from utils.pagination import keyset_page, clamp_per_page
+from utils.steam_api import FEATURED_TTL
+
+logger = logging.getLogger("codecritical.blog")
+
+# Lifetimes of rendered pages. The home page also carries the featured
+# carousel and the leaderboard, so it can't outlive either for long.
+HOME_PAGE_TTL = 60
+POST_PAGE_TTL = 3600
+# A home page rendered without some provider's data is only kept until
+# the provider has had a moment to recover
+DEGRADED_PAGE_TTL = 5
+
+# Total time the home page waits on upstream providers before rendering
+# with whatever has arrived
+HOME_FETCH_DEADLINE = float(os.getenv("HOME_FETCH_DEADLINE", 1.5))
+
+# Contact form fields and their column limits
+CONTACT_FIELDS = {"name": 50, "email": 120, "subject": 150, "message": 5000}
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+def contact_values(form):
+    """
+    Validate a contact form submission. Returns (values, errors).
+    """
+    values, errors = {}, []
+    for field, limit in CONTACT_FIELDS.items():
+        value = (form.get(field) or "").strip()
+        if not value:
+            errors.append(f"Please fill in your {field}.")
+        elif len(value) > limit:
+            errors.append(f"Your {field} can be at most {limit} characters.")
+        values[field] = value
+    if values["email"] and not EMAIL_RE.match(values["email"]):
+        errors.append("Please enter a valid email address.")
+    values["date_sent"] = datetime.utcnow()
+    return values, errors
+
+# ---- Post Feed ---- #
+# Columns rendered by the post list; content is left unloaded
+FEED_COLUMNS = (Post.id, Post.title, Post.subtitle, Post.author, Post.date_posted,
+                Post.excerpt, Post.reading_minutes)
+
+def post_feed_page(cursor=None, per_page=None):
+    """
+    One page of the newest posts after cursor, as (posts, next_cursor).
+    """
+    query = Post.query.options(load_only(*FEED_COLUMNS))
+    return keyset_page(query, Post.date_posted, Post.id, cursor, clamp_per_page(per_page))
+
+# ---- Routes ---- #
+@blog_bp.route('/')
+@read_only
+def home():
+    return cached_page(["posts"], HOME_PAGE_TTL, render_home)
+
+def render_home():
+    posts, next_cursor = post_feed_page(
+        request.args.get("cursor"),
+        request.args.get("per_page", type=int)
+    )
+
+    calls = {}
+    if current_app.config.get('RAWG_API_KEY'):
+        calls["rawg"] = rawg_api.fetch_upcoming_games
+    if current_app.config.get('GIANTBOMB_API_KEY'):
+        calls["giantbomb"] = giantbomb_api.fetch_upcoming_games
+    results, failed = fetch_all(calls, HOME_FETCH_DEADLINE)
+    for name, error in failed.items():
+        logger.warning("%s API error: %s", name, error)
+    if failed:
+        limit_page_ttl(DEGRADED_PAGE_TTL)
+
+    # Stored by the refresh_featured job; pages never ask Steam for it
+    carousel = cached_fragment("carousel", ["featured"], FEATURED_TTL, lambda: render_carousel(featured_games()))
+
+    return render_template(
+        'index.html',
+        posts=posts,
+        carousel=Markup(carousel),
+        leaderboard=Markup(leaderboard_html()),
+        upcoming=upcoming_releases(results),
+        upcoming_partial=bool(failed.keys() & {"rawg", "giantbomb"}),
+        next_cursor=next_cursor
+    )
+
+def upcoming_releases(results):
+    """
+    Merge RAWG and GiantBomb upcoming games into one list for the template.
+    """
+    upcoming = []
+    for game in results.get("rawg", []):
+        upcoming.append({"name": game.get("name"), "release_date": game.get("released")})
+    for game in results.get("giantbomb", []):
+        upcoming.append({"name": game.get("name"), "release_date": game.get("original_release_date")})
+    return sorted(upcoming, key=lambda g: g["release_date"] or "")
+
+def render_carousel(featured):
+    # Copy the cached entries so per-request tweaks don't leak into the cache
+    games = [dict(g) for g in featured]
+
+    for g in games:
+        # Prefer stable Steam CDN header if available
+        if g.get("image_url") and "shared.akamai.steamstatic.com" in g["image_url"]:
+            appid = g["appid"]
+            g["image_url"] = f"https://cdn.akamai.steamstatic.com/steam/apps/{appid}/header.jpg"
+
+        # Served through the image proxy; known-missing art goes straight
+        # to the placeholder
+        g["game_image_url"] = images.url_for(g.get("image_url"), "carousel")
+
+    return render_template('_carousel.html', games=games)
+
+
+@blog_bp.route('/feed.json')
+@read_only
+def post_feed():
+    posts, next_cursor = post_feed_page(
+        request.args.get("cursor"),
+        request.args.get("per_page", type=int)
+    )
+    return jsonify({
+        "posts": [{
+            "id": p.id,
+            "title": p.title,
+            "subtitle": p.subtitle,
+            "author": p.author,
+            "date_posted": p.date_posted.isoformat() if p.date_posted else None,
+            "excerpt": p.excerpt,
+            "reading_minutes": p.reading_minutes,
+            "url": url_for('blog.post', post_id=p.id)
+        } for p in posts],
+        "next_cursor": next_cursor
+    })
+
+
+@blog_bp.route('/about')
+def about():
+    return render_template('about.html')
+
+@blog_bp.route('/contact', methods=['GET', 'POST'])
+def contact():
+    if request.method == 'POST':
+        if not submission_limiter.allow(request.remote_addr):
+            flash("Too many messages from your address. Please try again in a minute.", "warning")
+            return render_template('contact.html'), 429
+
+        values, errors = contact_values(request.form)
+        if errors:
+            for error in errors:
+                flash(error, "danger")
+            return render_template('contact.html'), 400
+
+        # Committed in the next batch; the visitor doesn't wait for it
+        writes.submit(ContactMessage, values)
+        flash("Message saved!", "success")
+        return redirect(url_for('blog.contact'))
+
+    return render_template('contact.html')
+
+@blog_bp.route('/sample-post')
+def sample_post():
+    post = Post.query.first()
+    if not post:
+        post = Post(
+            title="Sample Post",
+            subtitle="Welcome to CodeCritical!",
+            author="Admin",
+            content="This is your first sample post. Add more posts using the 'New Post' page!"
+        )
+        db.session.add(post)
+        db.session.commit()
+    return render_template('post.html', post=post)
+
+@blog_bp.route('/post/<int:post_id>')
+@read_only
+def post(post_id):
+    return cached_page(
+        [f"post:{post_id}"],
+        POST_PAGE_TTL,
+        lambda: render_template('post.html', post=Post.query.get_or_404(post_id))
+    )
+
+@blog_bp.route('/new', methods=['GET', 'POST'])
+def new_post():
+    if request.method == 'POST':
+        title = request.form['title']
+        subtitle = request.form['subtitle']
+        author = request.form['author']
+        content = request.form['content']
+        post = Post(title=title, subtitle=subtitle, author=author, content=content)
+        db.session.add(post)
+        db.session.commit()
+        flash("New post created!", "success")
+        return redirect(url_for('blog.home'))
+    return render_template('new_post.html')
+
+@blog_bp.route('/edit/<int:post_id>', methods=['GET', 'POST'])
+def edit_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    if request.method == 'POST':
+        post.title = request.form['title']
+        post.subtitle = request.form['subtitle']
+        post.content = request.form['content']
+        db.session.commit()
+        flash("Post updated!", "success")
+        return redirect(url_for('blog.post', post_id=post.id))
+    return render_template('edit_post.html', post=post)
+
+@blog_bp.route('/delete/<int:post_id>', methods=['POST'])
+def delete_post(post_id):
+    post = Post.query.get_or_404(post_id)
+    db.session.delete(post)
+    db.session.commit()
+    flash("Post deleted!", "success")
+    return redirect(url_for('blog.home'))
+
+
+@blog_bp.route('/search')
+@read_only
+def search():
+    query, page, per_page, results, has_more = post_search.search_page(db.session, request.args)
+    return render_template('search.html', query=query, page=page, results=results, has_more=has_more)
@@ -0,0 +1,98 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def database_url(name="DATABASE_URL", default="sqlite:///app.db"):
+    """
+    Database URL from the environment. Render and Heroku hand out
+    postgres:// URLs, which SQLAlchemy 2 only accepts as postgresql://.
+    """
+    url = os.getenv(name, default)
+    if url and url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url):
+    """
+    Engine/pool settings for url. SQLite gets a lock timeout instead of
+    pool sizing; its pragmas are applied per connection in utils/db_routing.
+    """
+    if url.startswith("sqlite"):
+        return {"connect_args": {"timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", 15))}}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False"),
+    }
+
+
+class Config:
+    SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "supersecretkey123")
+    RAWG_API_KEY = os.getenv("RAWG_API_KEY")
+    GIANTBOMB_API_KEY = os.getenv("GIANTBOMB_API_KEY")
+
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Optional read replica; read-only routes are sent here
+    SQLALCHEMY_BINDS = {}
+    if os.getenv("DATABASE_REPLICA_URL"):
+        _replica = database_url("DATABASE_REPLICA_URL")
+        SQLALCHEMY_BINDS["replica"] = {"url": _replica, **engine_options(_replica)}
+
+    # Requests carrying "X-Profile: <token>" return cProfile output; unset
+    # disables profiling. Slow-query logging is tuned with SLOW_QUERY_MS.
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+    # /metrics and /cache/stats answer clients on these addresses/networks,
+    # or sending "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    METRICS_ALLOW_IPS = os.getenv("METRICS_ALLOW_IPS", "127.0.0.1,::1")
+
+    # Write-behind for contact messages and reviews (see utils/write_behind)
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 100))
+    WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", 1.0))
+    WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", 10000))
+    WRITE_BEHIND_SPOOL = os.getenv("WRITE_BEHIND_SPOOL")
+    SUBMISSION_RATE = int(os.getenv("SUBMISSION_RATE", 5))
+    SUBMISSION_PERIOD = int(os.getenv("SUBMISSION_PERIOD", 60))
+    # Number of proxies in front of the app (Render: 1), so client IPs come
+    # from X-Forwarded-For
+    PROXY_COUNT = int(os.getenv("PROXY_COUNT", 0))
+
+    # Image proxy cache (see utils/image_cache); defaults to instance/image_cache
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR")
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", 256)) * 1024 * 1024
+    IMAGE_MISSING_TTL = int(os.getenv("IMAGE_MISSING_TTL", 86400))
+
+    # Upstream request budget (utils/rate_limit.UpstreamBudget): requests per
+    # host as "requests/seconds" (unset keeps the defaults in UPSTREAM_HOSTS)
+    # and daily quotas per API key. Buckets are shared through Redis when
+    # UPSTREAM_BUDGET_REDIS_URL (default REDIS_URL) is set; otherwise each of
+    # the WEB_CONCURRENCY workers keeps its share. Page loads wait at most
+    # UPSTREAM_MAX_WAIT seconds for a token before falling back to the cache.
+    STEAM_RATE_LIMIT = os.getenv("STEAM_RATE_LIMIT")
+    RAWG_RATE_LIMIT = os.getenv("RAWG_RATE_LIMIT")
+    GIANTBOMB_RATE_LIMIT = os.getenv("GIANTBOMB_RATE_LIMIT")
+    RAWG_DAILY_QUOTA = int(os.getenv("RAWG_DAILY_QUOTA", 650))
+    GIANTBOMB_DAILY_QUOTA = int(os.getenv("GIANTBOMB_DAILY_QUOTA", 4800))
+    UPSTREAM_BUDGET_REDIS_URL = os.getenv("UPSTREAM_BUDGET_REDIS_URL", os.getenv("REDIS_URL"))
+    UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", 1.0))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+    # Point GAME_INFO_FIXTURES at fixtures/providers to work offline
+    GAME_INFO_FIXTURES = os.getenv("GAME_INFO_FIXTURES")
+
+    # Built CSS/JS bundles (see utils/assets); defaults to static/dist.
+    # Auto-build rebuilds at startup when the sources have changed.
+    ASSETS_DIR = os.getenv("ASSETS_DIR")
+    ASSETS_AUTO_BUILD = os.getenv("ASSETS_AUTO_BUILD", "1") not in ("0", "false", "False")
+
+    # Ratings kept between `flask update-review-insights` runs; defaults to
+    # instance/review_ratings.npz
+    REVIEW_RATINGS_CACHE = os.getenv("REVIEW_RATINGS_CACHE")
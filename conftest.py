@@ -0,0 +1,52 @@
+import os
+import pytest
+
+# Keep the tests off the developer's database and the real upstream APIs.
+# load_dotenv() never overrides variables that are already set.
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ["RAWG_API_KEY"] = ""
+os.environ["GIANTBOMB_API_KEY"] = ""
+
+from app import create_app
+from config import Config
+from extensions import db, writes
+from utils.cache import cache
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    RAWG_API_KEY = ""
+    GIANTBOMB_API_KEY = ""
+    # Submissions stay queued until a test calls writes.flush()
+    WRITE_BEHIND_INTERVAL = 0
+    # Pages link the unbuilt bundles unless a test builds them
+    ASSETS_AUTO_BUILD = False
+    # Upstream budgets stay in-process
+    UPSTREAM_BUDGET_REDIS_URL = None
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestConfig, "WRITE_BEHIND_SPOOL", str(tmp_path / "write_behind.ndjson"))
+    monkeypatch.setattr(TestConfig, "IMAGE_CACHE_DIR", str(tmp_path / "image_cache"))
+    monkeypatch.setattr(TestConfig, "REVIEW_RATINGS_CACHE", str(tmp_path / "review_ratings.npz"))
+    monkeypatch.setattr(TestConfig, "ASSETS_DIR", str(tmp_path / "assets"))
+    app = create_app(TestConfig)
+    cache.clear()
+    with app.app_context():
+        db.create_all()
+    yield app
+    writes.flush()
+    with app.app_context():
+        db.drop_all()
+    cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
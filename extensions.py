@@ -0,0 +1,34 @@
+"""
+Extension objects shared by the app factory, models and blueprints. They
+are bound to an app in create_app().
+"""
+from flask_sqlalchemy import SQLAlchemy
+from utils.assets import Assets
+from utils.db_routing import RoutingSession
+from utils.game_info import Providers
+from utils.image_cache import ImageCache
+from utils.rate_limit import RateLimiter, UpstreamBudget
+from utils.write_behind import WriteBehind
+
+# DATABASE_URL selects the database (SQLite locally, Postgres in production);
+# DATABASE_REPLICA_URL adds a read replica for read-only routes
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Contact messages and reviews are committed in batches off the request path
+writes = WriteBehind(db)
+
+# Per-client cap on those submissions (SUBMISSION_RATE per SUBMISSION_PERIOD)
+submission_limiter = RateLimiter()
+
+# Resized, long-cached copies of Steam art served from /img/<variant>
+images = ImageCache()
+
+# Fingerprinted, precompressed CSS/JS bundles served from /assets/
+assets = Assets()
+
+# Request budgets and daily quotas for Steam, RAWG and GiantBomb, enforced
+# by utils/http_client for every upstream call
+upstream_budget = UpstreamBudget()
+
+# Steam/RAWG/GiantBomb metadata merged into one record per game
+game_info = Providers()
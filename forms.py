@@ -1,9 +1,10 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, IntegerField, TextAreaField, SubmitField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, Length, NumberRange
+from models import RATING_MIN, RATING_MAX
 
 class ReviewForm(FlaskForm):
-    user_name = StringField('Your Name', validators=[DataRequired()])
-    rating = IntegerField('Rating (1-10)', validators=[DataRequired(), NumberRange(min=1, max=10)])
-    comment = TextAreaField('Comment')
+    user_name = StringField('Your Name', validators=[DataRequired(), Length(max=100)])
+    rating = IntegerField('Rating (1-10)', validators=[DataRequired(), NumberRange(min=RATING_MIN, max=RATING_MAX)])
+    comment = TextAreaField('Comment', validators=[Length(max=2000)])
     submit = SubmitField('Submit Review')
\ No newline at end of file
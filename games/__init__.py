@@ -1,5 +1,6 @@
 from flask import Blueprint
 
-games_bp = Blueprint('games', __name__, template_folder='templates/games')
+# cli_group=None keeps the catalog commands at the top level (flask refresh-games)
+games_bp = Blueprint('games', __name__, template_folder='templates/games', cli_group=None)
 
-from . import routes
\ No newline at end of file
+from . import routes, commands
@@ -0,0 +1,198 @@
+"""
+Local copy of game details so search and game pages don't depend on Steam.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
+from models import db, Game, FeaturedGame
+from utils.page_cache import bump
+from utils.search_index import SearchIndex
+from utils.steam_api import get_steam_game_details
+
+CATALOG_MAX_AGE = timedelta(days=1)
+GAME_INDEX_REFRESH_INTERVAL = int(os.getenv("GAME_INDEX_REFRESH_INTERVAL", 300))
+
+logger = logging.getLogger("codecritical.catalog")
+
+game_index = SearchIndex()
+_index_lock = threading.Lock()
+
+def upsert_games(records):
+    """
+    Insert or update Game rows in bulk. records are dicts keyed by column
+    name and must include appid.
+    """
+    records = {r["appid"]: dict(r) for r in records if r.get("appid") and r.get("name")}
+    if not records:
+        return 0
+    now = datetime.utcnow()
+    for r in records.values():
+        r["updated_at"] = now
+
+    # Callers pass different column sets; one statement per set
+    groups = {}
+    for r in records.values():
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+
+    table = Game.__table__
+    dialect = db.engine.dialect.name
+    for columns, rows in groups.items():
+        if dialect in ("sqlite", "postgresql"):
+            # One atomic statement, so there's no existence check that a
+            # lagging read replica could answer wrongly
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(index_elements=["appid"],
+                                              set_={c: stmt.excluded[c] for c in columns if c != "appid"})
+            db.session.execute(stmt, rows)
+            continue
+        # Checked on the primary, where the rows are about to be written
+        existing = set(db.session.execute(select(table.c.appid).where(table.c.appid.in_([r["appid"] for r in rows])),
+                                          bind_arguments={"bind": db.engine}).scalars())
+        new = [r for r in rows if r["appid"] not in existing]
+        changed = [r for r in rows if r["appid"] in existing]
+        if new:
+            db.session.execute(insert(Game), new)
+        if changed:
+            db.session.execute(update(Game), changed)
+    db.session.commit()
+    return len(records)
+
+def import_game_details(appid, details):
+    """
+    Store the result of get_steam_game_details in the catalog.
+    """
+    upsert_games([{
+        "appid": appid,
+        "name": details.get("name"),
+        "description": details.get("description"),
+        "release_date": details.get("original_release_date"),
+        "image_url": details.get("image_url")
+    }])
+
+def store_featured(games):
+    """
+    Replace the stored featured list with games, as returned by
+    get_featured_games, keeping Steam's order. An empty list keeps the
+    previous one.
+    """
+    rows = [{"position": i, "appid": g["appid"], "name": g["name"], "image_url": g.get("image_url"),
+             "discounted": bool(g.get("discounted"))}
+            for i, g in enumerate(g for g in games if g.get("appid") and g.get("name"))]
+    if not rows:
+        return 0
+    db.session.query(FeaturedGame).delete()
+    db.session.execute(insert(FeaturedGame), rows)
+    db.session.commit()
+    bump("featured")
+    return len(rows)
+
+def featured_games():
+    """
+    The stored featured list, in get_featured_games' shape.
+    """
+    return [{"appid": f.appid, "name": f.name, "image_url": f.image_url, "discounted": f.discounted}
+            for f in FeaturedGame.query.order_by(FeaturedGame.position)]
+
+def import_catalog_dump(path, batch_size=1000):
+    """
+    Bulk import a catalog dump: Steam's GetAppList JSON
+    ({"applist": {"apps": [...]}}), a plain JSON list, or NDJSON.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            apps = (json.loads(line) for line in f if line.strip())
+        else:
+            data = json.load(f)
+            apps = data.get("applist", {}).get("apps", []) if isinstance(data, dict) else data
+
+        total = 0
+        batch = []
+        for app_data in apps:
+            batch.append({"appid": app_data.get("appid"), "name": (app_data.get("name") or "").strip()})
+            if len(batch) >= batch_size:
+                total += upsert_games(batch)
+                batch = []
+        total += upsert_games(batch)
+    return total
+
+def refresh_game_index():
+    """
+    Load catalog rows changed since the last refresh into game_index. The
+    first call builds a complete index, streamed in chunks, and only then
+    swaps it in.
+    """
+    with _index_lock:
+        target = game_index if game_index.loaded_until is not None else SearchIndex()
+        query = db.session.query(Game.appid, Game.name, Game.price, Game.updated_at).order_by(Game.updated_at)
+        if target.loaded_until is not None:
+            query = query.filter(Game.updated_at >= target.loaded_until)
+        for row in query.yield_per(1000):
+            target.add(row.appid, row.name, {
+                "name": row.name,
+                "appid": row.appid,
+                "image": f"https://cdn.akamai.steamstatic.com/steam/apps/{row.appid}/capsule_sm_120.jpg",
+                "price": row.price or "Free / Unknown"
+            })
+            target.loaded_until = row.updated_at
+        target.last_refresh = time.monotonic()
+        if target is not game_index:
+            game_index.replace(target)
+
+_refresher_pid = None
+
+def start_game_index_refresher(app, interval=GAME_INDEX_REFRESH_INTERVAL):
+    """
+    Keep game_index current from a background thread, refreshing every
+    interval seconds, so search requests only ever read it. Threads don't
+    survive a fork: call this in every worker process (gunicorn.conf.py
+    does, in post_fork); calling it again in the same process does nothing.
+    """
+    global _refresher_pid
+    if _refresher_pid == os.getpid():
+        return
+    _refresher_pid = os.getpid()
+
+    def run():
+        while True:
+            with app.app_context():
+                try:
+                    refresh_game_index()
+                except Exception as e:
+                    logger.exception("Game index refresh error: %s", e)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="game-index-refresh", daemon=True).start()
+
+def load_game(appid):
+    """
+    Game details from the local catalog, falling back to Steam when the row
+    is missing or older than CATALOG_MAX_AGE. A stale row is still served if
+    Steam is unreachable. Fetched details are stored by a job outside the
+    request; if the queue is unavailable they are still returned.
+    """
+    game = db.session.get(Game, appid)
+    if game and game.description is not None and game.updated_at > datetime.utcnow() - CATALOG_MAX_AGE:
+        return game.as_details()
+    try:
+        details = get_steam_game_details(appid)
+    except Exception:
+        if game and game.description is not None:
+            return game.as_details()
+        raise
+    if details:
+        # This runs on GET requests; the catalog write happens off the request
+        import tasks
+        try:
+            tasks.enqueue_from_request(tasks.store_game_details, appid, details)
+        except Exception as e:
+            # The page is still served; the next visit or refresh stores them
+            logger.warning("Could not queue details for game %s: %s", appid, e)
+    return details
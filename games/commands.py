@@ -0,0 +1,79 @@
+import json
+import time
+import click
+from . import games_bp
+from .catalog import import_catalog_dump
+from models import rebuild_rating_summaries
+
+
+@games_bp.cli.command("rebuild-rating-summaries")
+def rebuild_rating_summaries_command():
+    """Recompute per-game rating summaries from all reviews."""
+    count = rebuild_rating_summaries()
+    click.echo(f"Rebuilt summaries for {count} games")
+
+@games_bp.cli.command("rebuild-leaderboard")
+@click.option("--enqueue", is_flag=True, help="Queue the job for an RQ worker instead of running it here.")
+def rebuild_leaderboard_command(enqueue):
+    """Recompute the top rated and trending games from all reviews."""
+    import tasks
+
+    if enqueue:
+        tasks.get_queue().enqueue(tasks.rebuild_leaderboard)
+        click.echo("Queued rebuild_leaderboard")
+        return
+    stats = tasks.rebuild_leaderboard()
+    click.echo(f"Ranked {stats['games']} games from {stats['reviews']} reviews in {stats['seconds']} s")
+
+@games_bp.cli.command("refresh-games")
+@click.option("--enqueue", is_flag=True, help="Queue the refresh for an RQ worker instead of running it here.")
+@click.option("--every", type=int, default=0, help="Keep running and schedule a refresh every N seconds.")
+@click.option("--stats", is_flag=True, help="Print per-job metrics and exit.")
+def refresh_games_command(enqueue, every, stats):
+    """Refresh featured games and game details from Steam."""
+    # Only this command needs the job module
+    import tasks
+
+    if stats:
+        for name in ("refresh_games", "refresh_featured", "refresh_game_details", "rebuild_leaderboard",
+                     "update_review_insights"):
+            click.echo(f"{name}: {json.dumps(tasks.job_metrics(name))}")
+        return
+
+    last_queued = {}
+    while True:
+        if enqueue or every:
+            tasks.get_queue().enqueue(tasks.refresh_games)
+            click.echo("Queued refresh_games")
+            if every:
+                # This is the clock process; it also queues tasks.PERIODIC_JOBS when due
+                for name in tasks.queue_due_jobs(tasks.get_queue(), last_queued):
+                    click.echo(f"Queued {name}")
+        else:
+            count = tasks.refresh_games()
+            click.echo(f"Refreshed {count} games")
+        if not every:
+            break
+        time.sleep(every)
+
+@games_bp.cli.command("import-catalog")
+@click.argument("path")
+def import_catalog_command(path):
+    """Import a game catalog dump into the Game table."""
+    count = import_catalog_dump(path)
+    click.echo(f"Imported {count} games")
+
+@games_bp.cli.command("update-review-insights")
+@click.option("--full", is_flag=True, help="Recompute from every review instead of only new ones.")
+@click.option("--enqueue", is_flag=True, help="Queue the job for an RQ worker instead of running it here.")
+def update_review_insights_command(full, enqueue):
+    """Update review sentiment and similar games from new reviews."""
+    import tasks
+
+    if enqueue:
+        tasks.get_queue().enqueue(tasks.update_review_insights, full)
+        click.echo("Queued update_review_insights")
+        return
+    stats = tasks.update_review_insights(full=full)
+    click.echo(f"Processed {stats['reviews']} reviews for {stats['games']} games, "
+               f"rewrote {stats['similar_lists']} similar-game lists in {stats['seconds']} s")
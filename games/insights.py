@@ -0,0 +1,401 @@
+"""
+Review sentiment and "similar games", computed offline in batches.
+
+update_review_insights() is run by `flask update-review-insights` (or the
+RQ task in tasks.py); the game page only reads the tables it writes.
+
+Sentiment: comments are vectorized as TF-IDF over TextBlob's sentiment
+lexicon, with negated forms as their own terms ("not good" -> not_good),
+and each review scores the TF-IDF-weighted mean polarity of its sentiment
+words, one sparse mat-vec per batch. GameSentiment keeps per-game sums and
+the job state keeps document frequencies, so a run only reads reviews added
+since the last one.
+
+Similarity: item-item cosine over the game x reviewer matrix, with ratings
+centred on the middle of the 1-10 scale so shared dislikes count as well as
+shared likes, shrunk towards 0 for pairs with few co-reviewers. A run
+recomputes the neighbour lists of games with new reviews and patches those
+games into other games' lists. If a game drops out of another's top K that
+list is left short until the next `--full` run, which also picks up any
+review committed with a lower id after a run had passed it. The ratings
+themselves are saved next to the database (REVIEW_RATINGS_CACHE, default
+instance/review_ratings.npz) so a run only reads new reviews; without that
+file the job reads them all again.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+from scipy import sparse
+from flask import current_app
+from sqlalchemy import insert, select, update
+
+from models import db, Review, GameSentiment, SimilarGame, BatchJobState
+
+JOB_NAME = "review_insights"
+TOP_K = 10
+BATCH_SIZE = 50000
+# Ratings are 1-10; centring on 5.5 keeps every rating non-zero
+MID_RATING = 5.5
+# A pair's similarity is weighted by n / (n + SHRINKAGE) for n co-reviewers
+SHRINKAGE = 5
+# Review polarity beyond which it counts as positive/negative
+POLARITY_THRESHOLD = 0.1
+ROW_CHUNK = 500
+
+NEGATION_RE = re.compile(r"\b(?:not|no|never|\w+n't)\s+(\w+)")
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+def _preprocess(comments):
+    # One regex pass over the whole batch rather than one per comment
+    joined = "\x00".join((c or "").replace("\x00", " ") for c in comments).lower()
+    return NEGATION_RE.sub(r"not_\1", joined).split("\x00")
+
+
+def sentiment_lexicon():
+    """
+    (terms, polarities) from TextBlob's lexicon. A negated word gets half
+    the opposite polarity, as in TextBlob itself.
+    """
+    from textblob.en import sentiment
+    sentiment.load()
+    terms, polarity = [], []
+    for word, senses in sentiment.items():
+        score = (senses.get(None) or [0.0])[0]
+        if score and re.fullmatch(r"\w+", word):
+            terms += [word, "not_" + word]
+            polarity += [score, -0.5 * score]
+    return terms, np.array(polarity)
+
+
+class SentimentScorer:
+    """
+    TF-IDF (sublinear tf, smoothed idf) over the sentiment lexicon, with
+    document frequencies accumulated across runs.
+    """
+
+    def __init__(self, documents=0, doc_freq=None):
+        from sklearn.feature_extraction.text import CountVectorizer
+        self.terms, self.polarity = sentiment_lexicon()
+        self.vectorizer = CountVectorizer(vocabulary=self.terms, lowercase=False,
+                                          token_pattern=TOKEN_PATTERN, dtype=np.float64)
+        self.documents = documents
+        self.doc_freq = np.array([(doc_freq or {}).get(t, 0) for t in self.terms], dtype=np.float64)
+
+    def state(self):
+        return {
+            "documents": self.documents,
+            "doc_freq": {self.terms[i]: int(self.doc_freq[i]) for i in np.flatnonzero(self.doc_freq)},
+        }
+
+    def score(self, comments):
+        """
+        Polarity in [-1, 1] for each comment; NaN where it has no sentiment
+        words.
+        """
+        counts = self.vectorizer.transform(_preprocess(comments))
+        self.documents += counts.shape[0]
+        # One stored entry per (document, term), so this counts documents
+        self.doc_freq += np.bincount(counts.indices, minlength=len(self.terms))
+        idf = np.log((1 + self.documents) / (1 + self.doc_freq)) + 1
+        counts.data = (1 + np.log(counts.data)) * idf[counts.indices]
+        signed = counts @ self.polarity
+        weight = counts @ np.abs(self.polarity)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(weight > 0, signed / weight, np.nan)
+
+
+def update_review_insights(full=False, top_k=TOP_K, batch_size=BATCH_SIZE):
+    """
+    Fold reviews added since the last run into GameSentiment and refresh
+    the SimilarGame lists they affect; full=True starts over. Returns run
+    statistics.
+    """
+    started = time.perf_counter()
+    state = db.session.get(BatchJobState, JOB_NAME)
+    if state is None:
+        state = BatchJobState(name=JOB_NAME, last_id=0)
+        db.session.add(state)
+    if full:
+        state.last_id, state.data = 0, None
+        db.session.query(GameSentiment).delete()
+        db.session.query(SimilarGame).delete()
+
+    # Reviews committed while the job runs wait for the next run
+    high_water = db.session.query(db.func.max(Review.id)).scalar() or 0
+    saved = json.loads(state.data or "{}")
+    scorer = SentimentScorer(saved.get("documents", 0), saved.get("doc_freq"))
+    cache_path = current_app.config.get("REVIEW_RATINGS_CACHE") or os.path.join(
+        current_app.instance_path, "review_ratings.npz")
+    ratings = Ratings.load(cache_path, state.last_id) if state.last_id else Ratings()
+    if ratings is None:
+        ratings = Ratings()
+        for rows in _review_batches(0, state.last_id, batch_size):
+            ratings.add(*zip(*((g, u, r) for _, g, u, r, _ in rows)))
+
+    games, scores = [], []
+    last_id = state.last_id
+    for rows in _review_batches(last_id, high_water, batch_size):
+        ids, batch_games, users, batch_ratings, comments = zip(*rows)
+        games.append(np.array(batch_games, dtype=np.int64))
+        scores.append(scorer.score(comments))
+        ratings.add(batch_games, users, batch_ratings)
+        last_id = ids[-1]
+
+    stats = {"reviews": int(sum(len(g) for g in games)), "games": 0, "similar_lists": 0}
+    if games:
+        games, scores = np.concatenate(games), np.concatenate(scores)
+        touched = _update_sentiment(games, scores)
+        stats["games"] = len(touched)
+        stats["similar_lists"] = _update_similarity(ratings, touched, top_k, patch=not full)
+        ratings.save(cache_path, last_id)
+
+    state.last_id = last_id
+    state.data = json.dumps(scorer.state())
+    db.session.commit()
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def _review_batches(after_id, up_to_id, batch_size):
+    """
+    Rows of (id, game_id, user_name, rating, comment) with ids in
+    (after_id, up_to_id], in id order. Core rows, not ORM objects.
+    """
+    reviews = Review.__table__
+    connection = db.session.connection()
+    while after_id < up_to_id:
+        rows = connection.execute(
+            select(reviews.c.id, reviews.c.game_id, reviews.c.user_name, reviews.c.rating, reviews.c.comment)
+            .where(reviews.c.id > after_id, reviews.c.id <= up_to_id)
+            .order_by(reviews.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+# ---- Sentiment ---- #
+def _update_sentiment(games, scores):
+    """
+    Add per-game totals for a batch of scored reviews. Returns the game ids.
+    """
+    ids, index = np.unique(games, return_inverse=True)
+    scored = ~np.isnan(scores)
+    polarity = np.where(scored, scores, 0.0)
+    totals = {
+        "review_count": np.bincount(index, minlength=len(ids)),
+        "scored_count": np.bincount(index, weights=scored, minlength=len(ids)),
+        "sentiment_sum": np.bincount(index, weights=polarity, minlength=len(ids)),
+        "positive_count": np.bincount(index, weights=polarity > POLARITY_THRESHOLD, minlength=len(ids)),
+        "negative_count": np.bincount(index, weights=polarity < -POLARITY_THRESHOLD, minlength=len(ids)),
+    }
+    rows = [
+        {"game_id": int(game_id), **{k: (float(v[i]) if k == "sentiment_sum" else int(v[i])) for k, v in totals.items()}}
+        for i, game_id in enumerate(ids)
+    ]
+
+    columns = [getattr(GameSentiment, k) for k in totals]
+    existing = {}
+    for chunk in _chunks([r["game_id"] for r in rows], 500):
+        for game_id, *values in db.session.execute(
+                select(GameSentiment.game_id, *columns).where(GameSentiment.game_id.in_(chunk))):
+            existing[game_id] = dict(zip(totals, values))
+    updates, inserts = [], []
+    for row in rows:
+        current = existing.get(row["game_id"])
+        if current is None:
+            inserts.append(row)
+        else:
+            updates.append({k: v + current[k] if k != "game_id" else v for k, v in row.items()})
+    if inserts:
+        db.session.execute(insert(GameSentiment), inserts)
+    if updates:
+        db.session.execute(update(GameSentiment), updates)
+    return ids
+
+
+# ---- Similar Games ---- #
+class Ratings:
+    """
+    Every reviewer's latest rating per game, as parallel arrays of game
+    ids, reviewer numbers and ratings.
+    """
+
+    def __init__(self, names=(), games=None, users=None, ratings=None):
+        self.codes = {name: i for i, name in enumerate(names)}
+        self._parts = []
+        if games is not None:
+            self._parts.append((games, users, ratings))
+
+    def add(self, games, names, ratings):
+        users = np.fromiter((self.codes.setdefault(n, len(self.codes)) for n in names), np.int64, len(names))
+        self._parts.append((np.asarray(games, dtype=np.int64), users, np.asarray(ratings, dtype=np.int8)))
+
+    def arrays(self):
+        """
+        (games, users, ratings) with earlier ratings of the same game by the
+        same reviewer dropped.
+        """
+        if not self._parts:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int8)
+        games, users, ratings = (np.concatenate(column) for column in zip(*self._parts))
+        keys = games * max(len(self.codes), 1) + users
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = np.sort(len(keys) - 1 - last)
+        self._parts = [(games[keep], users[keep], ratings[keep])]
+        return self._parts[0]
+
+    def matrix(self):
+        """
+        Game x reviewer matrix of centred ratings, as (matrix, game_ids).
+        """
+        games, users, ratings = self.arrays()
+        game_ids, rows = np.unique(games, return_inverse=True)
+        values = ratings.astype(np.float64) - MID_RATING
+        return sparse.csr_matrix((values, (rows, users)), shape=(len(game_ids), len(self.codes))), game_ids
+
+    def save(self, path, as_of):
+        games, users, ratings = self.arrays()
+        names = "\x00".join(self.codes).encode()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, as_of=as_of, games=games, users=users, ratings=ratings,
+                     names=np.frombuffer(names, dtype=np.uint8), name_count=len(self.codes))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, as_of):
+        """
+        The saved ratings if they cover exactly the reviews up to as_of,
+        else None.
+        """
+        try:
+            with np.load(path) as saved:
+                if int(saved["as_of"]) != as_of:
+                    return None
+                count = int(saved["name_count"])
+                names = saved["names"].tobytes().decode().split("\x00")[:count] if count else ()
+                return cls(names, saved["games"], saved["users"], saved["ratings"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def _update_similarity(ratings, touched, top_k, patch):
+    matrix, game_ids = ratings.matrix()
+    if not len(game_ids):
+        return 0
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    unit = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ matrix
+    binary = matrix.copy()
+    binary.data = np.ones_like(binary.data)
+    unit_t, binary_t = unit.T.tocsr(), binary.T.tocsr()
+
+    rows = np.searchsorted(game_ids, touched)
+    is_touched = np.zeros(len(game_ids), dtype=bool)
+    is_touched[rows] = True
+    if patch:
+        current, threshold, listed = _current_lists(game_ids, is_touched, top_k)
+
+    lists = {}
+    patches = {}
+    for start in range(0, len(rows), ROW_CHUNK):
+        chunk = rows[start:start + ROW_CHUNK]
+        cosine = (unit[chunk] @ unit_t).tocsr()
+        co_reviewers = (binary[chunk] @ binary_t).tocsr()
+        cosine.sort_indices()
+        co_reviewers.sort_indices()
+        for offset, row in enumerate(chunk):
+            cols, score, shared = _row_scores(cosine, co_reviewers, offset)
+            game_id = int(game_ids[row])
+            keep = (cols != row) & (score > 0)
+            cols, score, shared = cols[keep], score[keep], shared[keep]
+            best = np.argsort(-score, kind="stable")[:top_k]
+            lists[game_id] = [(int(game_ids[c]), float(score[i]), int(shared[i])) for i, c in zip(best, cols[best])]
+            if patch:
+                # Only entries that can change another game's list: beating
+                # its current last place, or already on it
+                hit = ~is_touched[cols] & ((score > threshold[cols]) | np.isin(cols, listed.get(row, ())))
+                for c, s, n in zip(cols[hit], score[hit], shared[hit]):
+                    patches.setdefault(int(game_ids[c]), {})[game_id] = (float(s), int(n))
+
+    if patch:
+        # Other games' lists only change in their entries for touched games
+        touched_ids = set(lists)
+        stale = {game_id for game_id, entries in current.items() if entries.keys() & touched_ids}
+        for game_id in (set(patches) | stale) - touched_ids:
+            merged = {k: v for k, v in current.get(game_id, {}).items() if k not in touched_ids}
+            merged.update(patches.get(game_id, {}))
+            ranked = sorted(merged.items(), key=lambda item: (-item[1][0], item[0]))[:top_k]
+            lists[game_id] = [(other, score, shared) for other, (score, shared) in ranked]
+
+    _write_lists(lists)
+    return len(lists)
+
+
+def _current_lists(game_ids, is_touched, top_k):
+    """
+    Stored neighbour lists as {game_id: {similar_id: (score, co_reviewers)}},
+    the score a newcomer has to beat per matrix row (0 while a list is
+    short), and for each touched row the rows whose lists include it.
+    """
+    current = {}
+    table = SimilarGame.__table__
+    for game_id, similar_id, score, shared in db.session.connection().execute(
+            select(table.c.game_id, table.c.similar_id, table.c.score, table.c.co_reviewers)):
+        current.setdefault(game_id, {})[similar_id] = (score, shared)
+
+    position = {int(game_id): row for row, game_id in enumerate(game_ids)}
+    threshold = np.zeros(len(game_ids))
+    listed = {}
+    for game_id, entries in current.items():
+        row = position.get(game_id)
+        if row is None:
+            continue
+        if len(entries) >= top_k:
+            threshold[row] = min(score for score, _ in entries.values())
+        for similar_id in entries:
+            col = position.get(similar_id)
+            if col is not None and is_touched[col]:
+                listed.setdefault(col, []).append(row)
+    return current, threshold, listed
+
+
+def _row_scores(cosine, co_reviewers, offset):
+    """
+    Column indices, shrunk cosine and co-reviewer counts for one row. Both
+    products share a sparsity pattern, apart from exact zeros.
+    """
+    start, end = cosine.indptr[offset], cosine.indptr[offset + 1]
+    cols, values = cosine.indices[start:end], cosine.data[start:end]
+    b_start, b_end = co_reviewers.indptr[offset], co_reviewers.indptr[offset + 1]
+    b_cols, b_values = co_reviewers.indices[b_start:b_end], co_reviewers.data[b_start:b_end]
+    shared = np.zeros(len(cols))
+    position = np.minimum(np.searchsorted(b_cols, cols), max(len(b_cols) - 1, 0))
+    found = (b_cols[position] == cols) if len(b_cols) else np.zeros(len(cols), dtype=bool)
+    shared[found] = b_values[position[found]]
+    return cols, values * shared / (shared + SHRINKAGE), shared
+
+
+def _write_lists(lists):
+    for chunk in _chunks(list(lists), 500):
+        db.session.query(SimilarGame).filter(SimilarGame.game_id.in_(chunk)).delete(synchronize_session=False)
+        rows = [
+            {"game_id": game_id, "rank": rank, "similar_id": other, "score": round(score, 4), "co_reviewers": shared}
+            for game_id in chunk
+            for rank, (other, score, shared) in enumerate(lists[game_id], start=1)
+        ]
+        if rows:
+            db.session.execute(insert(SimilarGame), rows)
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,134 @@
+"""
+"Top rated" and "trending" games for the home page.
+
+GameLeaderboard holds one row per reviewed game, kept current by the
+Review after_insert hook in models.py, so the lists are two index scans
+with a LIMIT however many reviews there are. rebuild_leaderboard() (run by
+`flask rebuild-leaderboard`, e.g. nightly) recomputes every row from the
+review table: it re-derives the Bayesian prior from all ratings and moves
+the trend epoch to the present, so trend values stay small.
+
+Trend: each review adds 2 ** ((posted - epoch) / half-life) to its game.
+Dividing by 2 ** ((now - epoch) / half-life) gives the decayed review count
+at any later time, and that divisor is the same for every game, so the
+stored value orders games by current velocity without being updated as
+time passes.
+"""
+import json
+import time
+from datetime import datetime, timezone
+from flask import render_template
+from sqlalchemy import insert, select
+
+from models import (db, Review, Game, GameLeaderboard, BatchJobState, LEADERBOARD_JOB, TREND_HALF_LIFE,
+                    DEFAULT_LEADERBOARD_PARAMS, add_review_to_leaderboard, leaderboard_params,
+                    leaderboard_velocity)
+from utils.page_cache import bump, cached_fragment
+
+LEADERBOARD_SIZE = 10
+# Reviews invalidate the fragment; this bounds how stale "this week" gets
+FRAGMENT_TTL = 300
+# Games need this many reviews to be listed as top rated
+MIN_REVIEWS = 3
+BATCH_SIZE = 50000
+INSERT_CHUNK = 1000
+
+
+def top_rated(limit=LEADERBOARD_SIZE, min_reviews=MIN_REVIEWS):
+    """
+    (appid, name, score, review_count) by Bayesian average, best first.
+    """
+    return db.session.query(GameLeaderboard.game_id, Game.name, GameLeaderboard.score,
+                            GameLeaderboard.review_count) \
+        .outerjoin(Game, Game.appid == GameLeaderboard.game_id) \
+        .filter(GameLeaderboard.review_count >= min_reviews) \
+        .order_by(GameLeaderboard.score.desc()).limit(limit).all()
+
+
+def trending(limit=LEADERBOARD_SIZE):
+    """
+    (appid, name, reviews this week) by decayed review velocity.
+    """
+    rows = db.session.query(GameLeaderboard.game_id, Game.name, GameLeaderboard.trend) \
+        .outerjoin(Game, Game.appid == GameLeaderboard.game_id) \
+        .order_by(GameLeaderboard.trend.desc()).limit(limit).all()
+    epoch = leaderboard_params(db.session.connection())["epoch"]
+    return [(appid, name, round(leaderboard_velocity(trend, epoch), 1)) for appid, name, trend in rows]
+
+
+def render_leaderboard(limit=LEADERBOARD_SIZE):
+    return render_template('_leaderboard.html', top_rated=top_rated(limit), trending=trending(limit))
+
+
+def leaderboard_html(limit=LEADERBOARD_SIZE):
+    """
+    The rendered lists, cached until the next review or recompute.
+    """
+    return cached_fragment(f"leaderboard:{limit}", ["leaderboard"], FRAGMENT_TTL, lambda: render_leaderboard(limit))
+
+
+def rebuild_leaderboard(batch_size=BATCH_SIZE, now=None):
+    """
+    Recompute every GameLeaderboard row from the review table. Returns run
+    statistics.
+    """
+    # NumPy stays out of web processes, which only read the table
+    import numpy as np
+
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    high_water = db.session.query(db.func.max(Review.id)).scalar() or 0
+
+    games, ratings, posted = [], [], []
+    reviews = Review.__table__
+    # Options on the statement: Connection.execution_options() would leave
+    # the session's connection streaming for the DELETE below
+    result = db.session.connection().execute(
+        select(reviews.c.game_id, reviews.c.rating, reviews.c.date_posted).where(reviews.c.id <= high_water)
+        .execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        batch_games, batch_ratings, batch_dates = zip(*rows)
+        games.append(np.array(batch_games, dtype=np.int64))
+        ratings.append(np.array(batch_ratings, dtype=np.int64))
+        posted.append(np.array(batch_dates, dtype="datetime64[us]"))
+
+    rows, params = [], {**DEFAULT_LEADERBOARD_PARAMS, "epoch": now}
+    if games:
+        games, ratings, posted = np.concatenate(games), np.concatenate(ratings), np.concatenate(posted)
+        game_ids, index = np.unique(games, return_inverse=True)
+        counts = np.bincount(index)
+        sums = np.bincount(index, weights=ratings)
+        # The prior: the site-wide mean rating, worth as many reviews as the
+        # median game has
+        params["prior_mean"] = float(ratings.mean())
+        params["prior_weight"] = float(max(np.median(counts), 1))
+        scores = (params["prior_mean"] * params["prior_weight"] + sums) / (params["prior_weight"] + counts)
+        # Undated reviews count as already decayed away; future dates as now
+        seconds = posted.astype("int64") / 1e6
+        age = np.where(np.isnat(posted), np.inf, np.maximum(now - seconds, 0))
+        trend = np.bincount(index, weights=np.exp2(-age / TREND_HALF_LIFE))
+        rows = [
+            {"game_id": int(g), "review_count": int(c), "rating_sum": int(s), "score": float(sc), "trend": float(t)}
+            for g, c, s, sc, t in zip(game_ids, counts, sums, scores, trend)
+        ]
+
+    db.session.query(GameLeaderboard).delete()
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(insert(GameLeaderboard), rows[start:start + INSERT_CHUNK])
+    state = db.session.get(BatchJobState, LEADERBOARD_JOB)
+    if state is None:
+        state = BatchJobState(name=LEADERBOARD_JOB, last_id=0)
+        db.session.add(state)
+    state.last_id = high_water
+    state.data = json.dumps(params)
+
+    # Reviews committed while this ran were folded into rows that were just
+    # replaced; add them again
+    connection = db.session.connection()
+    late = 0
+    for review in connection.execute(select(reviews).where(reviews.c.id > high_water).order_by(reviews.c.id)):
+        add_review_to_leaderboard(None, connection, review, params)
+        late += 1
+    db.session.commit()
+    bump("leaderboard")
+    return {"games": len(rows), "reviews": int(len(games)) + late, "seconds": round(time.perf_counter() - started, 3)}
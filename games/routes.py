@@ -1,28 +1,157 @@
-from flask import render_template, redirect, url_for, flash
+import logging
+from flask import render_template, request, redirect, url_for, flash, jsonify, make_response
+from markupsafe import Markup
 from . import games_bp
-from models import Review, db
+from .catalog import game_index, load_game
+from .leaderboard import render_leaderboard, LEADERBOARD_SIZE, FRAGMENT_TTL as LEADERBOARD_TTL
+from datetime import datetime
+from models import db, Review, GameRatingSummary, GameSentiment, SimilarGame, Game
+from extensions import writes, submission_limiter, images, game_info
 from forms import ReviewForm
-from utils.rawg_api import fetch_game_details
+from utils.db_routing import read_only
+from utils.page_cache import cached_fragment, cached_page, json_with_etag
+from utils.pagination import keyset_page, clamp_per_page
+from utils.steam_api import search_store, SEARCH_MAX_RESULTS
 
-@games_bp.route('/game/<int:game_id>', methods=['GET', 'POST'])
-def game_page(game_id):
-    # Get game info from RAWG API
-    game = fetch_game_details(game_id)
+logger = logging.getLogger("codecritical.games")
+
+SEARCH_MAX_AGE = 300
+REVIEWS_FRAGMENT_TTL = 600
+LEADERBOARD_MAX = 50
+# Typo matches in the local catalog weaker than this ask Steam instead
+LOCAL_MIN_SIMILARITY = 0.5
+
+
+@games_bp.route('/game/<int:appid>', methods=['GET', 'POST'])
+@read_only
+def game_page(appid):
+    try:
+        game = load_game(appid)
+        if not game:
+            flash("Game not found.", "warning")
+            return redirect(url_for('blog.home'))
+        game_image_url = images.url_for(game.get("image_url"), "carousel")
+        # Platforms and genres from RAWG/GiantBomb, on top of the Steam details
+        info = game_info.game_info(appid, name=game.get("name"), known={"steam": game})
+    except Exception as e:
+        logger.exception("Could not load game %s: %s", appid, e)
+        flash("Error fetching game data.", "danger")
+        return redirect(url_for('blog.home'))
 
-    # Review submission
     form = ReviewForm()
+    status = 200
     if form.validate_on_submit():
-        review = Review(
-            game_id=game_id,
-            user_name=form.user_name.data,
-            rating=form.rating.data,
-            comment=form.comment.data
+        if not submission_limiter.allow(request.remote_addr):
+            flash('Too many reviews from your address. Please try again in a minute.', 'warning')
+            status = 429
+        else:
+            # Committed in the next batch; shows up once the reviews
+            # fragment is invalidated by that commit
+            writes.submit(Review, {
+                "game_id": appid,
+                "user_name": form.user_name.data,
+                "rating": form.rating.data,
+                "comment": form.comment.data,
+                "date_posted": datetime.utcnow()
+            })
+            flash('Your review has been submitted!', 'success')
+            return redirect(url_for('games.game_page', appid=appid))
+    elif form.is_submitted():
+        # Out-of-range ratings stop here, before the write-behind queue;
+        # the form shows what was wrong
+        status = 400
+
+    cursor = request.args.get("cursor")
+    per_page = clamp_per_page(request.args.get("per_page", type=int))
+
+    def render_reviews():
+        reviews, next_cursor = keyset_page(
+            Review.query.filter_by(game_id=appid),
+            Review.date_posted,
+            Review.id,
+            cursor,
+            per_page
         )
-        db.session.add(review)
-        db.session.commit()
-        flash('Your review has been submitted!', 'success')
-        return redirect(url_for('games.game_page', game_id=game_id))
-
-    # Fetch all reviews for this game
-    reviews = Review.query.filter_by(game_id=game_id).all()
-    return render_template('game_details.html', game=game, form=form, reviews=reviews)
\ No newline at end of file
+        summary = db.session.get(GameRatingSummary, appid)
+        return render_template(
+            '_reviews.html',
+            reviews=reviews,
+            summary=summary,
+            next_cursor=next_cursor,
+            appid=appid
+        )
+
+    reviews_html = cached_fragment(
+        f"reviews:{appid}:{cursor}:{per_page}",
+        [f"reviews:{appid}"],
+        REVIEWS_FRAGMENT_TTL,
+        render_reviews
+    )
+    # The review form carries a per-session CSRF token, so the page itself
+    # is never shared between clients
+    response = make_response(render_template(
+        'game_details.html',
+        game=game,
+        form=form,
+        reviews_html=Markup(reviews_html),
+        game_image_url=game_image_url,
+        info=info,
+        sentiment=db.session.get(GameSentiment, appid),
+        similar=similar_games(appid)
+    ), status)
+    response.cache_control.private = True
+    return response
+
+
+def similar_games(appid):
+    """
+    Precomputed neighbours (games/insights.py) with their catalog names: one
+    primary-key range scan.
+    """
+    return db.session.query(SimilarGame.similar_id, SimilarGame.score, Game.name) \
+        .outerjoin(Game, Game.appid == SimilarGame.similar_id) \
+        .filter(SimilarGame.game_id == appid) \
+        .order_by(SimilarGame.rank).all()
+
+
+@games_bp.route("/leaderboard")
+@read_only
+def leaderboard():
+    """
+    The home page's top rated and trending lists as an HTML fragment;
+    ?limit= asks for up to LEADERBOARD_MAX games per list.
+    """
+    limit = max(1, min(request.args.get("limit", LEADERBOARD_SIZE, type=int), LEADERBOARD_MAX))
+    return cached_page(["leaderboard"], LEADERBOARD_TTL, lambda: render_leaderboard(limit))
+
+
+@games_bp.route("/search_steam")
+@read_only
+def search_steam():
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", 10, type=int)
+
+    # Answer from the local catalog first; Steam is only asked on a miss or
+    # when the closest local names are only a loose typo match. The index is
+    # built and refreshed in the background (games.catalog), never here
+    size = max(1, min(limit, SEARCH_MAX_RESULTS))
+    local = game_index.search(query, size, min_similarity=LOCAL_MIN_SIMILARITY)
+    if local:
+        return json_with_etag(with_thumbnails(local), max_age=SEARCH_MAX_AGE)
+
+    try:
+        results, complete = search_store(query, limit)
+    except Exception as e:
+        logger.warning("Steam search error: %s", e)
+        # Loose local matches beat an empty list
+        response = jsonify(with_thumbnails(game_index.search(query, size)))
+        response.cache_control.no_store = True
+        return response
+
+    # Results derived from a cached prefix are only provisional
+    return json_with_etag(with_thumbnails(results), max_age=SEARCH_MAX_AGE if complete else 5)
+
+
+def with_thumbnails(results):
+    # Copies, so the proxied URLs don't end up in the index or cache
+    return [dict(r, image=images.url_for(r.get("image"), "thumb") if r.get("image") else "") for r in results]
@@ -0,0 +1,30 @@
+"""
+gunicorn settings, read automatically from the working directory. Bind
+address and worker count come from PORT and WEB_CONCURRENCY as usual.
+
+preload_app builds the app once in the master before forking, so workers
+share its memory copy-on-write instead of each importing everything again
+(scripts/measure_boot.py shows the difference).
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "False")
+
+
+def post_fork(server, worker):
+    from extensions import db
+    from games.catalog import start_game_index_refresher
+    app = worker.app.wsgi()
+    if server.cfg.preload_app:
+        # Pooled connections opened in the master must not be shared by workers
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+    # Threads don't survive the fork; each worker refreshes its own game index
+    start_game_index_refresher(app)
+
+
+def worker_exit(server, worker):
+    # Commit submissions still waiting in the write-behind buffer
+    from extensions import writes
+    writes.close()
@@ -1,7 +1,9 @@
+import os
 import sqlite3
 
-# Connect to your database
-conn = sqlite3.connect('app.db')
+# Quick look at the local SQLite database. For full, filtered or
+# compressed dumps use `flask export post|review|contact_message`.
+conn = sqlite3.connect(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.db'))
 cursor = conn.cursor()
 
 # Get a list of tables
@@ -13,13 +15,13 @@ for table in tables:
 
 # Read posts
 print("\nPosts:")
-cursor.execute("SELECT id, title, subtitle, author, date_posted FROM Post")
+cursor.execute("SELECT id, title, subtitle, author, date_posted FROM post")
 for row in cursor.fetchall():
     print(row)
 
 # Read contact messages
 print("\nContact Messages:")
-cursor.execute("SELECT id, name, email, subject, date_sent FROM ContactMessage")
+cursor.execute("SELECT id, name, email, subject, date_sent FROM contact_message")
 for row in cursor.fetchall():
     print(row)
 
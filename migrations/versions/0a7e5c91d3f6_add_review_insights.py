@@ -0,0 +1,50 @@
+"""add review insights
+
+Revision ID: 0a7e5c91d3f6
+Revises: f3a6d0c8b214
+Create Date: 2026-10-18 17:58:31.904126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7e5c91d3f6'
+down_revision = 'f3a6d0c8b214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask update-review-insights`
+    op.create_table('game_sentiment',
+    sa.Column('game_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('scored_count', sa.Integer(), nullable=False),
+    sa.Column('sentiment_sum', sa.Float(), nullable=False),
+    sa.Column('positive_count', sa.Integer(), nullable=False),
+    sa.Column('negative_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('game_id')
+    )
+    op.create_table('similar_game',
+    sa.Column('game_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('similar_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('co_reviewers', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('game_id', 'rank')
+    )
+    op.create_table('batch_job_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('batch_job_state')
+    op.drop_table('similar_game')
+    op.drop_table('game_sentiment')
@@ -0,0 +1,46 @@
+"""add game leaderboard
+
+Revision ID: 1d4f8b2c6e95
+Revises: 0a7e5c91d3f6
+Create Date: 2026-10-18 21:14:52.308417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d4f8b2c6e95'
+down_revision = '0a7e5c91d3f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('game_leaderboard',
+    sa.Column('game_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('trend', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('game_id')
+    )
+    with op.batch_alter_table('game_leaderboard', schema=None) as batch_op:
+        batch_op.create_index('ix_game_leaderboard_score', [sa.text('score DESC')], unique=False)
+        batch_op.create_index('ix_game_leaderboard_trend', [sa.text('trend DESC')], unique=False)
+
+    # Scores for existing reviews with the default prior (5.5, worth 5
+    # reviews); `flask rebuild-leaderboard` fills in the prior and trends
+    op.execute(
+        "INSERT INTO game_leaderboard (game_id, review_count, rating_sum, score, trend) "
+        "SELECT game_id, COUNT(*), SUM(rating), (SUM(rating) + 27.5) / (COUNT(*) + 5.0), 0 "
+        "FROM review GROUP BY game_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('game_leaderboard', schema=None) as batch_op:
+        batch_op.drop_index('ix_game_leaderboard_trend')
+        batch_op.drop_index('ix_game_leaderboard_score')
+
+    op.drop_table('game_leaderboard')
@@ -0,0 +1,32 @@
+"""add featured game
+
+Revision ID: 3a8d5e0c7f21
+Revises: 9c2f4a7e1b53
+Create Date: 2026-10-19 00:41:27.915036
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a8d5e0c7f21'
+down_revision = '9c2f4a7e1b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by the next `flask refresh-games`
+    op.create_table('featured_game',
+    sa.Column('position', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('appid', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('discounted', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('position')
+    )
+
+
+def downgrade():
+    op.drop_table('featured_game')
@@ -0,0 +1,30 @@
+"""add page cache version
+
+Revision ID: 5b9e2d7a1c43
+Revises: 3a8d5e0c7f21
+Create Date: 2026-10-20 09:12:44.301557
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e2d7a1c43'
+down_revision = '3a8d5e0c7f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Missing scopes read as never changed; pages cached before the upgrade
+    # expire on their TTL
+    op.create_table('page_cache_version',
+    sa.Column('scope', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+
+
+def downgrade():
+    op.drop_table('page_cache_version')
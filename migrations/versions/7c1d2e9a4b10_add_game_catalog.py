@@ -0,0 +1,38 @@
+"""add game catalog
+
+Revision ID: 7c1d2e9a4b10
+Revises: 4ea327791220
+Create Date: 2026-10-18 10:12:41.208114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d2e9a4b10'
+down_revision = '4ea327791220'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('game',
+    sa.Column('appid', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('release_date', sa.String(length=50), nullable=True),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('price', sa.String(length=50), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('appid')
+    )
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_game_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('game', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_game_updated_at'))
+
+    op.drop_table('game')
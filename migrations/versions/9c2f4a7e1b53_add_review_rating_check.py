@@ -0,0 +1,31 @@
+"""add review rating check
+
+Revision ID: 9c2f4a7e1b53
+Revises: 1d4f8b2c6e95
+Create Date: 2026-10-18 23:12:08.402719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2f4a7e1b53'
+down_revision = '1d4f8b2c6e95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Clamp anything already out of range so the constraint can be added;
+    # `flask rebuild-rating-summaries` and `flask rebuild-leaderboard`
+    # recount such games afterwards
+    op.execute("UPDATE review SET rating = CASE WHEN rating < 1 THEN 1 ELSE 10 END "
+               "WHERE rating < 1 OR rating > 10")
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_review_rating', 'rating BETWEEN 1 AND 10')
+
+
+def downgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_review_rating', type_='check')
@@ -0,0 +1,27 @@
+"""add post feed index
+
+Revision ID: b5e03f6c2d81
+Revises: 7c1d2e9a4b10
+Create Date: 2026-10-18 11:02:17.554301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e03f6c2d81'
+down_revision = '7c1d2e9a4b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Descending on both keyset columns so the home feed is an index scan
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_date_posted_id', [sa.text('date_posted DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_date_posted_id')
@@ -0,0 +1,43 @@
+"""add review index and rating summary
+
+Revision ID: d91a7b3e5f02
+Revises: b5e03f6c2d81
+Create Date: 2026-10-18 11:48:03.917265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91a7b3e5f02'
+down_revision = 'b5e03f6c2d81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('game_rating_summary',
+    sa.Column('game_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    *[sa.Column(f'rating_{i}', sa.Integer(), nullable=False) for i in range(1, 11)],
+    sa.PrimaryKeyConstraint('game_id')
+    )
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_game_id_date_posted', ['game_id', 'date_posted'], unique=False)
+
+    # Backfill summaries for reviews that already exist
+    buckets = ", ".join(f"SUM(CASE WHEN rating = {i} THEN 1 ELSE 0 END)" for i in range(1, 11))
+    columns = ", ".join(f"rating_{i}" for i in range(1, 11))
+    op.execute(
+        f"INSERT INTO game_rating_summary (game_id, review_count, rating_sum, {columns}) "
+        f"SELECT game_id, COUNT(*), SUM(rating), {buckets} FROM review GROUP BY game_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_game_id_date_posted')
+
+    op.drop_table('game_rating_summary')
@@ -0,0 +1,66 @@
+"""add post full text search
+
+Revision ID: e2c84f1a9d37
+Revises: d91a7b3e5f02
+Create Date: 2026-10-18 13:25:49.611832
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c84f1a9d37'
+down_revision = 'd91a7b3e5f02'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "title, subtitle, content, content='post', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+    "INSERT INTO post_fts(rowid, title, subtitle, content) VALUES (new.id, new.title, new.subtitle, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, subtitle, content) "
+    "VALUES ('delete', old.id, old.title, old.subtitle, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, subtitle, content) "
+    "VALUES ('delete', old.id, old.title, old.subtitle, old.content); "
+    "INSERT INTO post_fts(rowid, title, subtitle, content) VALUES (new.id, new.title, new.subtitle, new.content); END",
+    "INSERT INTO post_fts(post_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS post_fts_ai",
+    "DROP TRIGGER IF EXISTS post_fts_ad",
+    "DROP TRIGGER IF EXISTS post_fts_au",
+    "DROP TABLE IF EXISTS post_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "ALTER TABLE post ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(subtitle, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_post_search_vector ON post USING gin (search_vector)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_post_search_vector",
+    "ALTER TABLE post DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(sqlite, postgres):
+    dialect = op.get_bind().dialect.name
+    for statement in {"sqlite": sqlite, "postgresql": postgres}.get(dialect, []):
+        op.execute(statement)
+
+
+def upgrade():
+    _run(SQLITE_UPGRADE, POSTGRES_UPGRADE)
+
+
+def downgrade():
+    _run(SQLITE_DOWNGRADE, POSTGRES_DOWNGRADE)
@@ -0,0 +1,33 @@
+"""add post render cache
+
+Revision ID: f3a6d0c8b214
+Revises: e2c84f1a9d37
+Create Date: 2026-10-18 16:40:12.208417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6d0c8b214'
+down_revision = 'e2c84f1a9d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled on the next save of each post, or all at once by `flask render-posts`
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_minutes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    # Plain DROP COLUMN (SQLite 3.35+): a batch rebuild of post would lose
+    # the full-text search triggers
+    for column in ('content_hash', 'reading_minutes', 'word_count', 'excerpt', 'content_html'):
+        op.drop_column('post', column)
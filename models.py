@@ -0,0 +1,338 @@
+import json
+from datetime import datetime, timezone
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import validates
+from extensions import db
+from utils import post_search
+from utils.post_render import render_post
+from utils.page_cache import track_model_changes
+
+
+# ---- Models ---- #
+class Post(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(150), nullable=False)
+    subtitle = db.Column(db.String(250))
+    author = db.Column(db.String(50), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Rendered from content on save (utils/post_render); views never render
+    content_html = db.Column(db.Text)
+    excerpt = db.Column(db.String(300))
+    word_count = db.Column(db.Integer)
+    reading_minutes = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))
+
+    # Matches the home feed's keyset order
+    __table_args__ = (
+        db.Index('ix_post_date_posted_id', date_posted.desc(), id.desc()),
+    )
+
+# Full-text search structures (FTS5 on SQLite, tsvector + GIN on Postgres)
+post_search.install(Post.__table__)
+
+class ContactMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(150), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    date_sent = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Reviews score games 1-10; GameRatingSummary keeps a counter per score
+RATING_MIN, RATING_MAX = 1, 10
+
+class Review(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, nullable=False)
+    user_name = db.Column(db.String(100), nullable=False)
+    rating = db.Column(db.Integer, nullable=False)
+    comment = db.Column(db.Text, nullable=True)
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_review_game_id_date_posted', 'game_id', 'date_posted'),
+        db.CheckConstraint(f'rating BETWEEN {RATING_MIN} AND {RATING_MAX}', name='ck_review_rating'),
+    )
+
+    @validates('rating')
+    def validate_rating(self, key, rating):
+        # Caught here rather than as a missing counter in the summary hook
+        if not isinstance(rating, int) or not RATING_MIN <= rating <= RATING_MAX:
+            raise ValueError(f"Rating must be from {RATING_MIN} to {RATING_MAX}, got {rating!r}")
+        return rating
+
+class GameRatingSummary(db.Model):
+    # Running totals per game, kept current by the Review after_insert hook
+    game_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+    rating_6 = db.Column(db.Integer, nullable=False, default=0)
+    rating_7 = db.Column(db.Integer, nullable=False, default=0)
+    rating_8 = db.Column(db.Integer, nullable=False, default=0)
+    rating_9 = db.Column(db.Integer, nullable=False, default=0)
+    rating_10 = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def mean(self):
+        return round(self.rating_sum / self.review_count, 2) if self.review_count else None
+
+    @property
+    def histogram(self):
+        # Counts for ratings 1..10
+        return [getattr(self, f"rating_{i}") for i in range(1, 11)]
+
+class GameSentiment(db.Model):
+    # Running totals from the review insights job (games/insights.py)
+    game_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    # Reviews whose comment had any sentiment words
+    scored_count = db.Column(db.Integer, nullable=False, default=0)
+    sentiment_sum = db.Column(db.Float, nullable=False, default=0.0)
+    positive_count = db.Column(db.Integer, nullable=False, default=0)
+    negative_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def mean(self):
+        # Mean comment polarity, -1 (negative) .. 1 (positive)
+        return round(self.sentiment_sum / self.scored_count, 2) if self.scored_count else None
+
+    @property
+    def label(self):
+        mean = self.mean
+        if mean is None:
+            return None
+        if mean >= 0.3:
+            return "Very positive"
+        if mean >= 0.1:
+            return "Positive"
+        if mean > -0.1:
+            return "Mixed"
+        if mean > -0.3:
+            return "Negative"
+        return "Very negative"
+
+class SimilarGame(db.Model):
+    # Top-K neighbours per game from the review insights job; the primary
+    # key order is the order the game page shows them in
+    game_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    similar_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    co_reviewers = db.Column(db.Integer, nullable=False)
+
+class GameLeaderboard(db.Model):
+    # Home page "top rated" and "trending" lists. Kept current by the Review
+    # after_insert hook and recomputed by `flask rebuild-leaderboard`
+    # (games/leaderboard.py)
+    game_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    # Bayesian average: the mean rating pulled towards the site-wide mean
+    # by a prior worth prior_weight reviews
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    # Sum over the game's reviews of 2 ** ((posted - epoch) / half-life);
+    # see leaderboard_velocity
+    trend = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_game_leaderboard_score', score.desc()),
+        db.Index('ix_game_leaderboard_trend', trend.desc()),
+    )
+
+class PageCacheVersion(db.Model):
+    # Last-change stamp per page cache scope (see utils/page_cache), shared
+    # by every process
+    scope = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Float, nullable=False)
+
+class BatchJobState(db.Model):
+    # Progress of incremental batch jobs: last row processed plus any
+    # job-specific state as JSON
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Game(db.Model):
+    appid = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    release_date = db.Column(db.String(50), nullable=True)
+    image_url = db.Column(db.String(500), nullable=True)
+    price = db.Column(db.String(50), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def as_details(self):
+        # Same shape as utils.steam_api.get_steam_game_details
+        return {
+            "name": self.name,
+            "description": self.description or "",
+            "original_release_date": self.release_date or "Unknown",
+            "image_url": self.image_url
+        }
+
+class FeaturedGame(db.Model):
+    # Steam's featured list as stored by the last refresh_featured job. The
+    # home page carousel reads it from here in every process
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    appid = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    image_url = db.Column(db.String(500), nullable=True)
+    discounted = db.Column(db.Boolean, nullable=False, default=False)
+
+@db.event.listens_for(Post, "before_insert")
+@db.event.listens_for(Post, "before_update")
+def render_post_content(mapper, connection, post):
+    """
+    Re-render a post's body whenever its content (or the render pipeline)
+    has changed since the last save.
+    """
+    render_post(post)
+
+def rerender_posts(force=False, batch_size=100):
+    """
+    Render every post whose stored output is stale (or all of them with
+    force). Returns the number re-rendered.
+    """
+    rendered = 0
+    ids = [row[0] for row in db.session.query(Post.id).order_by(Post.id)]
+    for start in range(0, len(ids), batch_size):
+        for post in Post.query.filter(Post.id.in_(ids[start:start + batch_size])):
+            rendered += render_post(post, force=force)
+        db.session.commit()
+    return rendered
+
+def _upsert(connection, table, values, increments):
+    """
+    Insert values as a new per-game row, or apply increments to the
+    existing one, atomically.
+    """
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        if connection.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).values(**values)
+        connection.execute(stmt.on_conflict_do_update(index_elements=["game_id"], set_=increments))
+        return
+
+    result = connection.execute(update(table).where(table.c.game_id == values["game_id"]).values(**increments))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**values))
+
+@db.event.listens_for(Review, "after_insert")
+def add_review_to_summary(mapper, connection, review):
+    """
+    Fold a new review into its game's GameRatingSummary within the same
+    transaction, as a single atomic upsert.
+    """
+    bucket = f"rating_{review.rating}"
+    summary = GameRatingSummary.__table__
+    values = {"game_id": review.game_id, "review_count": 1, "rating_sum": review.rating}
+    values.update({f"rating_{i}": int(i == review.rating) for i in range(1, 11)})
+    increments = {
+        "review_count": summary.c.review_count + 1,
+        "rating_sum": summary.c.rating_sum + review.rating,
+        bucket: summary.c[bucket] + 1
+    }
+    _upsert(connection, summary, values, increments)
+
+# ---- Leaderboard ---- #
+LEADERBOARD_JOB = "leaderboard"
+# A review counts half as much towards "trending" for every week of age
+TREND_HALF_LIFE = 7 * 24 * 3600
+# Used until the first full recompute stores the real prior; the epoch is
+# 2025-01-01 UTC
+DEFAULT_LEADERBOARD_PARAMS = {"prior_mean": 5.5, "prior_weight": 5.0, "epoch": 1735689600.0}
+
+def leaderboard_params(connection):
+    """
+    Prior and trend epoch from the last full recompute.
+    """
+    table = BatchJobState.__table__
+    data = connection.execute(select(table.c.data).where(table.c.name == LEADERBOARD_JOB)).scalar()
+    return {**DEFAULT_LEADERBOARD_PARAMS, **json.loads(data or "{}")}
+
+def trend_weight(posted, epoch):
+    """
+    A review's contribution to GameLeaderboard.trend, relative to epoch.
+    Same rule as the full recompute: undated reviews (e.g. imported) count
+    as already decayed away, future dates as now.
+    """
+    if posted is None:
+        return 0.0
+    # Naive datetimes in this app are UTC
+    seconds = min(posted.replace(tzinfo=timezone.utc).timestamp(), datetime.now(timezone.utc).timestamp())
+    return 2 ** ((seconds - epoch) / TREND_HALF_LIFE)
+
+def leaderboard_velocity(trend, epoch, now=None):
+    """
+    Reviews "this week" at unix time now: every review weighted by
+    2 ** -(age / half-life).
+    """
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    return trend * 2 ** ((epoch - now) / TREND_HALF_LIFE)
+
+@db.event.listens_for(Review, "after_insert")
+def add_review_to_leaderboard(mapper, connection, review, params=None):
+    """
+    Fold a new review into its game's GameLeaderboard row: counts and
+    trend are added to, and the score is recomputed from the new totals,
+    all in one upsert.
+    """
+    params = params or leaderboard_params(connection)
+    prior = params["prior_mean"] * params["prior_weight"]
+    weight = trend_weight(review.date_posted, params["epoch"])
+    board = GameLeaderboard.__table__
+    values = {
+        "game_id": review.game_id,
+        "review_count": 1,
+        "rating_sum": review.rating,
+        "score": (prior + review.rating) / (params["prior_weight"] + 1),
+        "trend": weight,
+    }
+    increments = {
+        "review_count": board.c.review_count + 1,
+        "rating_sum": board.c.rating_sum + review.rating,
+        "score": (board.c.rating_sum + review.rating + prior) / (board.c.review_count + 1 + params["prior_weight"]),
+        "trend": board.c.trend + weight,
+    }
+    _upsert(connection, board, values, increments)
+
+def rebuild_rating_summaries():
+    """
+    Recompute every GameRatingSummary from the review table.
+    """
+    buckets = [db.func.sum(db.case((Review.rating == i, 1), else_=0)) for i in range(1, 11)]
+    rows = db.session.query(
+        Review.game_id, db.func.count(Review.id), db.func.sum(Review.rating), *buckets
+    ).group_by(Review.game_id).all()
+
+    db.session.query(GameRatingSummary).delete()
+    if rows:
+        db.session.execute(insert(GameRatingSummary), [
+            dict(game_id=row[0], review_count=row[1], rating_sum=row[2],
+                 **{f"rating_{i}": row[2 + i] for i in range(1, 11)})
+            for row in rows
+        ])
+    db.session.commit()
+    return len(rows)
+
+def page_cache_scopes(obj):
+    """
+    Cached pages and fragments a changed model invalidates.
+    """
+    if isinstance(obj, Post):
+        return {"posts", f"post:{obj.id}"}
+    if isinstance(obj, Review):
+        return {"reviews", f"reviews:{obj.game_id}", "leaderboard"}
+    return set()
+
+track_model_changes(page_cache_scopes, PageCacheVersion.__table__)
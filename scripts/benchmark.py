@@ -0,0 +1,409 @@
+"""
+Benchmark the main routes under load.
+
+Seeds a SQLite database with posts, reviews and games, points Steam, RAWG
+and GiantBomb at a local StubServer, then measures throughput and
+p50/p95/p99 latency of each route, in-process through the Flask test
+client and/or against a gunicorn process with several workers. Results are
+written as JSON; --compare reports p95 regressions against an earlier run.
+
+    python -m scripts.benchmark --posts 10000 --reviews 10000
+    python -m scripts.benchmark --mode both --workers 4 --concurrency 16 --output bench.json
+    python -m scripts.benchmark --compare bench-main.json --fail-on-regression 0.2
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import insert, select, func
+
+from utils.stub_server import StubServer
+
+SCENARIOS = ["home", "post", "game_page", "search_steam", "contact", "new_post"]
+SEARCH_TERMS = ["portal", "half", "stardew", "hollow knight", "witcher", "doom", "celeste", "zelda"]
+
+
+# ---- Fake upstreams ---- #
+def start_stub(appids, delay=0.0):
+    """
+    StubServer answering the Steam, RAWG and GiantBomb calls the routes make,
+    each after delay seconds to mimic network latency.
+    """
+    stub = StubServer().start()
+    featured = {
+        "specials": {"items": [{"id": a, "name": f"Game {a}", "discount_percent": 20} for a in appids[:5]]},
+        "new_releases": {"items": [{"id": a, "name": f"Game {a}"} for a in appids[5:10]]},
+    }
+
+    def appdetails(query):
+        appid = query.get("appids", "0")
+        return {appid: {"success": True, "data": {
+            "name": f"Game {appid}", "short_description": "Benchmark game",
+            "header_image": None, "release_date": {"date": "1 Jan, 2025"},
+        }}}
+
+    def storesearch(query):
+        term = query.get("term", "")
+        return {"total": 10, "items": [
+            {"id": 100000 + i, "name": f"{term.title()} {i}", "tiny_image": "", "price": None} for i in range(10)
+        ]}
+
+    upcoming = [{"name": f"Upcoming {i}", "released": f"2025-0{1 + i}-01",
+                 "original_release_date": f"2025-0{1 + i}-01"} for i in range(5)]
+
+    stub.route("/steam/featuredcategories", featured, delay=delay)
+    stub.route("/steam/appdetails", appdetails, delay=delay)
+    stub.route("/steam/storesearch/", storesearch, delay=delay)
+    stub.route("/rawg/games", {"results": upcoming}, delay=delay)
+    stub.route("/giantbomb/games/", {"results": upcoming}, delay=delay)
+    return stub
+
+
+def provider_env(stub_url):
+    return {
+        "STEAM_API_URL": f"{stub_url}/steam",
+        "RAWG_API_URL": f"{stub_url}/rawg",
+        "GIANTBOMB_API_URL": f"{stub_url}/giantbomb",
+        "RAWG_API_KEY": "benchmark",
+        "GIANTBOMB_API_KEY": "benchmark",
+    }
+
+
+def point_providers_at(app, stub_url):
+    """
+    Send an already imported app's upstream calls to the stub.
+    """
+    from utils import steam_api, rawg_api, giantbomb_api
+    env = provider_env(stub_url)
+    steam_api.BASE_URL = env["STEAM_API_URL"]
+    rawg_api.BASE_URL = env["RAWG_API_URL"]
+    giantbomb_api.BASE_URL = env["GIANTBOMB_API_URL"]
+    app.config["RAWG_API_KEY"] = env["RAWG_API_KEY"]
+    app.config["GIANTBOMB_API_KEY"] = env["GIANTBOMB_API_KEY"]
+
+
+# ---- Seeding ---- #
+def seed(app, db, posts, reviews, games, batch_size=10000, log=print):
+    """
+    Fill the database up to the requested sizes. An already seeded database
+    is reused as long as it is at least that big. Half of the games are in
+    the local catalog; the rest make game_page fall back to Steam.
+    """
+    from models import Post, Review, Game
+    from transfer import refresh_derived
+
+    with app.app_context():
+        db.create_all()
+        rng = random.Random(42)
+        now = datetime.utcnow()
+
+        have_posts = db.session.execute(select(func.count()).select_from(Post)).scalar()
+        for start in range(have_posts, posts, batch_size):
+            db.session.execute(insert(Post), [{
+                "title": f"Benchmark post {i}",
+                "subtitle": rng.choice(SEARCH_TERMS).title(),
+                "author": f"author{i % 50}",
+                "content": " ".join(rng.choices(SEARCH_TERMS, k=60)),
+                "date_posted": now - timedelta(minutes=i),
+            } for i in range(start, min(start + batch_size, posts))])
+            db.session.commit()
+            log(f"posts: {min(start + batch_size, posts)}/{posts}")
+
+        last = db.session.execute(select(func.max(Game.appid))).scalar() or 0
+        rows = [{
+            "appid": appid, "name": f"Game {appid}", "description": "Seeded game",
+            "release_date": "2025", "updated_at": now,
+        } for appid in range(last + 1, games + 1) if appid % 2]
+        if rows:
+            db.session.execute(insert(Game), rows)
+            db.session.commit()
+
+        have_reviews = db.session.execute(select(func.count()).select_from(Review)).scalar()
+        for start in range(have_reviews, reviews, batch_size):
+            db.session.execute(insert(Review), [{
+                "game_id": rng.randint(1, games),
+                "user_name": f"user{i % 1000}",
+                "rating": rng.randint(1, 10),
+                "comment": "Benchmark review",
+                "date_posted": now - timedelta(minutes=i),
+            } for i in range(start, min(start + batch_size, reviews))])
+            db.session.commit()
+            log(f"reviews: {min(start + batch_size, reviews)}/{reviews}")
+
+        # Bulk inserts skip the ORM hooks that render posts and fold reviews
+        # into rating summaries and the leaderboard; rebuild those as
+        # `flask import` does, so pages aren't measured on half-empty data
+        if have_posts < posts:
+            refresh_derived("post", log)
+        if have_reviews < reviews:
+            refresh_derived("review", log)
+
+
+# ---- Load generation ---- #
+def plan_requests(scenario, count, posts, games, rng):
+    """
+    (method, path, form data) for each request of a scenario.
+    """
+    plan = []
+    for i in range(count):
+        if scenario == "home":
+            plan.append(("GET", "/", None))
+        elif scenario == "post":
+            plan.append(("GET", f"/post/{rng.randint(1, posts)}", None))
+        elif scenario == "game_page":
+            plan.append(("GET", f"/game/{rng.randint(1, games)}", None))
+        elif scenario == "search_steam":
+            term = rng.choice(SEARCH_TERMS + [f"game {rng.randint(1, games)}"])
+            plan.append(("GET", f"/search_steam?q={term}", None))
+        elif scenario == "contact":
+            plan.append(("POST", "/contact", {
+                "name": "Bench", "email": "bench@example.com", "subject": f"Load {i}", "message": "Hello"}))
+        elif scenario == "new_post":
+            plan.append(("POST", "/new", {
+                "title": f"Load post {i}", "subtitle": "Load", "author": "bench", "content": "Written under load"}))
+        else:
+            raise ValueError(f"Unknown scenario {scenario}")
+    return plan
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+    }
+
+
+def run_load(make_client, send, plan, concurrency):
+    """
+    Replay plan from concurrency threads, each with its own client.
+    send(client, method, path, data) returns the HTTP status.
+    """
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker():
+        nonlocal errors
+        client = make_client()
+        while True:
+            index = next(counter)
+            if index >= len(plan):
+                return
+            method, path, data = plan[index]
+            started = time.perf_counter()
+            try:
+                failed = send(client, method, path, data) >= 400
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(max(concurrency, 1))]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_scenarios(make_client, send, scenarios, requests_per_scenario, concurrency,
+                  posts, games, warmup=20, log=print):
+    rng = random.Random(7)
+    results = {}
+    for scenario in scenarios:
+        run_load(make_client, send, plan_requests(scenario, warmup, posts, games, rng), concurrency)
+        plan = plan_requests(scenario, requests_per_scenario, posts, games, rng)
+        results[scenario] = run_load(make_client, send, plan, concurrency)
+        r = results[scenario]
+        log(f"  {scenario:<13} {r['throughput_rps']:>8} req/s  p50 {r['p50_ms']:>7} ms  "
+            f"p95 {r['p95_ms']:>7} ms  p99 {r['p99_ms']:>7} ms  errors {r['errors']}")
+    return results
+
+
+def bench_in_process(app, scenarios, requests_per_scenario, concurrency, posts, games, warmup=20, log=print):
+    def send(client, method, path, data):
+        return client.open(path, method=method, data=data).status_code
+
+    return run_scenarios(app.test_client, send, scenarios, requests_per_scenario, concurrency,
+                         posts, games, warmup, log)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_gunicorn(env, scenarios, requests_per_scenario, concurrency, posts, games,
+                   workers=4, warmup=20, log=print):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+         "--log-level", "warning", "server:app"],
+        env={**os.environ, **env}
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if requests.get(base + "/about", timeout=5).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.2)
+
+        def send(session, method, path, data):
+            return session.request(method, base + path, data=data, allow_redirects=False, timeout=30).status_code
+
+        return run_scenarios(requests.Session, send, scenarios, requests_per_scenario, concurrency,
+                             posts, games, warmup, log)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+# ---- Reporting ---- #
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, threshold=0.2):
+    """
+    Routes whose p95 grew by more than threshold (a fraction) since previous.
+    """
+    regressions = []
+    for mode, routes in current["results"].items():
+        for route, result in routes.items():
+            before = previous.get("results", {}).get(mode, {}).get(route)
+            if not before or not before["p95_ms"]:
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+            if change > threshold:
+                regressions.append(f"{mode}/{route}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=10000)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--database", help="SQLite file to seed and reuse (default: a temp file)")
+    parser.add_argument("--mode", choices=["in-process", "gunicorn", "both"], default="in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--upstream-delay", type=float, default=0.05, help="seconds per fake upstream call")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier JSON result to compare p95 against")
+    parser.add_argument("--fail-on-regression", type=float, metavar="FRACTION",
+                        help="exit 1 if any p95 grew by more than this fraction")
+    args = parser.parse_args()
+
+    database = args.database or os.path.join(tempfile.gettempdir(), f"bench-{args.posts}-{args.reviews}.db")
+    stub = start_stub(list(range(1, args.games + 1)), args.upstream_delay)
+    env = {
+        "DATABASE_URL": f"sqlite:///{os.path.abspath(database)}",
+        # One client address sends everything, so lift the per-IP cap
+        "SUBMISSION_RATE": "1000000000",
+        **provider_env(stub.url),
+    }
+    # Must be in place before the app (and its config) is imported
+    os.environ.update(env)
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ.pop("CACHE_URL", None)
+
+    from server import app
+    from extensions import db
+    app.logger.disabled = True
+
+    started = time.monotonic()
+    seed(app, db, args.posts, args.reviews, args.games)
+    # The home page carousel shows what the refresh job stored
+    import tasks
+    with app.app_context():
+        tasks.refresh_featured()
+    print(f"Seeded {database} in {time.monotonic() - started:.1f}s")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "posts": args.posts, "reviews": args.reviews, "games": args.games,
+            "requests_per_scenario": args.requests, "concurrency": args.concurrency,
+            "workers": args.workers, "upstream_delay": args.upstream_delay,
+        },
+        "results": {},
+    }
+    try:
+        if args.mode in ("in-process", "both"):
+            print("In-process (Flask test client):")
+            report["results"]["in-process"] = bench_in_process(
+                app, args.scenarios, args.requests, args.concurrency, args.posts, args.games, args.warmup)
+        if args.mode in ("gunicorn", "both"):
+            print(f"gunicorn ({args.workers} workers):")
+            report["results"]["gunicorn"] = bench_gunicorn(
+                env, args.scenarios, args.requests, args.concurrency, args.posts, args.games,
+                args.workers, args.warmup)
+    finally:
+        stub.stop()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.fail_on_regression or 0.2)
+        for line in regressions:
+            print("Regression:", line)
+        if regressions and args.fail_on_regression is not None:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
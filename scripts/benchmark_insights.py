@@ -0,0 +1,159 @@
+"""
+Benchmark the review insights batch job on synthetic data.
+
+Seeds a SQLite database with reviews from reviewers who mostly play (and
+like) games from two favourite genres, with comments whose wording follows
+the rating. Times a full run, then an incremental run over a smaller batch
+of new reviews, and checks the output makes sense: how many similar-game
+neighbours share a genre, and how per-game sentiment tracks mean rating.
+
+    python -m scripts.benchmark_insights --reviews 1000000
+    python -m scripts.benchmark_insights --reviews 100000 --games 2000 --incremental 5000 --output insights.json
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, select, func
+
+GENRES = 20
+POSITIVE = ["great fun", "amazing story", "beautiful art", "excellent controls", "really good",
+            "wonderful music", "perfect pacing", "brilliant puzzles"]
+NEGATIVE = ["boring", "terrible performance", "awful writing", "not fun", "bad controls",
+            "disappointing ending", "poor balance", "ugly menus"]
+FILLER = ["played it with friends", "finished it in a weekend", "bought it on sale", "the second act",
+          "on the steam deck", "after the patch", "in co-op", "for twenty hours"]
+
+
+def synthetic_reviews(count, games, users, seed):
+    """
+    (game_ids, user_names, ratings, comments, genre_of_game) for count reviews.
+    """
+    rng = np.random.default_rng(seed)
+    game_genre = np.random.default_rng(0).integers(GENRES, size=games)
+    by_genre = np.argsort(game_genre, kind="stable")
+    offsets = np.searchsorted(game_genre[by_genre], np.arange(GENRES))
+    sizes = np.bincount(game_genre, minlength=GENRES)
+    favourites = np.random.default_rng(1).integers(GENRES, size=(users, 2))
+
+    # Skewed activity: low-numbered reviewers write far more reviews
+    user = (users * rng.random(count) ** 2).astype(np.int64)
+    pick_favourite = rng.random(count) < 0.8
+    genre = np.where(pick_favourite, favourites[user, rng.integers(2, size=count)], rng.integers(GENRES, size=count))
+    game = by_genre[offsets[genre] + (rng.random(count) * sizes[genre]).astype(np.int64)]
+    liked = (favourites[user, 0] == game_genre[game]) | (favourites[user, 1] == game_genre[game])
+    rating = np.clip(np.where(liked, rng.normal(8.5, 1.2, count), rng.normal(3.5, 1.5, count)).round(), 1, 10)
+
+    phrase = rng.integers(len(POSITIVE), size=count)
+    filler = rng.integers(len(FILLER), size=count)
+    comments = [
+        f"{(POSITIVE if r >= 6 else NEGATIVE)[p]}, {FILLER[f]}"
+        for r, p, f in zip(rating.tolist(), phrase.tolist(), filler.tolist())
+    ]
+    return (game + 1).tolist(), [f"user{u}" for u in user.tolist()], rating.astype(int).tolist(), comments, game_genre
+
+
+def seed(app, db, count, games, users, seed_value, batch_size=50000, log=print):
+    """
+    Insert count synthetic reviews. Returns each game's genre.
+    """
+    from models import Review
+
+    game_ids, names, ratings, comments, game_genre = synthetic_reviews(count, games, users, seed_value)
+    now = datetime.utcnow()
+    with app.app_context():
+        for start in range(0, count, batch_size):
+            end = min(start + batch_size, count)
+            db.session.execute(insert(Review), [{
+                "game_id": game_ids[i], "user_name": names[i], "rating": ratings[i],
+                "comment": comments[i], "date_posted": now,
+            } for i in range(start, end)])
+            db.session.commit()
+            log(f"reviews: {end}/{count}")
+    return game_genre
+
+
+def quality(app, db, game_genre):
+    """
+    Share of neighbours in the same genre (random would be ~1/GENRES) and
+    the correlation between per-game sentiment and mean rating.
+    """
+    from models import Review, GameSentiment, SimilarGame
+
+    with app.app_context():
+        pairs = np.array(db.session.execute(select(SimilarGame.game_id, SimilarGame.similar_id)).all())
+        same_genre = float(np.mean(game_genre[pairs[:, 0] - 1] == game_genre[pairs[:, 1] - 1])) if len(pairs) else None
+        rows = db.session.execute(
+            select(GameSentiment.sentiment_sum / GameSentiment.scored_count, func.avg(Review.rating))
+            .join(Review, Review.game_id == GameSentiment.game_id)
+            .where(GameSentiment.scored_count > 0)
+            .group_by(GameSentiment.game_id)
+        ).all()
+        correlation = float(np.corrcoef(np.array(rows, dtype=float).T)[0, 1]) if len(rows) > 2 else None
+    return {"neighbours_same_genre": same_genre, "sentiment_rating_correlation": correlation}
+
+
+def timed_run(app, full):
+    from games.insights import update_review_insights
+
+    with app.app_context():
+        started = time.perf_counter()
+        stats = update_review_insights(full=full)
+        stats["wall_seconds"] = round(time.perf_counter() - started, 2)
+    stats["maxrss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--incremental", type=int, default=10000, help="new reviews for the incremental run")
+    parser.add_argument("--database", help="SQLite file (default: a fresh temp file)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    database = args.database or os.path.join(tempfile.gettempdir(), f"insights-{args.reviews}.db")
+    if not args.database:
+        for path in (database, database + ".ratings.npz"):
+            if os.path.exists(path):
+                os.remove(path)
+    # Must be in place before the app (and its config) is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(database)}"
+    os.environ["REVIEW_RATINGS_CACHE"] = os.path.abspath(database) + ".ratings.npz"
+    os.environ["SLOW_QUERY_MS"] = "60000"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+
+    from server import app
+    from extensions import db
+    with app.app_context():
+        db.create_all()
+
+    started = time.perf_counter()
+    game_genre = seed(app, db, args.reviews, args.games, args.users, seed_value=42)
+    print(f"Seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+    report = {"reviews": args.reviews, "games": args.games, "users": args.users}
+    report["full"] = timed_run(app, full=True)
+    print(f"Full run: {report['full']}")
+    report["quality"] = quality(app, db, game_genre)
+    print(f"Quality: {report['quality']}")
+
+    if args.incremental:
+        seed(app, db, args.incremental, args.games, args.users, seed_value=43, log=lambda *a: None)
+        report["incremental"] = timed_run(app, full=False)
+        print(f"Incremental run ({args.incremental} new reviews): {report['incremental']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
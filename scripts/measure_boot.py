@@ -0,0 +1,164 @@
+"""
+Measure app import/boot time and gunicorn worker memory.
+
+Times a cold import of the WSGI app in fresh interpreters, then starts
+gunicorn with and without --preload and reads each process's memory from
+/proc/<pid>/smaps_rollup (Linux only). PSS splits shared pages between the
+processes mapping them, so the PSS total is the real footprint; USS is what
+each worker holds privately.
+
+    python -m scripts.measure_boot --workers 4
+    python -m scripts.measure_boot --app server:app --output boot.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+IMPORT_SNIPPET = """
+import json, resource, sys, time
+started = time.perf_counter()
+module, _, attr = sys.argv[1].partition(":")
+app = getattr(__import__(module), attr or "app")
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": len(sys.modules),
+                  "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def import_time(target, runs=5, env=None):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET, target],
+                                      env={**os.environ, **(env or {})}, text=True)
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "median_ms": round(statistics.median(s["seconds"] for s in samples) * 1000, 1),
+        "modules": samples[-1]["modules"],
+        "maxrss_mb": round(samples[-1]["maxrss_kb"] / 1024, 1),
+    }
+
+
+def memory(pid):
+    """
+    Rss/Pss/USS in MB for one process from smaps_rollup.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        "rss_mb": mb(fields.get("Rss", 0)),
+        "pss_mb": mb(fields.get("Pss", 0)),
+        "uss_mb": mb(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)),
+    }
+
+
+def children(pid):
+    kids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        kids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return kids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def gunicorn_memory(target, workers, preload, probe="/about", requests_per_worker=20, env=None):
+    """
+    Boot gunicorn, warm every worker with a few requests, then report time
+    to first response and per-process memory.
+    """
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "gunicorn", "--workers", str(workers),
+               "--bind", f"127.0.0.1:{port}", "--log-level", "warning", target]
+    if preload:
+        command.append("--preload")
+    started = time.perf_counter()
+    # gunicorn.conf.py reads GUNICORN_PRELOAD, so set it for the off case too
+    server = subprocess.Popen(command, env={**os.environ, **(env or {}), "GUNICORN_PRELOAD": str(int(preload))})
+    try:
+        while True:
+            try:
+                if requests.get(base + probe, timeout=5).status_code < 500:
+                    break
+            except requests.RequestException:
+                pass
+            if server.poll() is not None or time.perf_counter() - started > 60:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.05)
+        ready = time.perf_counter() - started
+
+        # Wait for every worker, then touch them all so lazily loaded code is in
+        while len(children(server.pid)) < workers and time.perf_counter() - started < 60:
+            time.sleep(0.05)
+        with requests.Session() as session:
+            for _ in range(workers * requests_per_worker):
+                session.get(base + probe, timeout=5)
+        time.sleep(0.5)
+
+        master = memory(server.pid)
+        worker_mem = [memory(pid) for pid in children(server.pid)]
+        return {
+            "preload": preload,
+            "workers": len(worker_mem),
+            "first_response_ms": round(ready * 1000, 1),
+            "master": master,
+            "worker_avg": {k: round(statistics.mean(w[k] for w in worker_mem), 1) for k in master},
+            "total_pss_mb": round(master["pss_mb"] + sum(w["pss_mb"] for w in worker_mem), 1),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--app", default="server:app", help="WSGI target (module:attribute)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5, help="cold imports to time")
+    parser.add_argument("--probe", default="/about")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Keep the measurement off real databases and upstream APIs
+    env = {"DATABASE_URL": os.getenv("MEASURE_DATABASE_URL", "sqlite:////tmp/measure_boot.db"),
+           "RAWG_API_KEY": "", "GIANTBOMB_API_KEY": ""}
+
+    report = {"app": args.app, "import": import_time(args.app, args.runs, env)}
+    print(f"Import {args.app}: {report['import']['median_ms']} ms, {report['import']['modules']} modules, "
+          f"{report['import']['maxrss_mb']} MB")
+    if sys.platform.startswith("linux"):
+        for preload in (False, True):
+            result = gunicorn_memory(args.app, args.workers, preload, args.probe, env=env)
+            report["preload" if preload else "no_preload"] = result
+            print(f"gunicorn {'--preload' if preload else 'no preload'}: first response "
+                  f"{result['first_response_ms']} ms, worker USS {result['worker_avg']['uss_mb']} MB, "
+                  f"PSS {result['worker_avg']['pss_mb']} MB, total PSS {result['total_pss_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
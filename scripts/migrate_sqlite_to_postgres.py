@@ -1,44 +1,269 @@
+"""
+Copy the local SQLite database into Postgres.
+
+By default every table the models define is copied, derived ones
+(rating summaries, leaderboard, insights) and batch job state included, so
+the target starts where the source left off. Create the schema first with
+`flask db upgrade`.
+
+Tables are streamed in primary-key order in chunks and written in batches
+(executemany, or COPY with --copy), several tables at a time. Progress is
+checkpointed after every batch so a failed run picks up where it stopped.
+Afterwards sequences are moved past the copied ids and every table is
+verified by row count and checksum.
+
+    DATABASE_URL=postgresql://... python -m scripts.migrate_sqlite_to_postgres
+    python -m scripts.migrate_sqlite_to_postgres --copy --workers 4 --batch-size 10000
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
 import os
-from sqlalchemy import create_engine, MetaData, Table, select
-from sqlalchemy.exc import SQLAlchemyError
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, MetaData, select, func, text, tuple_
+
+
+def default_tables():
+    """
+    Every table the app's models define, parents before children.
+    """
+    # The app's models are only needed when no --tables are given
+    from models import db
+    return [table.name for table in db.metadata.sorted_tables]
+
+
+class Checkpoint:
+    """
+    Per-table progress ({"table": {"last_pk": ..., "rows": ..., "done": ...}})
+    saved to a JSON file after every batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, table):
+        return self.state.get(table, {"last_pk": None, "rows": 0, "done": False})
+
+    def update(self, table, **values):
+        with self._lock:
+            self.state.setdefault(table, self.get(table)).update(values)
+            if self.path:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(self.state, f)
+                os.replace(tmp, self.path)
 
-# Local SQLite database
-sqlite_uri = "sqlite:///app.db"
-# Postgres from environment
-postgres_uri = os.environ.get("DATABASE_URL")
-if not postgres_uri:
-    raise RuntimeError("Please set DATABASE_URL environment variable to your Postgres DB")
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
 
-engine_sqlite = create_engine(sqlite_uri)
-engine_pg = create_engine(postgres_uri)
 
-# Create MetaData objects without bind
-meta_sqlite = MetaData()
-meta_sqlite.reflect(bind=engine_sqlite)
+def primary_key(table):
+    columns = list(table.primary_key.columns)
+    if not columns:
+        raise RuntimeError(f"{table.name}: tables without a primary key can't be copied in batches")
+    return columns
+
+
+def key_of(row, pk):
+    # Checkpointed as a plain value for single-column keys, a list otherwise
+    values = [row[c.name] for c in pk]
+    return values[0] if len(values) == 1 else values
+
+
+def after_key(pk, last_pk):
+    if len(pk) == 1:
+        return pk[0] > last_pk
+    return tuple_(*pk) > tuple_(*last_pk)
+
+
+def stream_rows(engine, table, after_pk=None, batch_size=5000, columns=None):
+    """
+    Yield lists of row dicts in primary-key order without loading the table.
+    columns limits the row to those column names.
+    """
+    pk = primary_key(table)
+    selected = [table.c[name] for name in columns] if columns else [table]
+    query = select(*selected).order_by(*pk)
+    if after_pk is not None:
+        query = query.where(after_key(pk, after_pk))
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for chunk in result.mappings().partitions(batch_size):
+            yield [dict(row) for row in chunk]
+
+
+def write_batch(conn, table, rows, use_copy=False):
+    if use_copy and conn.dialect.name == "postgresql":
+        # The source's columns: generated ones such as post.search_vector
+        # only exist on the target and are filled in by Postgres
+        columns = list(rows[0])
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+        buf.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')',
+            buf
+        )
+    else:
+        conn.execute(table.insert(), rows)
 
-meta_pg = MetaData()
-meta_pg.reflect(bind=engine_pg)
 
-def copy_table(table_name):
-    if table_name not in meta_sqlite.tables or table_name not in meta_pg.tables:
-        print(f"Skipping {table_name}, table missing")
+def copy_table(src_engine, dst_engine, src_table, dst_table, checkpoint,
+               batch_size=5000, use_copy=False, log=print):
+    """
+    Copy one table, resuming from its checkpoint. Returns rows copied in
+    this run.
+    """
+    state = dict(checkpoint.get(src_table.name))
+    if state["done"]:
+        log(f"{src_table.name}: already copied, skipping")
+        return 0
+
+    pk = primary_key(dst_table)
+    with dst_engine.begin() as dst:
+        if state["last_pk"] is None:
+            if dst.execute(select(func.count()).select_from(dst_table)).scalar():
+                raise RuntimeError(f"{dst_table.name}: target table is not empty")
+        else:
+            # Rows past the checkpoint belong to a batch whose checkpoint
+            # never got written; drop them so it can be copied again cleanly
+            dst.execute(dst_table.delete().where(after_key(pk, state["last_pk"])))
+
+    copied = 0
+    started = time.monotonic()
+    for rows in stream_rows(src_engine, src_table, state["last_pk"], batch_size):
+        with dst_engine.begin() as dst:
+            write_batch(dst, dst_table, rows, use_copy)
+        copied += len(rows)
+        checkpoint.update(src_table.name, last_pk=key_of(rows[-1], pk), rows=state["rows"] + copied)
+        elapsed = time.monotonic() - started
+        log(f"{src_table.name}: {state['rows'] + copied} rows ({copied / elapsed:,.0f} rows/s)")
+
+    checkpoint.update(src_table.name, done=True)
+    elapsed = time.monotonic() - started
+    log(f"Finished {src_table.name}: {copied} rows in {elapsed:.1f}s "
+        f"({copied / elapsed if elapsed else 0:,.0f} rows/s)")
+    return copied
+
+
+def reset_sequence(engine, table):
+    """
+    Move a Postgres serial sequence past the highest copied id.
+    """
+    if engine.dialect.name != "postgresql" or len(table.primary_key.columns) != 1:
         return
+    pk = primary_key(table)[0].name
+    with engine.begin() as conn:
+        seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": table.name, "c": pk}).scalar()
+        if seq:
+            conn.execute(text(
+                f'SELECT setval(:seq, COALESCE((SELECT MAX("{pk}") FROM "{table.name}"), 1), '
+                f'(SELECT MAX("{pk}") FROM "{table.name}") IS NOT NULL)'
+            ), {"seq": seq})
 
-    t_sql = Table(table_name, meta_sqlite, autoload_with=engine_sqlite)
-    t_pg = Table(table_name, meta_pg, autoload_with=engine_pg)
 
-    sel = select(t_sql)
-    with engine_sqlite.connect() as src, engine_pg.connect() as dst:
-        rows = src.execute(sel).mappings().all()
-        print(f"Copying {len(rows)} rows from {table_name}")
+def table_checksum(engine, table, columns, batch_size=5000):
+    """
+    Row count and a digest of columns' values, in primary-key order.
+    """
+    digest = hashlib.sha256()
+    count = 0
+    for rows in stream_rows(engine, table, batch_size=batch_size, columns=columns):
         for row in rows:
-            try:
-                dst.execute(t_pg.insert().values(**row))
-            except SQLAlchemyError as e:
-                print("  skipping row:", e)
-        dst.commit()
-    print(f"Finished {table_name}")
+            values = ["" if row[c] is None else str(row[c]) for c in columns]
+            digest.update("\x1f".join(values).encode())
+            digest.update(b"\x1e")
+            count += 1
+    return count, digest.hexdigest()
+
+
+def verify_table(src_engine, dst_engine, src_table, dst_table):
+    # Columns only the target has (generated ones) aren't part of the copy
+    columns = [c.name for c in src_table.columns]
+    src = table_checksum(src_engine, src_table, columns)
+    dst = table_checksum(dst_engine, dst_table, columns)
+    return src == dst, src, dst
+
+
+def migrate(source_url, target_url, tables=None, batch_size=5000,
+            workers=3, use_copy=False, checkpoint_path="migrate_checkpoint.json", log=print):
+    """
+    Copy tables (default: every model's table) from source_url to
+    target_url, then fix sequences and verify. Returns {table: verified}
+    for the tables that exist on both sides.
+    """
+    tables = tables or default_tables()
+    src_engine = create_engine(source_url)
+    dst_engine = create_engine(target_url)
+    meta_src = MetaData()
+    meta_src.reflect(bind=src_engine)
+    meta_dst = MetaData()
+    meta_dst.reflect(bind=dst_engine)
+
+    present = []
+    for name in tables:
+        if name not in meta_src.tables or name not in meta_dst.tables:
+            log(f"Skipping {name}, table missing")
+        else:
+            present.append(name)
+
+    checkpoint = Checkpoint(checkpoint_path)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = [
+            pool.submit(copy_table, src_engine, dst_engine, meta_src.tables[name], meta_dst.tables[name],
+                        checkpoint, batch_size, use_copy, log)
+            for name in present
+        ]
+        total = sum(f.result() for f in futures)
+    elapsed = time.monotonic() - started
+    log(f"Copied {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+
+    results = {}
+    for name in present:
+        reset_sequence(dst_engine, meta_dst.tables[name])
+        ok, src, dst = verify_table(src_engine, dst_engine, meta_src.tables[name], meta_dst.tables[name])
+        results[name] = ok
+        log(f"Verify {name}: {'OK' if ok else 'MISMATCH'} (source {src[0]} rows, target {dst[0]} rows)")
+
+    if all(results.values()):
+        checkpoint.clear()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=os.environ.get("SQLITE_URL", "sqlite:///instance/app.db"))
+    parser.add_argument("--target", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--tables", nargs="+", help="default: every table the models define")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=3, help="tables copied in parallel")
+    parser.add_argument("--copy", action="store_true", help="use Postgres COPY instead of executemany")
+    parser.add_argument("--checkpoint", default="migrate_checkpoint.json")
+    args = parser.parse_args()
+
+    if not args.target:
+        raise RuntimeError("Please set DATABASE_URL environment variable to your Postgres DB")
+
+    results = migrate(args.source, args.target, args.tables, args.batch_size,
+                      args.workers, args.copy, args.checkpoint)
+    if not all(results.values()):
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
-    for t in ["post", "contact_message", "review"]:
-        copy_table(t)
+    main()
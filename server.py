@@ -0,0 +1,17 @@
+"""
+WSGI entry point for gunicorn (see Procfile and gunicorn.conf.py).
+"""
+import logging
+from app import create_app
+from games.catalog import refresh_game_index
+
+app = create_app()
+
+# Build the game search index before serving; with preload_app the workers
+# share this copy, and each keeps it current (post_fork in gunicorn.conf.py)
+with app.app_context():
+    try:
+        refresh_game_index()
+    except Exception as e:
+        # e.g. migrations not run yet; the workers' refreshers retry
+        logging.getLogger("codecritical.catalog").exception("Game index build failed: %s", e)
@@ -0,0 +1,38 @@
+const searchInput = document.getElementById("steam-search");
+const resultsContainer = document.getElementById("steam-results");
+
+let debounceTimeout;
+let latestQuery = "";
+
+searchInput.addEventListener("input", () => {
+    clearTimeout(debounceTimeout);
+    const query = searchInput.value.trim();
+    latestQuery = query;
+    if (!query) {
+        resultsContainer.innerHTML = "";
+        return;
+    }
+
+    debounceTimeout = setTimeout(() => {
+        fetch(`/search_steam?q=${encodeURIComponent(query)}&limit=10`)
+            .then(res => res.json())
+            .then(data => {
+                // Drop responses that arrive after the user kept typing
+                if (query !== latestQuery) return;
+                resultsContainer.innerHTML = data.map(game => {
+                    const image = game.image
+                        ? `<img src="${game.image}" alt="${game.name}" class="game-image">`
+                        : "";
+                    return `
+                    <div class="game-card">
+                        ${image}
+                        <div class="game-info">
+                            <h3>${game.name || "Unknown Game"}</h3>
+                            <p>${game.price || "Free / Unknown"}</p>
+                        </div>
+                    </div>
+                `;
+                }).join('');
+            });
+    }, 300);
+});
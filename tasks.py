@@ -0,0 +1,273 @@
+"""
+Background jobs that keep upstream game data local, so request handlers
+only read the cache, the Game catalog and the stored featured list.
+
+Jobs run on an RQ queue when REDIS_URL is set (start a worker with
+`rq worker refresh --url $REDIS_URL`); otherwise InlineQueue runs them in
+the calling process, which is also what the tests use. Jobs queued by
+request handlers go through enqueue_from_request, which never runs them
+inside the request.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+from flask import current_app, has_app_context
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Review, BatchJobState
+from games.catalog import import_game_details, store_featured, upsert_games
+from utils.rate_limit import upstream_priority, BACKGROUND
+from utils.steam_api import get_featured_games, get_steam_game_details
+
+QUEUE_NAME = "refresh"
+# Enqueueing happens on page loads too; don't let a slow Redis hold them up
+REDIS_TIMEOUT = 2
+EMPTY_METRICS = {
+    "runs": 0, "failures": 0, "total_seconds": 0.0,
+    "last_duration": None, "last_success": None, "last_error": None
+}
+
+logger = logging.getLogger("codecritical.jobs")
+
+
+class InlineQueue:
+    """
+    Stand-in for rq.Queue that runs each job immediately.
+    """
+
+    name = QUEUE_NAME
+
+    def enqueue(self, func, *args, **kwargs):
+        # Like a worker, a failing job doesn't stop the ones after it
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            logger.exception("Job %s failed: %s", func.__name__, e)
+
+
+_queues = {}
+
+
+def get_queue():
+    """
+    The RQ queue on REDIS_URL, created once per process, or an InlineQueue
+    when Redis isn't configured.
+    """
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return InlineQueue()
+    if url not in _queues:
+        from redis import Redis
+        from rq import Queue
+
+        connection = Redis.from_url(url, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT)
+        _queues[url] = Queue(QUEUE_NAME, connection=connection)
+    return _queues[url]
+
+
+def enqueue_from_request(func, *args, **kwargs):
+    """
+    Queue a job from a request handler. Without Redis there's no worker, so
+    the job runs in a thread with an app context (and session) of its own:
+    the request's session may be read-only, and the page shouldn't wait.
+    """
+    queue = get_queue()
+    if not isinstance(queue, InlineQueue):
+        return queue.enqueue(func, *args, **kwargs)
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            queue.enqueue(func, *args, **kwargs)
+
+    thread = threading.Thread(target=run, name=f"job:{func.__name__}", daemon=True)
+    thread.start()
+    return thread
+
+
+_app = None
+
+
+def app_context():
+    """
+    Jobs run inside the caller's app context (CLI, tests), or in one the
+    worker process builds on first use.
+    """
+    global _app
+    if has_app_context():
+        return nullcontext()
+    if _app is None:
+        from app import create_app
+        _app = create_app()
+    return _app.app_context()
+
+
+def job_metrics(name):
+    """
+    Run count, failures and timings for a job, over every process (web,
+    RQ worker, CLI) that ran it.
+    """
+    table = BatchJobState.__table__
+    with db.engine.connect() as connection:
+        data = connection.execute(select(table.c.data).where(table.c.name == f"jobs:{name}")).scalar()
+    return {**EMPTY_METRICS, **json.loads(data)} if data else dict(EMPTY_METRICS)
+
+
+def record_run(name, duration, error=None):
+    """
+    Add one run of a job to its metrics row, in a transaction of its own.
+    """
+    try:
+        _record_run(name, duration, error)
+    except IntegrityError:
+        # Another process created the row first
+        _record_run(name, duration, error)
+
+
+def _record_run(name, duration, error):
+    table = BatchJobState.__table__
+    key = f"jobs:{name}"
+    with db.engine.begin() as connection:
+        # Touching the row first locks it, so concurrent runs don't lose counts
+        now = datetime.utcnow()
+        exists = connection.execute(update(table).where(table.c.name == key).values(updated_at=now)).rowcount
+        data = connection.execute(select(table.c.data).where(table.c.name == key)).scalar() if exists else None
+        metrics = {**EMPTY_METRICS, **json.loads(data)} if data else dict(EMPTY_METRICS)
+        metrics["runs"] += 1
+        metrics["total_seconds"] += duration
+        metrics["last_duration"] = round(duration, 3)
+        if error is None:
+            metrics["last_success"] = time.time()
+        else:
+            metrics["failures"] += 1
+            metrics["last_error"] = repr(error)
+        if exists:
+            connection.execute(update(table).where(table.c.name == key).values(data=json.dumps(metrics)))
+        else:
+            connection.execute(insert(table).values(name=key, last_id=0, data=json.dumps(metrics), updated_at=now))
+
+
+def tracked(func):
+    """
+    Record run count, failures and timings for a job in the database, where
+    `flask refresh-games --stats` sees runs from every process. Jobs make
+    their upstream requests at BACKGROUND priority.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with app_context():
+            started = time.monotonic()
+            error = None
+            try:
+                with upstream_priority(BACKGROUND):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                error = e
+                # Don't leave the failed job's transaction holding locks
+                db.session.rollback()
+                raise
+            finally:
+                try:
+                    record_run(func.__name__, time.monotonic() - started, error)
+                except Exception as e:
+                    logger.warning("Could not record metrics for %s: %s", func.__name__, e)
+
+    return wrapper
+
+
+@tracked
+def refresh_featured():
+    """
+    Fetch the featured list from Steam, add its games to the catalog and
+    store it for the home page. Returns the featured appids.
+    """
+    games = get_featured_games()
+    upsert_games({"appid": g["appid"], "name": g["name"]} for g in games)
+    store_featured(games)
+    return [g["appid"] for g in games]
+
+
+@tracked
+def refresh_game_details(appid):
+    details = get_steam_game_details.refresh(appid)
+    if details:
+        import_game_details(appid, details)
+    return details is not None
+
+
+@tracked
+def store_game_details(appid, details):
+    """
+    Save details a game page fetched from Steam, off the request path.
+    """
+    import_game_details(appid, details)
+
+
+@tracked
+def refresh_games(queue=None):
+    """
+    Refresh the featured list, then queue a details refresh for every game
+    that is featured or has reviews.
+    """
+    queue = queue or get_queue()
+    try:
+        appids = set(refresh_featured())
+    except Exception as e:
+        # Reviewed games can still be refreshed while the featured list is down
+        logger.warning("Featured list refresh failed: %s", e)
+        appids = set()
+    appids.update(game_id for (game_id,) in db.session.query(Review.game_id).distinct())
+    for appid in sorted(appids):
+        queue.enqueue(refresh_game_details, appid)
+    return len(appids)
+
+
+@tracked
+def update_review_insights(full=False):
+    """
+    Batch job behind the game page's sentiment and similar games.
+    """
+    # NumPy/SciPy/scikit-learn stay out of processes that never run it
+    from games.insights import update_review_insights as run
+    return run(full=full)
+
+
+@tracked
+def rebuild_leaderboard():
+    """
+    Periodic full recompute of the home page leaderboard.
+    """
+    from games.leaderboard import rebuild_leaderboard as run
+    return run()
+
+
+# Jobs the clock process (`flask refresh-games --every N`) queues alongside
+# refresh_games, each at most once per period (seconds)
+PERIODIC_JOBS = [
+    (rebuild_leaderboard, int(os.getenv("LEADERBOARD_REBUILD_INTERVAL", 24 * 3600))),
+    # Incremental: each run only processes reviews added since the last one
+    (update_review_insights, int(os.getenv("REVIEW_INSIGHTS_INTERVAL", 3600))),
+]
+
+
+def queue_due_jobs(queue, last_queued, now=None):
+    """
+    Queue every periodic job whose period has passed since last_queued
+    (job name -> monotonic time, updated in place). A clock that just
+    started queues all of them. Returns the names queued.
+    """
+    now = time.monotonic() if now is None else now
+    queued = []
+    for job, period in PERIODIC_JOBS:
+        name = job.__name__
+        if name in last_queued and now - last_queued[name] < period:
+            continue
+        queue.enqueue(job)
+        last_queued[name] = now
+        queued.append(name)
+    return queued
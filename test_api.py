@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, Post, Review, Game, GameSentiment
+
+
+def add_posts(app, count, start=datetime(2025, 1, 1)):
+    with app.app_context():
+        db.session.add_all(Post(title=f"Post {i}", subtitle="s", author="a", content=f"Body **{i}**",
+                                date_posted=start + timedelta(hours=i)) for i in range(count))
+        db.session.commit()
+
+
+def count_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_posts_ids_fields_and_etag(app, client):
+    add_posts(app, 5)
+    statements = count_queries(app)
+    response = client.get("/api/v1/posts?ids=3,1,99,3&fields=title,reading_minutes")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["data"] == [
+        {"id": 3, "title": "Post 2", "reading_minutes": 1},
+        {"id": 1, "title": "Post 0", "reading_minutes": 1},
+    ]
+    assert body["missing"] == [99]
+    # One IN query, selecting only the requested columns (besides the
+    # page cache's version lookup)
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "page_cache_version" not in s]
+    assert len(selects) == 1 and " IN " in selects[0].upper()
+    assert "content" not in selects[0]
+
+    again = client.get("/api/v1/posts?ids=3,1,99,3&fields=title,reading_minutes",
+                       headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+
+    assert client.get("/api/v1/posts?fields=title,secret").status_code == 400
+    assert client.get("/api/v1/posts?ids=1,x").get_json()["error"] == "Invalid id: x"
+    assert client.get("/api/v1/posts/99").status_code == 404
+    assert client.get("/api/v1/posts/2?fields=content_html").get_json()["data"] == {
+        "id": 2, "content_html": "<p>Body <strong>1</strong></p>"}
+
+
+def test_cursor_pagination_and_invalidation(app, client):
+    add_posts(app, 5)
+    first = client.get("/api/v1/posts?per_page=2&fields=title").get_json()
+    assert [p["id"] for p in first["data"]] == [5, 4]
+    assert first["data"][0] == {"id": 5, "title": "Post 4"}
+    second = client.get(f"/api/v1/posts?per_page=2&cursor={first['next_cursor']}").get_json()
+    assert [p["id"] for p in second["data"]] == [3, 2]
+    assert set(second["data"][0]) == {"id", "title", "subtitle", "author", "date_posted", "excerpt", "reading_minutes"}
+    assert second["data"][0]["date_posted"] == "2025-01-01T02:00:00"
+
+    # A new post replaces the cached body
+    add_posts(app, 1, start=datetime(2025, 2, 1))
+    assert client.get("/api/v1/posts?per_page=2&fields=title").get_json()["data"][0]["id"] == 6
+
+
+def test_reviews_and_game_summaries(app, client):
+    with app.app_context():
+        db.session.add(Game(appid=10, name="Portal", price="$9.99"))
+        db.session.add(GameSentiment(game_id=10, review_count=2, scored_count=2, sentiment_sum=0.9,
+                                     positive_count=2, negative_count=0))
+        db.session.add_all([Review(game_id=10, user_name="a", rating=9, comment="great"),
+                            Review(game_id=10, user_name="b", rating=6, comment="fine")])
+        db.session.commit()
+
+    reviews = client.get("/api/v1/games/10/reviews?fields=rating").get_json()
+    assert sorted(r["rating"] for r in reviews["data"]) == [6, 9]
+    assert reviews["next_cursor"] is None
+    assert client.get("/api/v1/reviews?ids=2&fields=user_name").get_json()["data"] == [{"id": 2, "user_name": "b"}]
+    assert client.get("/api/v1/reviews").status_code == 400
+
+    games = client.get("/api/v1/games?ids=10,11").get_json()
+    assert games["data"] == [{"appid": 10, "name": "Portal", "release_date": None, "image_url": None,
+                              "price": "$9.99", "review_count": 2, "mean_rating": 7.5, "sentiment": 0.45}]
+    assert games["missing"] == [11]
+    game = client.get("/api/v1/games/10?fields=rating_histogram").get_json()["data"]
+    assert game == {"appid": 10, "rating_histogram": [0, 0, 0, 0, 0, 1, 0, 0, 1, 0]}
@@ -0,0 +1,74 @@
+import gzip
+import os
+import brotli
+from extensions import assets
+from utils.assets import Assets
+
+
+def test_build_fingerprints_and_precompresses(app, client):
+    manifest = assets.build()
+    built = manifest["files"]["css/site.css"]
+    assert built.startswith("css/site.") and built.endswith(".css") and built != "css/site.css"
+    path = os.path.join(assets.directory, built)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "rb") as f:
+        assert gzip.decompress(f.read()) == data
+    with open(path + ".br", "rb") as f:
+        assert brotli.decompress(f.read()) == data
+    # Minified, with both stylesheets in it
+    assert len(data) < os.path.getsize(os.path.join(app.static_folder, "css/styles.css"))
+    assert b".steam-search-container" not in data
+
+    page = client.get("/").get_data(as_text=True)
+    assert f"/assets/{built}" in page
+    assert f"/assets/{manifest['files']['js/steam-search.js']}" in page
+
+
+def test_serves_precompressed_variant_for_accept_encoding(app, client):
+    built = assets.build()["files"]["js/steam-search.js"]
+    url = f"/assets/{built}"
+    raw = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert raw.headers.get("Content-Encoding") is None
+    assert "immutable" in raw.headers["Cache-Control"]
+    assert "max-age=31536000" in raw.headers["Cache-Control"]
+    assert "Accept-Encoding" in raw.headers["Vary"]
+    assert raw.mimetype in ("text/javascript", "application/javascript")
+
+    br = client.get(url, headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert br.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(br.data) == raw.data
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.data) == raw.data
+    assert len({raw.headers["ETag"], br.headers["ETag"], gz.headers["ETag"]}) == 3
+
+    again = client.get(url, headers={"Accept-Encoding": "br", "If-None-Match": br.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_unbuilt_bundles_and_rebuilds(app, client, tmp_path):
+    page = client.get("/").get_data(as_text=True)
+    assert "/assets/css/site.css" in page
+    response = client.get("/assets/css/site.css")
+    assert response.status_code == 200
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert client.get("/assets/css/missing.css").status_code == 404
+    assert client.get("/assets/../config.py").status_code == 404
+
+    # The name changes with the content; the previous build stays servable
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "a.css").write_text(".a { color: red; background: url('../img/a.png') }\n")
+    builder = Assets(directory=str(tmp_path / "dist"), static_folder=str(static),
+                     bundles={"css/a.css": ["css/a.css"]})
+    first = builder.build()["files"]["css/a.css"]
+    assert builder.bundle_source("css/a.css").count("url('/static/img/a.png')") == 1
+    (static / "css" / "a.css").write_text(".a { color: blue }\n")
+    second = builder.build()
+    assert second["files"]["css/a.css"] != first
+    assert first in second["built"]
+    assert os.path.exists(tmp_path / "dist" / first)
+    third = builder.build()
+    assert not os.path.exists(tmp_path / "dist" / first)
+    assert third["built"] == [second["files"]["css/a.css"]]
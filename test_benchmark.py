@@ -0,0 +1,45 @@
+import pytest
+from extensions import db, submission_limiter
+from models import Post, GameLeaderboard
+from utils import steam_api, rawg_api, giantbomb_api
+from scripts.benchmark import (SCENARIOS, seed, start_stub, point_providers_at,
+                               bench_in_process, percentile, compare)
+
+
+@pytest.fixture
+def bench_app(app, monkeypatch):
+    for module in (steam_api, rawg_api, giantbomb_api):
+        monkeypatch.setattr(module, "BASE_URL", module.BASE_URL)
+    monkeypatch.setattr(submission_limiter, "rate", 10 ** 9)
+    stub = start_stub(list(range(1, 21)))
+    point_providers_at(app, stub.url)
+    yield app
+    stub.stop()
+
+
+def test_in_process_run_covers_every_route(bench_app):
+    seed(bench_app, db, posts=30, reviews=60, games=20, log=lambda msg: None)
+    with bench_app.app_context():
+        # Bulk seeding still renders posts and ranks games
+        assert Post.query.filter(Post.content_html.is_(None)).count() == 0
+        assert GameLeaderboard.query.count() > 0
+    # The in-memory test database is one shared connection, so one client
+    results = bench_in_process(bench_app, SCENARIOS, requests_per_scenario=10, concurrency=1,
+                               posts=30, games=20, warmup=2, log=lambda msg: None)
+    assert set(results) == set(SCENARIOS)
+    for result in results.values():
+        assert result["requests"] == 10
+        assert result["errors"] == 0
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_percentile_and_regression_check():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+    before = {"results": {"in-process": {"home": {"p95_ms": 10.0}}}}
+    after = {"results": {"in-process": {"home": {"p95_ms": 13.0}, "post": {"p95_ms": 5.0}}}}
+    assert len(compare(before, after, threshold=0.2)) == 1
+    assert compare(before, after, threshold=0.5) == []
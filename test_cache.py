@@ -0,0 +1,65 @@
+import time
+from utils.cache import TTLCache, MemoryBackend
+
+
+def test_hit_and_miss_counters():
+    cache = TTLCache(MemoryBackend())
+    calls = []
+
+    @cache.memoize("double", ttl=60)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    assert double(2) == 4
+    assert double(2) == 4
+    assert double(3) == 6
+    assert calls == [2, 3]
+    stats = cache.stats.as_dict()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_lru_eviction():
+    cache = TTLCache(MemoryBackend(max_entries=2))
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")  # "a" is now the most recently used
+    cache.set("c", 3, ttl=60)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats.evictions == 1
+
+
+def test_stale_entry_served_while_refreshing():
+    cache = TTLCache(MemoryBackend(), stale_ttl=60)
+    values = iter(["old", "new"])
+    loader = lambda: next(values)
+
+    assert cache.get_or_load("k", loader, ttl=0.01) == "old"
+    time.sleep(0.02)
+    # Expired but inside the stale window: served immediately
+    assert cache.get_or_load("k", loader, ttl=0.01) == "old"
+    for _ in range(50):
+        if cache.stats.refreshes:
+            break
+        time.sleep(0.01)
+    assert cache.stats.stale_hits == 1
+    assert cache.stats.refreshes == 1
+    assert cache.backend.get("k")[0] == "new"
+
+
+def test_failed_refresh_keeps_stale_value():
+    cache = TTLCache(MemoryBackend(), stale_ttl=60)
+    cache.set("k", "old", ttl=0)
+
+    def broken():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_load("k", broken, ttl=10) == "old"
+    for _ in range(50):
+        if cache.stats.errors:
+            break
+        time.sleep(0.01)
+    assert cache.stats.errors == 1
+    assert cache.backend.get("k")[0] == "old"
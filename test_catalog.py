@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from datetime import datetime
+import pytest
+from conftest import TestConfig
+from app import create_app
+from utils.cache import cache
+import tasks
+from models import db, Game
+from games import catalog
+from games.catalog import game_index, upsert_games, import_catalog_dump, refresh_game_index
+from utils.search_index import SearchIndex
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    game_index.clear()
+    yield
+    game_index.clear()
+
+
+def test_index_prefix_ranking():
+    index = SearchIndex()
+    for appid, name in [(1, "Portal Stories: Mel"), (2, "Portal"), (3, "Portal 2"), (4, "Stardew Valley")]:
+        index.add(appid, name, {"appid": appid})
+    assert [d["appid"] for d in index.search("port")] == [2, 3, 1]
+    assert [d["appid"] for d in index.search("portal st")] == [1]
+    index.remove(1)
+    assert 1 not in [d["appid"] for d in index.search("portal st")]
+
+
+def test_index_trigram_fallback_for_typos():
+    index = SearchIndex()
+    index.add(1, "Stardew Valley", {"appid": 1})
+    assert [d["appid"] for d in index.search("stardwe valley")] == [1]
+
+
+def test_index_replace_swaps_contents():
+    index, built = SearchIndex(), SearchIndex()
+    index.add(1, "Portal", {"appid": 1})
+    built.add(2, "Stardew Valley", {"appid": 2})
+    built.loaded_until = datetime(2025, 1, 1)
+    index.replace(built)
+    assert index.search("portal") == []
+    assert [d["appid"] for d in index.search("stardew")] == [2]
+    assert index.loaded_until == datetime(2025, 1, 1)
+
+
+def test_catalog_import_and_local_search(app, client, tmp_path):
+    dump = tmp_path / "applist.json"
+    dump.write_text(json.dumps({"applist": {"apps": [
+        {"appid": 10, "name": "Counter-Strike"},
+        {"appid": 20, "name": "Team Fortress Classic"},
+        {"appid": 30, "name": ""},
+    ]}}))
+    with app.app_context():
+        assert import_catalog_dump(str(dump)) == 2
+        upsert_games([{"appid": 20, "name": "Team Fortress Classic", "price": "$4.99"}])
+        assert db.session.get(Game, 20).price == "$4.99"
+        refresh_game_index()
+
+    response = client.get("/search_steam?q=team fort")
+    assert response.get_json() == [{
+        "name": "Team Fortress Classic",
+        "appid": 20,
+        "image": "/img/thumb?src=https://cdn.akamai.steamstatic.com/steam/apps/20/capsule_sm_120.jpg",
+        "price": "$4.99"
+    }]
+
+
+def test_weak_typo_match_asks_steam(app, client, monkeypatch):
+    calls = []
+
+    def search_store(query, limit):
+        calls.append(query)
+        return [{"name": "Stardew Farm Simulator", "appid": 5, "image": "", "price": "$9.99"}], True
+
+    monkeypatch.setattr("games.routes.search_store", search_store)
+    game_index.add(1, "Stardew Valley", {"appid": 1, "name": "Stardew Valley", "image": ""})
+
+    # A close typo is answered locally
+    assert [r["appid"] for r in client.get("/search_steam?q=stardwe valley").get_json()] == [1]
+    assert calls == []
+    # A loose one goes to Steam
+    assert [r["appid"] for r in client.get("/search_steam?q=stardew farm").get_json()] == [5]
+    assert calls == ["stardew farm"]
+
+    # Loose local matches are still better than nothing when Steam is down
+    monkeypatch.setattr("games.routes.search_store", lambda query, limit: 1 / 0)
+    assert [r["appid"] for r in client.get("/search_steam?q=stardew farm").get_json()] == [1]
+
+
+def wait_for_jobs():
+    for thread in threading.enumerate():
+        if thread.name.startswith("job:"):
+            thread.join(5)
+
+
+def test_search_requests_never_build_the_index(app, client, monkeypatch):
+    monkeypatch.setattr("games.routes.search_store", lambda query, limit: ([], True))
+    with app.app_context():
+        upsert_games([{"appid": 10, "name": "Counter-Strike"}])
+    assert client.get("/search_steam?q=counter").get_json() == []
+    assert len(game_index) == 0
+
+    # The background refresher loads it, once per process
+    monkeypatch.setattr(catalog, "_refresher_pid", None)
+    catalog.start_game_index_refresher(app, interval=3600)
+    catalog.start_game_index_refresher(app, interval=3600)
+    assert [t.name for t in threading.enumerate()].count("game-index-refresh") == 1
+    deadline = time.monotonic() + 5
+    while not len(game_index) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r["appid"] for r in client.get("/search_steam?q=counter").get_json()] == [10]
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    # Builds its own app: pytest-flask creates the "app" fixture before
+    # other fixtures could patch the config
+    monkeypatch.setattr(TestConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(TestConfig, "SQLALCHEMY_BINDS", {"replica": f"sqlite:///{tmp_path / 'replica.db'}"})
+    monkeypatch.setattr(TestConfig, "WRITE_BEHIND_SPOOL", str(tmp_path / "write_behind.ndjson"))
+    monkeypatch.setattr(TestConfig, "IMAGE_CACHE_DIR", str(tmp_path / "image_cache"))
+    monkeypatch.setattr(TestConfig, "ASSETS_DIR", str(tmp_path / "assets"))
+    app = create_app(TestConfig)
+    cache.clear()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+    cache.clear()
+    # init_app registered the bind on the shared db; later apps don't have it
+    db.metadatas.pop("replica", None)
+
+
+def test_game_page_refresh_with_lagging_replica(replica_app, monkeypatch):
+    app = replica_app
+    with app.app_context():
+        # The replica hasn't seen the game yet
+        db.metadata.create_all(db.engines["replica"])
+        db.session.add(Game(appid=10, name="Old Name", description="Old", updated_at=datetime(2020, 1, 1)))
+        db.session.commit()
+    monkeypatch.setattr("games.catalog.get_steam_game_details", lambda appid: {
+        "name": "New Name", "description": "New", "original_release_date": "2024", "image_url": None})
+
+    response = app.test_client().get("/game/10")
+    assert response.status_code == 200
+    assert b"New Name" in response.data
+    # Without Redis the details are stored by a thread, not the request
+    wait_for_jobs()
+    with app.app_context():
+        assert tasks.job_metrics("store_game_details")["runs"] == 1
+        assert db.session.get(Game, 10).description == "New"
+        assert db.session.query(Game).count() == 1
+
+
+def test_game_page_served_when_queue_is_down(app, client, monkeypatch):
+    class DownQueue:
+        def enqueue(self, func, *args, **kwargs):
+            raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr("tasks.get_queue", DownQueue)
+    monkeypatch.setattr("games.catalog.get_steam_game_details", lambda appid: {
+        "name": "Fresh Game", "description": "New", "original_release_date": "2024", "image_url": None})
+
+    response = client.get("/game/10")
+    assert response.status_code == 200
+    assert b"Fresh Game" in response.data
+
+
+def test_game_page_does_not_write_inline(app, client, monkeypatch):
+    stored = []
+
+    def store(appid, details):
+        stored.append(threading.current_thread().name)
+
+    monkeypatch.setattr("tasks.store_game_details", store)
+    monkeypatch.setattr("games.catalog.get_steam_game_details", lambda appid: {
+        "name": "Fresh Game", "description": "New", "original_release_date": "2024", "image_url": None})
+
+    assert client.get("/game/10").status_code == 200
+    wait_for_jobs()
+    assert stored == ["job:store"]
+
+
+def test_redis_queue_created_once(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6390/0")
+    monkeypatch.setattr(tasks, "_queues", {})
+    assert tasks.get_queue() is tasks.get_queue()
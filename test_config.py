@@ -0,0 +1,61 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from config import database_url, engine_options
+from utils.db_routing import RoutingSession, read_only
+
+
+def test_database_url_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgres://user:pw@host/db")
+    assert database_url() == "postgresql://user:pw@host/db"
+    monkeypatch.delenv("DATABASE_URL")
+    assert database_url() == "sqlite:///app.db"
+
+
+def test_engine_options(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    options = engine_options("postgresql://host/db")
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"] is True
+    assert "pool_size" not in engine_options("sqlite:///app.db")
+
+
+def test_read_only_routes_use_replica(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {"replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+    db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        text = db.Column(db.String(50))
+
+    with app.app_context():
+        db.create_all()
+        # Give the replica its own copy of the table with different data
+        Note.__table__.create(db.engines["replica"])
+        with db.engines["replica"].begin() as conn:
+            conn.execute(Note.__table__.insert(), {"text": "from replica"})
+
+    @app.route("/notes", methods=["GET", "POST"])
+    @read_only
+    def notes():
+        if app.config.get("WRITE"):
+            db.session.add(Note(text="from primary"))
+            db.session.commit()
+        return ",".join(n.text for n in Note.query.all())
+
+    client = app.test_client()
+    assert client.get("/notes").data == b"from replica"
+    app.config["WRITE"] = True
+    assert client.post("/notes").data == b"from primary"
+
+    with app.app_context():
+        assert db.session.query(Note).count() == 1
+
+
+def test_sqlite_pragmas(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'wal.db'}"
+    db = SQLAlchemy(app)
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == "wal"
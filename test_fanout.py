@@ -0,0 +1,55 @@
+import time
+from flask import current_app
+from utils.fanout import fetch_all
+
+
+def test_fetch_all_respects_deadline():
+    def slow():
+        time.sleep(1)
+        return "late"
+
+    started = time.monotonic()
+    results, failed = fetch_all({
+        "fast": lambda: "ok",
+        "slow": slow,
+        "broken": lambda: 1 / 0,
+    }, deadline=0.2)
+    assert time.monotonic() - started < 0.5
+    assert results == {"fast": "ok"}
+    assert failed["slow"] == "timeout"
+    assert isinstance(failed["broken"], ZeroDivisionError)
+
+
+def test_fetch_all_runs_in_app_context(app):
+    with app.app_context():
+        results, _ = fetch_all({"name": lambda: current_app.name}, deadline=1)
+    assert results == {"name": app.name}
+
+
+def test_home_renders_partial_upcoming(app, client, monkeypatch):
+    def slow_giantbomb():
+        time.sleep(1)
+        return []
+
+    monkeypatch.setattr("blog.routes.HOME_FETCH_DEADLINE", 0.2)
+    monkeypatch.setitem(app.config, "RAWG_API_KEY", "key")
+    monkeypatch.setitem(app.config, "GIANTBOMB_API_KEY", "key")
+    monkeypatch.setattr("blog.routes.rawg_api.fetch_upcoming_games", lambda: [{"name": "Hollow Knight: Silksong", "released": "2025-09-04"}])
+    monkeypatch.setattr("blog.routes.giantbomb_api.fetch_upcoming_games", slow_giantbomb)
+    monkeypatch.setattr("blog.routes.post_feed_page", lambda cursor, per_page: ([], None))
+
+    with app.test_request_context("/?fanout-test"):
+        from blog.routes import render_home
+        html = render_home()
+    assert "Hollow Knight: Silksong" in html
+    assert "Some sources didn't respond in time." in html
+
+    # The partial page isn't cached for the home page's usual lifetime
+    monkeypatch.setattr("blog.routes.DEGRADED_PAGE_TTL", 0)
+    response = client.get("/")
+    assert b"Some sources didn't respond in time." in response.data
+    assert response.cache_control.max_age == 0
+    monkeypatch.setattr("blog.routes.giantbomb_api.fetch_upcoming_games", lambda: [])
+    response = client.get("/")
+    assert b"Some sources didn't respond in time." not in response.data
+    assert response.cache_control.max_age == 60
@@ -0,0 +1,78 @@
+import os
+import pytest
+from utils import rawg_api, giantbomb_api
+from utils.cache import cache
+from utils.game_info import (Providers, FakeProvider, SteamProvider, RawgProvider, GiantBombProvider,
+                             load_fixtures, lookups)
+from utils.rate_limit import UpstreamBudget, HostBudget
+from utils.stub_server import StubServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "providers")
+
+
+@pytest.fixture
+def fakes(app):
+    cache.clear()
+    providers = Providers([FakeProvider(cls(), load_fixtures(FIXTURES, cls.name))
+                           for cls in (SteamProvider, RawgProvider, GiantBombProvider)])
+    with app.app_context():
+        yield providers
+    cache.clear()
+
+
+def test_merges_fields_by_provider_priority(fakes):
+    dota = fakes.game_info(570)
+    assert dota.name == "Dota 2"
+    assert dota.release_date == "2013-07-09"
+    assert dota.description.startswith("Every day")
+    assert dota.platforms == ("PC", "macOS", "Linux")
+    assert dota.images[0].endswith("/570/header.jpg")
+    assert dota.sources == {"name": "steam", "description": "steam", "release_date": "steam",
+                            "images": "steam", "platforms": "rawg", "genres": "rawg"}
+
+    # Without a Steam entry the other providers fill every field
+    portal = fakes.game_info(620, known={"steam": None}, name="Portal 2")
+    assert portal.name == "Portal 2"
+    assert portal.description.startswith("Portal 2 is the sequel")
+    assert portal.release_date == "2011-04-18"
+    assert portal.sources["description"] == "giantbomb"
+    assert portal.genres == ("Adventure", "Puzzle", "Shooter")
+
+
+def test_cache_rate_limit_and_stale_fallback(fakes):
+    rawg = fakes.get("rawg")
+    # One RAWG request an hour
+    rawg.budget = UpstreamBudget(hosts={"api.rawg.io": HostBudget("rawg", 1, 3600)}, max_wait=0)
+    assert fakes.game_info(570).sources["platforms"] == "rawg"
+    assert fakes.game_info(570).sources["platforms"] == "rawg"
+    assert rawg.requests == 1
+
+    # Out of budget: a new game gets nothing from RAWG...
+    assert fakes.game_info(620).sources["platforms"] == "giantbomb"
+    assert lookups.values[("rawg", "limited")] >= 1
+    # ...and an expired one keeps its stale copy
+    key = "gameinfo:rawg:570"
+    cache.set(key, cache.peek(key), ttl=0, stale_ttl=60)
+    assert fakes.game_info(570).platforms == ("PC", "macOS", "Linux")
+
+
+def test_real_providers_search_by_name(app, monkeypatch):
+    rawg = load_fixtures(FIXTURES, "rawg")["620"]
+    giantbomb = load_fixtures(FIXTURES, "giantbomb")["620"]
+    with StubServer() as stub:
+        stub.route("/rawg/games", {"results": [{"id": 1, "name": "Portal"}, {"id": 4200, "name": "Portal 2"}]})
+        stub.route("/rawg/games/4200", rawg)
+        stub.route("/gb/games/", {"results": [{"id": 27471, "guid": "3030-27471", "name": "PORTAL 2"}]})
+        stub.route("/gb/game/3030-27471/", {"results": giantbomb})
+        monkeypatch.setattr(rawg_api, "BASE_URL", stub.url + "/rawg")
+        monkeypatch.setattr(giantbomb_api, "BASE_URL", stub.url + "/gb")
+        app.config.update(RAWG_API_KEY="key", GIANTBOMB_API_KEY="key")
+        cache.clear()
+        with app.app_context():
+            info = Providers().game_info(620, name="Portal 2", known={"steam": None})
+        cache.clear()
+    assert info.sources["genres"] == "rawg"
+    assert info.sources["description"] == "giantbomb"
+    assert "Xbox 360" in info.platforms
+    assert stub.hits("/rawg/games/4200") == 1
+    assert stub.hits("/gb/game/3030-27471/") == 1
@@ -0,0 +1,61 @@
+import pytest
+import requests
+from utils.http_client import UpstreamClient, CircuitOpenError
+from utils.stub_server import StubServer
+from utils import steam_api
+from utils.cache import cache
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+def test_retries_transient_errors(stub):
+    attempts = []
+
+    def flaky(query):
+        attempts.append(1)
+        return {"ok": len(attempts)}
+
+    stub.route("/flaky", flaky, status=503)
+    client = UpstreamClient(retries=2, backoff=0)
+    response = client.get(stub.url + "/flaky")
+    assert response.status_code == 503
+    assert stub.hits("/flaky") == 3
+
+
+def test_read_timeout(stub):
+    stub.route("/slow", {}, delay=0.5)
+    client = UpstreamClient(read_timeout=0.1, retries=0)
+    with pytest.raises(requests.Timeout):
+        client.get(stub.url + "/slow")
+
+
+def test_circuit_opens_after_failures(stub):
+    stub.route("/down", {}, status=500)
+    client = UpstreamClient(retries=0, failure_threshold=2, reset_timeout=60)
+    client.get(stub.url + "/down")
+    client.get(stub.url + "/down")
+    with pytest.raises(CircuitOpenError):
+        client.get(stub.url + "/down")
+    assert stub.hits("/down") == 2
+
+
+def test_steam_details_against_stub(stub, monkeypatch):
+    stub.route("/api/appdetails", lambda q: {q["appids"]: {"success": True, "data": {
+        "name": "Stub Game",
+        "short_description": "Offline",
+        "header_image": "http://img/header.jpg",
+        "release_date": {"date": "1 Jan, 2020"},
+    }}})
+    monkeypatch.setattr(steam_api, "BASE_URL", stub.url + "/api")
+    cache.clear()
+
+    game = steam_api.get_steam_game_details(42)
+    assert game["name"] == "Stub Game"
+    assert game["original_release_date"] == "1 Jan, 2020"
+    steam_api.get_steam_game_details(42)
+    assert stub.hits("/api/appdetails") == 1
+    cache.clear()
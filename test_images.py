@@ -0,0 +1,100 @@
+import io
+import os
+import pytest
+from PIL import Image
+from extensions import images
+from utils.stub_server import StubServer
+
+
+def png(size=(460, 215), color=(200, 40, 40)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "PNG")
+    return out.getvalue()
+
+
+def noise(size=(64, 64)):
+    out = io.BytesIO()
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(out, "PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def stub(app):
+    with StubServer() as server:
+        images.hosts.add(server.url.split("://")[1])
+        yield server
+
+
+def test_proxy_resizes_once_and_serves_immutable(client, stub):
+    stub.route("/apps/10/header.jpg", png())
+    src = stub.url + "/apps/10/header.jpg"
+
+    response = client.get("/img/thumb", query_string={"src": src}, headers={"Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "Accept" in response.headers["Vary"]
+    assert Image.open(io.BytesIO(response.data)).size == (200, 93)
+
+    jpeg = client.get("/img/thumb", query_string={"src": src})
+    assert jpeg.mimetype == "image/jpeg"
+    again = client.get("/img/thumb", query_string={"src": src}, headers={"If-None-Match": jpeg.headers["ETag"]})
+    assert again.status_code == 304
+    assert stub.hits("/apps/10/header.jpg") == 1
+
+
+def test_missing_image_falls_back_to_placeholder(app, client, stub):
+    src = stub.url + "/apps/20/header.jpg"
+    response = client.get("/img/carousel", query_string={"src": src})
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert "immutable" not in response.headers["Cache-Control"]
+
+    # Pages now link the placeholder directly, and the upstream isn't asked again
+    with app.test_request_context():
+        assert images.url_for(src, "carousel") == "/static/img/placeholder.png"
+    client.get("/img/carousel", query_string={"src": src})
+    assert stub.hits("/apps/20/header.jpg") == 1
+
+
+def test_expired_missing_image_is_proxied_again(app, client, stub):
+    src = stub.url + "/apps/30/header.jpg"
+    client.get("/img/carousel", query_string={"src": src})
+    with app.test_request_context():
+        assert images.url_for(src, "carousel") == "/static/img/placeholder.png"
+
+    # After IMAGE_MISSING_TTL the page links the proxy, which asks again
+    old = os.path.getmtime(images._pointer_path(src)) - images.missing_ttl - 1
+    os.utime(images._pointer_path(src), (old, old))
+    with app.test_request_context():
+        assert images.url_for(src, "carousel").startswith("/img/carousel?src=")
+    stub.route("/apps/30/header.jpg", png())
+    assert "immutable" in client.get("/img/carousel", query_string={"src": src}).headers["Cache-Control"]
+    assert stub.hits("/apps/30/header.jpg") == 2
+
+
+def test_placeholder_type_follows_the_file(app, client, stub, tmp_path, monkeypatch):
+    placeholder = tmp_path / "placeholder.png"
+    Image.new("RGB", (4, 4)).save(placeholder, "PNG")
+    monkeypatch.setattr(images, "placeholder", str(placeholder))
+    response = client.get("/img/thumb", query_string={"src": stub.url + "/apps/20/header.jpg"})
+    assert response.mimetype == "image/png"
+
+
+def test_unknown_hosts_are_not_proxied(app, client):
+    src = "https://example.com/a.jpg"
+    assert client.get("/img/thumb", query_string={"src": src}).status_code == 404
+    with app.test_request_context():
+        assert images.url_for(src, "thumb") == src
+
+
+def test_cache_evicts_least_recently_used(app, stub):
+    # Noise doesn't compress, so each original is ~12 KB
+    images.max_bytes = 40000
+    digests = []
+    for appid in range(6):
+        stub.route(f"/apps/{appid}/header.jpg", noise())
+        digests.append(images.original(f"{stub.url}/apps/{appid}/header.jpg"))
+    assert images._disk_usage() <= 40000
+    assert not os.path.exists(images._path("orig", digests[0]))
+    assert os.path.exists(images._path("orig", digests[-1]))
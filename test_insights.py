@@ -0,0 +1,70 @@
+import os
+from datetime import datetime
+from models import db, Review, Game, GameSentiment, SimilarGame, BatchJobState
+from games.insights import update_review_insights, SentimentScorer
+
+
+def add_reviews(rows):
+    db.session.add_all(
+        Review(game_id=game_id, user_name=user, rating=rating, comment=comment, date_posted=datetime.utcnow())
+        for game_id, user, rating, comment in rows
+    )
+    db.session.commit()
+
+
+def similar_lists():
+    return [(r.game_id, r.rank, r.similar_id, r.co_reviewers)
+            for r in SimilarGame.query.order_by(SimilarGame.game_id, SimilarGame.rank)]
+
+
+def test_sentiment_scores_handle_negation():
+    scores = SentimentScorer().score(["Great fun, amazing story", "not good at all, boring", "It exists", None])
+    assert scores[0] > 0.3
+    assert scores[1] < 0
+    assert scores[2] != scores[2] and scores[3] != scores[3]  # NaN: no sentiment words
+
+
+def test_incremental_run_matches_full_rebuild(app):
+    with app.app_context():
+        db.session.add_all([Game(appid=1, name="Alpha"), Game(appid=2, name="Beta")])
+        add_reviews([
+            (1, "ann", 9, "Great game, beautiful art"),
+            (2, "ann", 9, "Excellent and fun"),
+            (1, "bob", 8, "Really good"),
+            (2, "bob", 9, "Wonderful"),
+            (3, "cat", 2, "Boring and bad"),
+            (1, "cat", 3, "not good"),
+        ])
+        stats = update_review_insights()
+        assert stats["reviews"] == 6 and stats["games"] == 3
+        assert db.session.get(GameSentiment, 1).label in ("Positive", "Very positive")
+        assert db.session.get(GameSentiment, 3).mean < 0
+        assert SimilarGame.query.filter_by(game_id=1, rank=1).one().similar_id == 2
+
+        add_reviews([(3, "dan", 9, "Amazing"), (2, "dan", 2, "Terrible"), (3, "ann", 8, "Good")])
+        stats = update_review_insights()
+        assert stats["reviews"] == 3
+        assert db.session.get(BatchJobState, "review_insights").last_id == 9
+        assert db.session.get(GameSentiment, 3).review_count == 3
+
+        # Without the saved ratings the job reads the older reviews again
+        os.remove(app.config["REVIEW_RATINGS_CACHE"])
+        add_reviews([(1, "dan", 7, "Fine"), (2, "cat", 1, "Dreadful")])
+        assert update_review_insights()["reviews"] == 2
+        incremental = similar_lists()
+
+        assert update_review_insights()["reviews"] == 0
+        update_review_insights(full=True)
+        assert similar_lists() == incremental
+
+
+def test_game_page_shows_precomputed_insights(app, client, monkeypatch):
+    monkeypatch.setattr("games.routes.load_game", lambda appid: {"name": f"Game {appid}", "image_url": None})
+    with app.app_context():
+        add_reviews([(1, "ann", 9, "Great"), (2, "ann", 9, "Great"), (1, "bob", 9, "Lovely"), (2, "bob", 8, "Nice")])
+        update_review_insights()
+
+    page = client.get("/game/1").get_data(as_text=True)
+    assert "Similar Games" in page
+    assert "/game/2" in page
+    assert "Review sentiment" in page
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import event, select
+from models import (db, Review, Game, GameLeaderboard, leaderboard_params, leaderboard_velocity,
+                    add_review_to_leaderboard)
+from games.leaderboard import rebuild_leaderboard, top_rated, trending
+
+NOW = datetime(2026, 10, 1)
+
+
+def add_reviews(rows):
+    db.session.add_all(
+        Review(game_id=game_id, user_name=f"user{i}", rating=rating, comment="", date_posted=NOW - timedelta(days=days))
+        for i, (game_id, rating, days) in enumerate(rows)
+    )
+    db.session.commit()
+
+
+def now_ts():
+    return NOW.replace(tzinfo=timezone.utc).timestamp()
+
+
+def test_incremental_updates_rank_by_bayesian_average(app):
+    with app.app_context():
+        db.session.add_all([Game(appid=1, name="Alpha"), Game(appid=2, name="Beta"), Game(appid=3, name="Gamma")])
+        # One perfect score doesn't beat a steady run of nines
+        add_reviews([(1, 10, 0)] + [(2, 9, 30)] * 6 + [(3, 4, 1)] * 3)
+        row = db.session.get(GameLeaderboard, 2)
+        assert (row.review_count, row.rating_sum) == (6, 54)
+        # Default prior: 5.5 worth 5 reviews
+        assert row.score == pytest.approx((5.5 * 5 + 54) / 11)
+        assert db.session.get(GameLeaderboard, 1).score == pytest.approx((5.5 * 5 + 10) / 6)
+        assert [r[0] for r in top_rated(min_reviews=1)] == [2, 1, 3]
+        assert [r[0] for r in top_rated()] == [2, 3]
+
+        # Three reviews from yesterday outweigh six from a month ago
+        assert [r[0] for r in trending()] == [3, 1, 2]
+
+
+def test_rebuild_matches_incremental_velocity(app):
+    with app.app_context():
+        add_reviews([(1, 8, 2), (1, 6, 9), (2, 9, 0), (2, 7, 20), (3, 3, 40)])
+        epoch = leaderboard_params(db.session.connection())["epoch"]
+        incremental = {r.game_id: leaderboard_velocity(r.trend, epoch, now_ts()) for r in GameLeaderboard.query}
+
+        stats = rebuild_leaderboard(now=now_ts())
+        assert stats == {"games": 3, "reviews": 5, "seconds": stats["seconds"]}
+        params = leaderboard_params(db.session.connection())
+        assert params["prior_mean"] == pytest.approx(6.6)
+        assert params["prior_weight"] == 2
+        assert params["epoch"] == now_ts()
+        rebuilt = {r.game_id: r for r in GameLeaderboard.query}
+        for game_id, velocity in incremental.items():
+            assert leaderboard_velocity(rebuilt[game_id].trend, now_ts(), now_ts()) == pytest.approx(velocity)
+        assert rebuilt[2].score == pytest.approx((6.6 * 2 + 16) / 4)
+
+        # Later reviews build on the recomputed prior and epoch
+        add_reviews([(3, 9, 0)])
+        assert db.session.get(GameLeaderboard, 3).score == pytest.approx((6.6 * 2 + 12) / 4)
+        assert db.session.get(GameLeaderboard, 3).trend == pytest.approx(1 + 2 ** (-40 / 7))
+
+
+def test_undated_reviews_dont_trend(app):
+    with app.app_context():
+        # Imported reviews may have no date: they count, but not as trending
+        add_reviews([(1, 8, 1), (1, 6, 3)])
+        Review.query.filter_by(rating=6).update({"date_posted": None})
+        db.session.commit()
+        rebuild_leaderboard(now=now_ts())
+        trend = db.session.get(GameLeaderboard, 1).trend
+        assert trend == pytest.approx(2 ** (-1 / 7))
+
+        # Folding one in incrementally (as a rebuild does with late reviews)
+        # follows the same rule
+        undated = db.session.execute(select(Review.__table__).where(Review.rating == 6)).one()
+        add_review_to_leaderboard(None, db.session.connection(), undated)
+        db.session.commit()
+        row = db.session.get(GameLeaderboard, 1)
+        assert row.review_count == 3
+        assert row.trend == pytest.approx(trend)
+
+def test_fragment_route_and_home_page(app, client):
+    with app.app_context():
+        db.session.add(Game(appid=7, name="Seven Seas"))
+        add_reviews([(7, 9, 0)] * 3)
+        engine = db.engine
+
+    page = client.get("/leaderboard?limit=5")
+    assert page.status_code == 200
+    html = page.get_data(as_text=True)
+    assert "Top Rated" in html and "Seven Seas" in html and "Trending This Week" in html
+
+    # Served from the cache until a review changes the lists
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert client.get("/leaderboard?limit=5").get_data(as_text=True) == html
+    assert not [s for s in statements if "game_leaderboard" in s]
+
+    with app.app_context():
+        db.session.add(Game(appid=8, name="Eight Bells"))
+        add_reviews([(8, 10, 0)] * 3)
+    assert "Eight Bells" in client.get("/leaderboard?limit=5").get_data(as_text=True)
+    assert "Eight Bells" in client.get("/").get_data(as_text=True)
@@ -0,0 +1,64 @@
+import ipaddress
+import logging
+from models import db, Post
+from utils import metrics
+from utils.http_client import UpstreamClient
+from utils.stub_server import StubServer
+
+
+def test_metrics_endpoint_reports_routes_queries_and_templates(app, client):
+    with app.app_context():
+        post = Post(title='Metrics', subtitle='Sub', author='Tester', content='Body')
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    client.get(f'/post/{post_id}')
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'http_request_duration_seconds_count{route="/post/<int:post_id>",method="GET",status="200"}' in body
+    assert 'db_queries_per_request_count{route="/post/<int:post_id>"}' in body
+    assert 'template_render_seconds_count{template="post.html"}' in body
+    assert 'cache_hit_ratio' in body
+
+
+def test_upstream_calls_counted_per_provider():
+    with StubServer() as stub:
+        stub.route("/ok", {})
+        stub.route("/down", {}, status=500)
+        client = UpstreamClient(retries=0)
+        client.get(stub.url + "/ok")
+        client.get(stub.url + "/down")
+        host = stub.url.split("//", 1)[1]
+
+    assert metrics.upstream_requests.values[(host, "ok")] >= 1
+    assert metrics.upstream_requests.values[(host, "error")] >= 1
+
+
+def test_profiler_requires_token(app, client):
+    app.config['PROFILER_TOKEN'] = 'secret'
+    assert b'cumulative' not in client.get('/about', headers={'X-Profile': 'wrong'}).data
+
+    response = client.get('/about', headers={'X-Profile': 'secret'})
+    assert response.mimetype == 'text/plain'
+    assert b'cumulative' in response.data
+
+
+def test_metrics_only_for_allowed_clients_or_token(app):
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    remote = app.test_client()
+    remote.environ_base['REMOTE_ADDR'] = '203.0.113.7'
+    for path in ('/metrics', '/cache/stats'):
+        assert remote.get(path).status_code == 404
+        assert remote.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 404
+        assert remote.get(path, headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+    # Localhost is allowed by default
+    assert app.test_client().get('/metrics').status_code == 200
+    assert metrics.allow_ips('10.0.0.0/8, ::1') == [ipaddress.ip_network('10.0.0.0/8'), ipaddress.ip_network('::1')]
+
+
+def test_slow_queries_logged(client, monkeypatch, caplog):
+    monkeypatch.setenv("SLOW_QUERY_MS", "0")
+    with caplog.at_level(logging.WARNING, logger="codecritical.sql"):
+        client.get('/feed.json')
+    assert any("Slow query" in r.getMessage() for r in caplog.records)
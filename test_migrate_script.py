@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, insert, select, func
+from datetime import datetime
+from scripts.migrate_sqlite_to_postgres import migrate, Checkpoint, default_tables
+
+
+def make_db(path, rows=0):
+    engine = create_engine(f"sqlite:///{path}")
+    meta = MetaData()
+    post = Table("post", meta,
+                 Column("id", Integer, primary_key=True),
+                 Column("title", String(150)),
+                 Column("date_posted", DateTime))
+    meta.create_all(engine)
+    if rows:
+        with engine.begin() as conn:
+            conn.execute(insert(post), [
+                {"id": i, "title": f"Post {i}", "date_posted": datetime(2025, 1, 1 + i % 28)}
+                for i in range(1, rows + 1)
+            ])
+    return engine, post
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_streaming_copy_verifies(tmp_path):
+    make_db(tmp_path / "src.db", rows=250)
+    dst, post = make_db(tmp_path / "dst.db")
+    results = migrate(f"sqlite:///{tmp_path / 'src.db'}", f"sqlite:///{tmp_path / 'dst.db'}",
+                      tables=["post", "missing"], batch_size=100, workers=1,
+                      checkpoint_path=str(tmp_path / "ckpt.json"), log=lambda msg: None)
+    assert results == {"post": True}
+    assert count(dst, post) == 250
+    assert not (tmp_path / "ckpt.json").exists()
+
+
+def test_failed_run_resumes_from_checkpoint(tmp_path):
+    make_db(tmp_path / "src.db", rows=250)
+    dst, post = make_db(tmp_path / "dst.db")
+    ckpt = str(tmp_path / "ckpt.json")
+
+    def crash_after_first_batch(msg):
+        if "rows/s" in msg and not msg.startswith("Finished"):
+            raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        migrate(f"sqlite:///{tmp_path / 'src.db'}", f"sqlite:///{tmp_path / 'dst.db'}", tables=["post"],
+                batch_size=100, workers=1, checkpoint_path=ckpt, log=crash_after_first_batch)
+    assert Checkpoint(ckpt).get("post")["last_pk"] == 100
+    assert count(dst, post) == 100
+
+    results = migrate(f"sqlite:///{tmp_path / 'src.db'}", f"sqlite:///{tmp_path / 'dst.db'}", tables=["post"],
+                      batch_size=100, workers=1, checkpoint_path=ckpt, log=lambda msg: None)
+    assert results == {"post": True}
+    assert count(dst, post) == 250
+
+
+def test_default_tables_cover_every_model():
+    tables = default_tables()
+    for name in ("post", "review", "featured_game", "game_leaderboard", "game_sentiment",
+                 "batch_job_state", "similar_game", "page_cache_version"):
+        assert name in tables
+
+
+def test_composite_primary_key_resumes(tmp_path):
+    def make(path, rows=0):
+        engine = create_engine(f"sqlite:///{path}")
+        meta = MetaData()
+        similar = Table("similar_game", meta,
+                        Column("game_id", Integer, primary_key=True, autoincrement=False),
+                        Column("rank", Integer, primary_key=True, autoincrement=False),
+                        Column("similar_id", Integer))
+        meta.create_all(engine)
+        if rows:
+            with engine.begin() as conn:
+                conn.execute(insert(similar), [{"game_id": i // 10, "rank": i % 10, "similar_id": i}
+                                               for i in range(rows)])
+        return engine, similar
+
+    make(tmp_path / "src.db", rows=250)
+    dst, similar = make(tmp_path / "dst.db")
+    ckpt = str(tmp_path / "ckpt.json")
+
+    def crash_after_first_batch(msg):
+        if "rows/s" in msg and not msg.startswith("Finished"):
+            raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        migrate(f"sqlite:///{tmp_path / 'src.db'}", f"sqlite:///{tmp_path / 'dst.db'}", tables=["similar_game"],
+                batch_size=100, workers=1, checkpoint_path=ckpt, log=crash_after_first_batch)
+    assert Checkpoint(ckpt).get("similar_game")["last_pk"] == [9, 9]
+
+    results = migrate(f"sqlite:///{tmp_path / 'src.db'}", f"sqlite:///{tmp_path / 'dst.db'}",
+                      tables=["similar_game"], batch_size=100, workers=1, checkpoint_path=ckpt,
+                      log=lambda msg: None)
+    assert results == {"similar_game": True}
+    assert count(dst, similar) == 250
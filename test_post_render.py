@@ -0,0 +1,66 @@
+from models import db, Post, rerender_posts
+from utils import post_render
+
+BODY = """Intro paragraph with **bold** text.
+
+```python
+def hello():
+    return "hi"
+```
+
+<script>alert("x")</script>
+<a href="https://example.com" onclick="steal()">link</a>
+"""
+
+
+def test_new_post_is_rendered_on_save(app, client):
+    client.post("/new", data={"title": "T", "subtitle": "S", "author": "A", "content": BODY})
+    with app.app_context():
+        post = Post.query.one()
+        assert "<strong>bold</strong>" in post.content_html
+        assert 'class="codehilite"' in post.content_html
+        assert "<script" not in post.content_html
+        assert "onclick" not in post.content_html
+        assert 'rel="noopener noreferrer"' in post.content_html
+        # Code stays out of the excerpt and the reading time
+        assert post.excerpt == "Intro paragraph with bold text. link"
+        assert post.word_count == 6
+        assert post.reading_minutes == 1
+        assert post.content_hash == post_render.content_hash(BODY)
+        post_id = post.id
+
+    page = client.get(f"/post/{post_id}").get_data(as_text=True)
+    assert 'class="codehilite"' in page
+    assert "alert(" not in page
+    assert "Intro paragraph with bold text. link" in client.get("/").get_data(as_text=True)
+
+
+def test_edit_rerenders_changed_content(app, client):
+    with app.app_context():
+        post = Post(title="T", author="A", content=" ".join(["word"] * 500))
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        assert post.reading_minutes == 3
+        assert post.excerpt.endswith("…") and len(post.excerpt) <= post_render.EXCERPT_LENGTH + 1
+
+    client.post(f"/edit/{post_id}", data={"title": "T2", "subtitle": "", "content": "Short *now*"})
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        assert post.content_html == "<p>Short <em>now</em></p>"
+        assert post.word_count == 2
+
+
+def test_render_posts_command_fills_stale_posts(app, monkeypatch):
+    with app.app_context():
+        db.session.add_all([Post(title=f"T{i}", author="A", content=f"Post {i}") for i in range(3)])
+        db.session.commit()
+        assert rerender_posts() == 0
+
+    # A pipeline change invalidates every stored render
+    monkeypatch.setattr(post_render, "RENDER_VERSION", "test")
+    result = app.test_cli_runner().invoke(args=["render-posts"])
+    assert "Rendered 3 posts" in result.output
+    with app.app_context():
+        assert rerender_posts() == 0
+        assert rerender_posts(force=True) == 3
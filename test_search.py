@@ -0,0 +1,49 @@
+import threading
+import pytest
+from utils import steam_api
+from utils.cache import cache
+from utils.stub_server import StubServer
+
+ITEMS = [
+    {"id": 1, "name": "ELDEN RING", "tiny_image": "a.jpg", "price": {"final_formatted": "$59.99"}},
+    {"id": 2, "name": "Elden Legends", "tiny_image": "b.jpg"},
+    {"id": 3, "name": "Eldest Souls", "tiny_image": "c.jpg"},
+]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with StubServer() as server:
+        server.route("/api/storesearch/", {"items": ITEMS}, delay=0.1)
+        monkeypatch.setattr(steam_api, "BASE_URL", server.url + "/api")
+        cache.clear()
+        yield server
+        cache.clear()
+
+
+def test_concurrent_queries_are_coalesced(stub):
+    threads = [threading.Thread(target=steam_api.search_store, args=("Elden",)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stub.hits("/api/storesearch/") == 1
+
+
+def test_prefix_answers_while_upstream_loads(stub):
+    steam_api.search_store("elden")
+    results, complete = steam_api.search_store("Elden  R")
+    assert not complete
+    assert [r["appid"] for r in results] == [1]
+
+
+def test_search_route_limit_and_etag(stub, client):
+    response = client.get("/search_steam?q=eld&limit=2")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
+    assert "max-age=300" in response.headers["Cache-Control"]
+
+    etag = response.headers["ETag"]
+    again = client.get("/search_steam?q=eld&limit=2", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert stub.hits("/api/storesearch/") == 1
@@ -0,0 +1,101 @@
+import pytest
+from models import db, Game, Review, BatchJobState
+from utils import steam_api
+from utils.cache import cache
+from utils.stub_server import StubServer
+import tasks
+
+
+def appdetails(query):
+    appid = query["appids"]
+    if appid == "404":
+        return {appid: {"success": False}}
+    return {appid: {"success": True, "data": {
+        "name": f"Game {appid}",
+        "short_description": f"About {appid}",
+        "header_image": f"http://img/{appid}.jpg",
+        "release_date": {"date": "2024"},
+    }}}
+
+
+@pytest.fixture
+def stub(app, monkeypatch):
+    with StubServer() as server:
+        server.route("/api/featuredcategories", {
+            "specials": {"items": [{"id": 10, "name": "Game 10", "discount_percent": 50}]},
+            "new_releases": {"items": [{"id": 20, "name": "Game 20"}]},
+        })
+        server.route("/api/appdetails", appdetails)
+        monkeypatch.setattr(steam_api, "BASE_URL", server.url + "/api")
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        yield server
+
+
+def test_refresh_games_fills_catalog_and_cache(app, client, stub):
+    with app.app_context():
+        db.session.add(Review(game_id=30, user_name="Tester", rating=8))
+        db.session.add(Review(game_id=404, user_name="Tester", rating=1))
+        db.session.commit()
+
+    with app.app_context():
+        assert tasks.refresh_games() == 4
+
+    with app.app_context():
+        assert db.session.get(Game, 30).description == "About 30"
+        assert db.session.get(Game, 10).image_url == "http://img/10.jpg"
+        assert db.session.get(Game, 404) is None
+
+    metrics = tasks.job_metrics("refresh_game_details")
+    assert metrics["runs"] == 4
+    assert metrics["failures"] == 0
+    assert tasks.job_metrics("refresh_games")["last_success"] is not None
+
+    # The home page shows the stored list without going upstream, even
+    # with nothing left in this process's cache
+    cache.clear()
+    hits = stub.hits("/api/featuredcategories")
+    html = client.get("/").get_data(as_text=True)
+    assert html.index("Game 10") < html.index("Game 20")
+    assert stub.hits("/api/featuredcategories") == hits
+
+
+def test_refresh_games_cli(app, stub):
+    result = app.test_cli_runner().invoke(args=["refresh-games"])
+    assert "Refreshed 2 games" in result.output
+    result = app.test_cli_runner().invoke(args=["refresh-games", "--stats"])
+    assert '"runs": 1' in result.output
+
+
+@tasks.tracked
+def failing_job():
+    raise RuntimeError("Steam is down")
+
+
+def test_job_metrics_shared_through_the_database(app):
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            failing_job()
+    # Nothing is kept in this process: --stats in another one sees the run
+    cache.clear()
+    with app.app_context():
+        metrics = tasks.job_metrics("failing_job")
+        assert db.session.get(BatchJobState, "jobs:failing_job") is not None
+    assert metrics["runs"] == 1 and metrics["failures"] == 1
+    assert "Steam is down" in metrics["last_error"]
+
+
+def test_clock_queues_periodic_jobs_when_due(monkeypatch):
+    class RecordingQueue:
+        def __init__(self):
+            self.jobs = []
+
+        def enqueue(self, func, *args, **kwargs):
+            self.jobs.append(func.__name__)
+
+    monkeypatch.setattr(tasks, "PERIODIC_JOBS", [(tasks.rebuild_leaderboard, 86400),
+                                                 (tasks.update_review_insights, 3600)])
+    queue, last_queued = RecordingQueue(), {}
+    assert tasks.queue_due_jobs(queue, last_queued, now=0) == ["rebuild_leaderboard", "update_review_insights"]
+    assert tasks.queue_due_jobs(queue, last_queued, now=3000) == []
+    assert tasks.queue_due_jobs(queue, last_queued, now=3600) == ["update_review_insights"]
+    assert queue.jobs == ["rebuild_leaderboard", "update_review_insights", "update_review_insights"]
@@ -0,0 +1,151 @@
+import gzip
+import json
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy.exc import IntegrityError
+from conftest import TestConfig
+from app import create_app
+from models import db, Post, Review, ContactMessage, GameRatingSummary, GameLeaderboard
+from transfer import TABLES, import_rows
+
+
+def seed():
+    db.session.add_all([
+        Post(title="Über café", subtitle=None, author="a", content="Body **one**", date_posted=datetime(2025, 1, 1)),
+        Post(title="Two, \"quoted\"", subtitle="line\nbreak", author="b", content="x", date_posted=datetime(2025, 3, 1)),
+    ])
+    db.session.add_all([Review(game_id=10, user_name=f"u{i}", rating=i + 5, comment=None if i else "\\N",
+                               date_posted=datetime(2025, 5, i + 1)) for i in range(3)])
+    db.session.add_all([ContactMessage(name="n", email="n@example.com", subject=f"s{i}", message="m",
+                                       date_sent=datetime(2025, 6, 1 + i * 10)) for i in range(3)])
+    db.session.commit()
+
+
+def snapshot(table_name):
+    table = TABLES[table_name][0].__table__
+    return [tuple(row) for row in db.session.execute(table.select().order_by(table.c.id))]
+
+
+def clear():
+    for model in (Post, Review, ContactMessage, GameRatingSummary, GameLeaderboard):
+        db.session.query(model).delete()
+    db.session.commit()
+
+
+def round_trip(app, tmp_path, name, *export_args):
+    runner = app.test_cli_runner()
+    with app.app_context():
+        seed()
+        before = {table: snapshot(table) for table in TABLES}
+    for table in TABLES:
+        result = runner.invoke(args=["export", table, str(tmp_path / f"{table}{name}"), *export_args])
+        assert result.exit_code == 0, result.output
+        assert f"Finished export {table}: {len(before[table])} rows" in result.output
+    with app.app_context():
+        clear()
+    for table in TABLES:
+        result = runner.invoke(args=["import", table, str(tmp_path / f"{table}{name}"), *export_args])
+        assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert {table: snapshot(table) for table in TABLES} == before
+        # Derived tables are rebuilt from the imported reviews
+        assert db.session.get(GameRatingSummary, 10).review_count == 3
+        assert db.session.get(GameLeaderboard, 10).rating_sum == 18
+        # New rows continue after the imported ids
+        db.session.add(Post(title="Next", author="a", content="x"))
+        db.session.commit()
+        assert db.session.query(db.func.max(Post.id)).scalar() == 3
+
+
+@pytest.mark.parametrize("name, args", [(".ndjson.gz", []), (".csv", []), (".out", ["--format", "csv", "--gzip"])])
+def test_round_trip_sqlite(app, tmp_path, name, args):
+    round_trip(app, tmp_path, name, *args)
+    if name == ".ndjson.gz":
+        with gzip.open(tmp_path / "post.ndjson.gz", "rt", encoding="utf-8") as f:
+            first = json.loads(f.readline())
+        assert first["title"] == "Über café" and first["subtitle"] is None
+        assert first["date_posted"] == "2025-01-01T00:00:00"
+
+
+def test_date_filter_and_upsert(app, tmp_path):
+    runner = app.test_cli_runner()
+    path = str(tmp_path / "messages.csv")
+    with app.app_context():
+        seed()
+    result = runner.invoke(args=["export", "contact_message", path, "--since", "2025-06-05", "--until", "2025-06-30"])
+    assert result.exit_code == 0, result.output
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("id,name,email,subject")
+    assert [line.split(",")[3] for line in lines[1:]] == ["s1", "s2"]
+
+    # Existing ids fail a plain import and are replaced by an upsert
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join([lines[0]] + [line.replace(",m,", ",edited,") for line in lines[1:]]) + "\n")
+    assert runner.invoke(args=["import", "contact_message", path]).exit_code != 0
+    result = runner.invoke(args=["import", "contact_message", path, "--upsert", "--batch-size", "1"])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert [m.message for m in ContactMessage.query.order_by(ContactMessage.id)] == ["m", "edited", "edited"]
+
+
+def upsert_posts(app, client, tmp_path):
+    """
+    Replace a post whose page is cached with an edited copy via import --upsert.
+    """
+    runner = app.test_cli_runner()
+    with app.app_context():
+        seed()
+        post_id = Post.query.filter_by(author="b").one().id
+    assert b"quoted" in client.get(f"/post/{post_id}").data
+    assert client.get(f"/api/v1/posts/{post_id}").get_json()["data"]["title"] == 'Two, "quoted"'
+
+    path = tmp_path / "posts.ndjson"
+    assert runner.invoke(args=["export", "post", str(path)]).exit_code == 0
+    path.write_text(path.read_text(encoding="utf-8").replace('Two, \\"quoted\\"', "Renamed"), encoding="utf-8")
+    result = runner.invoke(args=["import", "post", str(path), "--upsert"])
+    assert result.exit_code == 0, result.output
+
+    assert b"Renamed" in client.get(f"/post/{post_id}").data
+    assert client.get(f"/api/v1/posts/{post_id}").get_json()["data"]["title"] == "Renamed"
+
+
+def test_upsert_invalidates_cached_posts(app, client, tmp_path):
+    upsert_posts(app, client, tmp_path)
+
+
+# CI runs these against a Postgres service container
+@pytest.fixture
+def postgres_app(tmp_path, monkeypatch):
+    if not os.getenv("TEST_POSTGRES_URL"):
+        pytest.skip("set TEST_POSTGRES_URL to a scratch Postgres database")
+    monkeypatch.setattr(TestConfig, "SQLALCHEMY_DATABASE_URI", os.environ["TEST_POSTGRES_URL"])
+    for setting in ("WRITE_BEHIND_SPOOL", "IMAGE_CACHE_DIR", "REVIEW_RATINGS_CACHE", "ASSETS_DIR"):
+        monkeypatch.setattr(TestConfig, setting, str(tmp_path / setting.lower()))
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def test_round_trip_postgres(postgres_app, tmp_path):
+    round_trip(postgres_app, tmp_path, ".ndjson.gz")
+
+
+def test_upsert_postgres(postgres_app, tmp_path):
+    upsert_posts(postgres_app, postgres_app.test_client(), tmp_path)
+
+
+def test_failed_batch_rolls_back_postgres(postgres_app):
+    with postgres_app.app_context():
+        seed()
+        taken = dict(db.session.execute(ContactMessage.__table__.select().limit(1)).mappings().one())
+        with pytest.raises(IntegrityError):
+            import_rows("contact_message", [taken])
+        # The session isn't left in Postgres' aborted transaction
+        assert db.session.query(ContactMessage).count() == 3
@@ -0,0 +1,105 @@
+import time
+import pytest
+from utils.cache import cache
+from utils.http_client import UpstreamClient, CircuitOpenError
+from utils.metrics import render_all
+from utils.rate_limit import (UpstreamBudget, HostBudget, BudgetExceeded, QuotaExceeded,
+                              upstream_priority, BACKGROUND, budget_events)
+from utils.stub_server import StubServer
+
+
+def test_background_work_leaves_headroom_for_page_loads():
+    budget = UpstreamBudget(hosts={"api.example": HostBudget("example", 10, 3600)},
+                            max_wait=0, background_wait=0, background_reserve=0.2)
+    with upstream_priority(BACKGROUND):
+        for _ in range(8):
+            budget.acquire("api.example")
+        with pytest.raises(BudgetExceeded):
+            budget.acquire("api.example")
+    # The last two tokens are for page loads
+    budget.acquire("api.example")
+    budget.acquire("api.example")
+    with pytest.raises(BudgetExceeded):
+        budget.acquire("api.example")
+    assert budget_events.values[("example", "background", "denied")] >= 1
+
+    # Without Redis, each worker gets its share of the limit
+    shared = UpstreamBudget(hosts={"api.example": HostBudget("example", 10, 3600)}, max_wait=0, processes=5)
+    shared.acquire("api.example")
+    shared.acquire("api.example")
+    with pytest.raises(BudgetExceeded):
+        shared.acquire("api.example")
+
+
+def test_daily_quota_per_key_falls_back_to_stale_cache():
+    budget = UpstreamBudget(hosts={"api.example": HostBudget("example", 100, 60, daily_quota=2, key_param="key")})
+    budget.acquire("api.example", {"key": "a"})
+    budget.acquire("api.example", {"key": "a"})
+    with pytest.raises(QuotaExceeded):
+        budget.acquire("api.example", {"key": "a"})
+    # Quotas are counted per API key
+    budget.acquire("api.example", {"key": "b"})
+    assert budget.quota_usage() == {"example": (3, 2)}
+    assert 'upstream_quota_used{provider="example"} 3' in render_all()
+
+    cache.clear()
+    cache.set("quota:test", "old", ttl=0, stale_ttl=0)
+
+    def loader():
+        budget.acquire("api.example", {"key": "a"})
+        return "new"
+
+    assert cache.get_or_load("quota:test", loader, ttl=60) == "old"
+    cache.clear()
+    with pytest.raises(QuotaExceeded):
+        cache.get_or_load("quota:test", loader, ttl=60)
+
+
+def test_429_pauses_the_host():
+    with StubServer() as stub:
+        stub.route("/busy", {}, status=429, headers={"Retry-After": "60"})
+        host = stub.url.split("//")[1]
+        client = UpstreamClient(retries=0)
+        client.budget = UpstreamBudget(hosts={host: HostBudget("stub", 100, 60)}, max_wait=0.2)
+        assert client.get(stub.url + "/busy").status_code == 429
+        # Nothing else goes out until Retry-After has passed
+        with pytest.raises(BudgetExceeded):
+            client.get(stub.url + "/busy")
+        assert stub.hits("/busy") == 1
+
+        # A burst of 429s doesn't stack the pause
+        for _ in range(5):
+            client.budget.throttled(host, 60)
+        allowed, wait = client.budget.fallback.take(f"bucket:{host}", 100, 60, 0)
+        assert not allowed and wait < 60 + 1
+
+
+def test_open_circuit_does_not_spend_quota():
+    with StubServer() as stub:
+        stub.route("/down", {}, status=500)
+        host = stub.url.split("//")[1]
+        client = UpstreamClient(retries=0, failure_threshold=2, reset_timeout=60)
+        client.budget = UpstreamBudget(hosts={host: HostBudget("stub", 100, 60, daily_quota=10)})
+        client.get(stub.url + "/down")
+        client.get(stub.url + "/down")
+        assert client.budget.quota_usage() == {"stub": (2, 10)}
+        for _ in range(3):
+            with pytest.raises(CircuitOpenError):
+                client.get(stub.url + "/down")
+        assert client.budget.quota_usage() == {"stub": (2, 10)}
+        assert stub.hits("/down") == 2
+
+
+def test_trial_request_is_released_when_the_budget_is_spent():
+    with StubServer() as stub:
+        stub.route("/ok", {})
+        host = stub.url.split("//")[1]
+        client = UpstreamClient(retries=0)
+        client.budget = UpstreamBudget(hosts={host: HostBudget("stub", 1, 60)}, max_wait=0)
+        breaker = client.breaker_for(host)
+        breaker.opened_at = time.monotonic() - breaker.reset_timeout
+        client.budget.acquire(host)
+        with pytest.raises(BudgetExceeded):
+            client.get(stub.url + "/ok")
+        # The half-open trial is still available for the next call
+        assert breaker.allow()
@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import db, BatchJobState, ContactMessage, Review, GameRatingSummary
+from extensions import writes
+from utils.write_behind import WriteBehind
+
+CONTACT = {'name': 'Visitor', 'email': 'visitor@example.com', 'subject': 'Hi', 'message': 'Hello there'}
+
+
+def test_contact_is_queued_then_committed_in_one_batch(app, client):
+    for i in range(3):
+        response = client.post('/contact', data=dict(CONTACT, subject=f'Hi {i}'))
+        assert response.status_code == 302
+    with app.app_context():
+        assert ContactMessage.query.count() == 0
+
+    assert writes.flush() == 3
+    with app.app_context():
+        assert ContactMessage.query.count() == 3
+
+
+def test_contact_validation(app, client):
+    response = client.post('/contact', data=dict(CONTACT, email='not-an-email', name=''))
+    assert response.status_code == 400
+    assert b'valid email' in response.data
+    assert writes.pending == 0
+
+
+def test_submissions_rate_limited_per_ip(client):
+    statuses = [client.post('/contact', data=CONTACT).status_code for _ in range(6)]
+    assert statuses == [302] * 5 + [429]
+    other = client.post('/contact', data=CONTACT, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 302
+
+
+def test_queued_review_updates_summary(app, client, monkeypatch):
+    monkeypatch.setattr('games.routes.load_game', lambda appid: {'name': 'Dota 2', 'description': 'MOBA'})
+    app.config['WTF_CSRF_ENABLED'] = False
+    response = client.post('/game/570', data={'user_name': 'Tester', 'rating': 8, 'comment': 'Good'})
+    assert response.status_code == 302
+
+    writes.flush()
+    with app.app_context():
+        assert db.session.get(GameRatingSummary, 570).review_count == 1
+    assert b'Tester' in client.get('/game/570').data
+
+
+def test_out_of_range_rating_rejected(app, client, monkeypatch):
+    monkeypatch.setattr('games.routes.load_game', lambda appid: {'name': 'Dota 2', 'description': 'MOBA'})
+    app.config['WTF_CSRF_ENABLED'] = False
+    response = client.post('/game/570', data={'user_name': 'Tester', 'rating': 11, 'comment': 'Great'})
+    assert response.status_code == 400
+    assert b'Number must be between 1 and 10' in response.data
+    assert writes.pending == 0
+
+    with app.app_context():
+        with pytest.raises(ValueError):
+            Review(game_id=570, user_name='Tester', rating=0)
+        # The database refuses rows that skip the model, e.g. raw imports
+        with pytest.raises(IntegrityError):
+            db.session.execute(insert(Review), [{'game_id': 570, 'user_name': 'Tester', 'rating': 11}])
+        db.session.rollback()
+        assert db.session.get(GameRatingSummary, 570) is None
+
+
+def test_overflow_spools_to_disk_and_replays(app, tmp_path):
+    buffer = WriteBehind(db, batch_size=10, flush_interval=0, max_pending=2,
+                         spool_path=str(tmp_path / 'spool.ndjson'))
+    buffer.app = app
+    for i in range(5):
+        buffer.submit(Review, {'game_id': 10, 'user_name': f'R{i}', 'rating': 5})
+    assert buffer.pending == 2
+    assert (tmp_path / 'spool.ndjson').read_text().count('\n') == 3
+
+    assert buffer.flush() == 5
+    with app.app_context():
+        assert Review.query.count() == 5
+    assert not (tmp_path / 'spool.ndjson').exists()
+
+
+def test_failing_rows_go_to_dead_letter_file(app, tmp_path):
+    buffer = WriteBehind(db, batch_size=10, flush_interval=0, spool_path=str(tmp_path / 'spool.ndjson'))
+    buffer.app = app
+    for rating in (5, 11, 7):
+        buffer.submit(Review, {'game_id': 10, 'user_name': 'R', 'rating': rating})
+
+    # The batch fails as a whole; the good rows still go in, once
+    assert buffer.flush() == 2
+    assert buffer.flush() == 0
+    with app.app_context():
+        assert sorted(r.rating for r in Review.query) == [5, 7]
+    dead = [json.loads(line) for line in (tmp_path / 'spool.ndjson.dead').read_text().splitlines()]
+    assert [(d['model'], d['values']['rating']) for d in dead] == [('Review', 11)]
+    assert 'Rating must be from 1 to 10' in dead[0]['error']
+    assert not (tmp_path / 'spool.ndjson').exists()
+
+
+def test_spool_left_by_dead_worker_resumes_after_committed_lines(app, tmp_path):
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    spool = tmp_path / 'spool.ndjson'
+    rows = ''.join(json.dumps({'model': 'Review', 'values': {'game_id': 10, 'user_name': f'R{i}', 'rating': 5}}) + '\n'
+                   for i in range(3))
+    (tmp_path / f'spool.ndjson.{dead.pid}.abc').write_text(rows)
+    # Claimed by a worker that is still running: not touched
+    (tmp_path / f'spool.ndjson.{os.getppid()}.xyz').write_text(rows)
+    with app.app_context():
+        # The dead worker had committed its first line before it died
+        db.session.add(Review(game_id=10, user_name='R0', rating=5))
+        db.session.add(BatchJobState(name='write_behind:abc', last_id=1))
+        db.session.commit()
+
+    buffer = WriteBehind(db, batch_size=1, flush_interval=0, spool_path=str(spool))
+    buffer.app = app
+    assert buffer.flush() == 2
+    with app.app_context():
+        assert sorted(r.user_name for r in Review.query) == ['R0', 'R1', 'R2']
+        assert db.session.get(BatchJobState, 'write_behind:abc') is None
+    assert sorted(p.name for p in tmp_path.glob('spool.ndjson.*')) == [f'spool.ndjson.{os.getppid()}.xyz']
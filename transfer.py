@@ -0,0 +1,324 @@
+"""
+Streaming export and import of posts, reviews and contact messages.
+
+    flask export post posts.ndjson.gz
+    flask export contact_message messages.csv --since 2025-06-01
+    flask import review reviews.ndjson.gz --upsert
+
+Rows are read with yield_per and written out as they arrive; imports go in
+with one multi-row INSERT per batch, committed as they go. Memory stays flat
+whatever the table size. The format follows the file name (.ndjson/.jsonl
+or .csv, plus .gz for gzip) unless --format/--gzip say otherwise, and "-"
+means stdout/stdin. CSV writes NULL as \\N, and doubles a leading backslash
+in text so a literal "\\N" survives the round trip.
+
+Imports bypass the ORM, so afterwards the derived data those rows feed is
+brought up to date in one go: post HTML for posts without it, rating
+summaries and the leaderboard for reviews. Posts replaced by --upsert drop
+their cached pages as each batch commits.
+"""
+import csv
+import gzip
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import click
+from sqlalchemy import DateTime, Float, Integer, insert, select
+from models import db, Post, Review, ContactMessage, rerender_posts, rebuild_rating_summaries
+from utils.page_cache import bump
+
+TABLES = {
+    "post": (Post, Post.date_posted),
+    "review": (Review, Review.date_posted),
+    "contact_message": (ContactMessage, ContactMessage.date_sent),
+}
+FORMATS = ("ndjson", "csv")
+BATCH_SIZE = 1000
+PROGRESS_EVERY = 10000
+NULL = "\\N"
+
+
+class Progress:
+    """
+    Row counter that reports every PROGRESS_EVERY rows, and at the end.
+    """
+
+    def __init__(self, label, log, every=PROGRESS_EVERY):
+        self.label = label
+        self.log = log
+        self.every = every
+        self.rows = 0
+        self.started = time.monotonic()
+
+    def add(self, count):
+        before, self.rows = self.rows, self.rows + count
+        if before // self.every != self.rows // self.every:
+            self.log(f"{self.label}: {self.rows} rows ({self.rate():,.0f} rows/s)")
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed else 0
+
+    def done(self):
+        self.log(f"Finished {self.label}: {self.rows} rows in {time.monotonic() - self.started:.1f}s "
+                 f"({self.rate():,.0f} rows/s)")
+
+
+# ---- Files ---- #
+def file_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "ndjson"
+
+
+@contextmanager
+def open_stream(path, mode, compress=None):
+    """
+    Text stream for path ("-" for stdout/stdin), gzip-compressed if the
+    name ends in .gz or compress is set.
+    """
+    compress = path.endswith(".gz") if compress is None else compress
+    if path == "-":
+        raw = sys.stdout.buffer if mode == "w" else sys.stdin.buffer
+        if compress:
+            with gzip.open(raw, mode + "t", encoding="utf-8", newline="") as stream:
+                yield stream
+        else:
+            stream = open(raw.fileno(), mode, encoding="utf-8", newline="", closefd=False)
+            try:
+                yield stream
+            finally:
+                stream.flush()
+        return
+    opener = gzip.open if compress else open
+    with opener(path, mode + "t", encoding="utf-8", newline="") as stream:
+        yield stream
+
+
+def encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_encode(value):
+    if value is None:
+        return NULL
+    if isinstance(value, str) and value.startswith("\\"):
+        return "\\" + value
+    return encode(value)
+
+
+def csv_decode(value):
+    if value == NULL:
+        return None
+    return value[1:] if value.startswith("\\") else value
+
+
+def decoder(column):
+    """
+    Parse function for one column's values as read back from a file.
+    """
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat
+    if isinstance(column.type, Integer):
+        return int
+    if isinstance(column.type, Float):
+        return float
+    return str
+
+
+# ---- Export ---- #
+def export_rows(table_name, since=None, until=None, batch_size=BATCH_SIZE):
+    """
+    Yield a table's rows as dicts in primary-key order, batch_size at a
+    time from the database. since/until filter on the table's date column.
+    """
+    model, date_column = TABLES[table_name]
+    table = model.__table__
+    query = select(table).order_by(*table.primary_key.columns)
+    if since:
+        query = query.where(date_column >= since)
+    if until:
+        query = query.where(date_column < until)
+    # Options on the statement, so the session's connection doesn't stay
+    # streaming for whatever runs after the export
+    query = query.execution_options(stream_results=True, yield_per=batch_size)
+    for rows in db.session.connection().execute(query).mappings().partitions():
+        yield from rows
+
+
+def write_rows(rows, stream, fmt, columns, progress=None):
+    """
+    Write rows to stream as NDJSON or CSV. Returns the row count.
+    """
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        write = lambda row: writer.writerow([csv_encode(row[c]) for c in columns])
+    else:
+        write = lambda row: stream.write(json.dumps({c: encode(row[c]) for c in columns}, ensure_ascii=False) + "\n")
+
+    count = 0
+    for row in rows:
+        write(row)
+        count += 1
+        if progress:
+            progress.add(1)
+    return count
+
+
+def export_table(table_name, path="-", fmt=None, compress=None, since=None, until=None,
+                 batch_size=BATCH_SIZE, log=print):
+    columns = [c.name for c in TABLES[table_name][0].__table__.columns]
+    progress = Progress(f"export {table_name}", log)
+    with open_stream(path, "w", compress) as stream:
+        count = write_rows(export_rows(table_name, since, until, batch_size), stream,
+                           file_format(path, fmt), columns, progress)
+    progress.done()
+    return count
+
+
+# ---- Import ---- #
+def read_rows(stream, fmt, table):
+    """
+    Yield row dicts from an NDJSON or CSV stream, typed for table's
+    columns. Columns the table doesn't have are dropped.
+    """
+    decoders = {c.name: decoder(c) for c in table.columns}
+    if fmt == "csv":
+        records = ({k: csv_decode(v) for k, v in row.items()} for row in csv.DictReader(stream))
+    else:
+        records = (json.loads(line) for line in stream if line.strip())
+    for record in records:
+        yield {k: decoders[k](v) if v is not None else None for k, v in record.items() if k in decoders}
+
+
+def insert_batch(connection, table, rows, upsert=False):
+    """
+    One multi-row INSERT. With upsert, rows whose primary key already
+    exists replace the stored ones.
+    """
+    if not upsert:
+        connection.execute(insert(table), rows)
+        return
+    keys = [c.name for c in table.primary_key.columns]
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        if connection.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        updates = {c: stmt.excluded[c] for c in rows[0] if c not in keys}
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=updates) if updates \
+            else stmt.on_conflict_do_nothing(index_elements=keys)
+        connection.execute(stmt, rows)
+        return
+    key = table.c[keys[0]]
+    connection.execute(table.delete().where(key.in_([row[key.name] for row in rows])))
+    connection.execute(insert(table), rows)
+
+
+def import_rows(table_name, rows, upsert=False, batch_size=BATCH_SIZE, progress=None):
+    """
+    Insert rows batch by batch, committing each batch. Returns the row
+    count.
+    """
+    table = TABLES[table_name][0].__table__
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            count += _flush(table, batch, upsert, progress)
+            batch = []
+    if batch:
+        count += _flush(table, batch, upsert, progress)
+    return count
+
+
+def _flush(table, batch, upsert, progress):
+    try:
+        connection = db.session.connection()
+        insert_batch(connection, table, batch, upsert)
+        if upsert and table.name == "post":
+            # Cached pages and API responses of replaced posts, committed with them
+            bump(*{f"post:{row['id']}" for row in batch if row.get("id") is not None}, connection=connection)
+        db.session.commit()
+    except Exception:
+        # Earlier batches stay committed; Postgres won't run anything else
+        # in the failed transaction
+        db.session.rollback()
+        raise
+    if progress:
+        progress.add(len(batch))
+    return len(batch)
+
+
+def import_table(table_name, path="-", fmt=None, compress=None, upsert=False,
+                 batch_size=BATCH_SIZE, log=print):
+    table = TABLES[table_name][0].__table__
+    progress = Progress(f"import {table_name}", log)
+    with open_stream(path, "r", compress) as stream:
+        count = import_rows(table_name, read_rows(stream, file_format(path, fmt), table),
+                            upsert, batch_size, progress)
+    progress.done()
+    if count:
+        _reset_sequence(table)
+        refresh_derived(table_name, log)
+    return count
+
+
+def _reset_sequence(table):
+    # Explicit ids don't advance Postgres sequences
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    from scripts.migrate_sqlite_to_postgres import reset_sequence
+    db.session.commit()
+    reset_sequence(db.session.get_bind(), table)
+
+
+def refresh_derived(table_name, log=print):
+    """
+    Bring what an imported table feeds up to date, and drop cached pages
+    built from the old rows.
+    """
+    if table_name == "post":
+        log(f"Rendered {rerender_posts()} posts")
+        bump("posts")
+    elif table_name == "review":
+        log(f"Rebuilt rating summaries for {rebuild_rating_summaries()} games")
+        from games.leaderboard import rebuild_leaderboard
+        log(f"Ranked {rebuild_leaderboard()['games']} games")
+        bump("reviews", "leaderboard")
+
+
+# ---- Commands ---- #
+def init_app(app):
+    """
+    Register `flask export` and `flask import`.
+    """
+    table_choice = click.Choice(list(TABLES))
+
+    @app.cli.command("export")
+    @click.argument("table", type=table_choice)
+    @click.argument("path", default="-")
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: from the file name, else ndjson.")
+    @click.option("--gzip/--no-gzip", "compress", default=None, help="Default: on for names ending in .gz.")
+    @click.option("--since", type=click.DateTime(), help="Only rows dated on or after this (UTC).")
+    @click.option("--until", type=click.DateTime(), help="Only rows dated before this (UTC).")
+    @click.option("--batch-size", type=int, default=BATCH_SIZE, show_default=True)
+    def export_command(table, path, fmt, compress, since, until, batch_size):
+        """Stream a table to PATH (default stdout) as NDJSON or CSV."""
+        export_table(table, path, fmt, compress, since, until, batch_size, log=lambda msg: click.echo(msg, err=True))
+
+    @app.cli.command("import")
+    @click.argument("table", type=table_choice)
+    @click.argument("path", default="-")
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: from the file name, else ndjson.")
+    @click.option("--gzip/--no-gzip", "compress", default=None, help="Default: on for names ending in .gz.")
+    @click.option("--upsert", is_flag=True, help="Replace rows whose id already exists instead of failing.")
+    @click.option("--batch-size", type=int, default=BATCH_SIZE, show_default=True)
+    def import_command(table, path, fmt, compress, upsert, batch_size):
+        """Load rows from PATH (default stdin), as written by flask export."""
+        import_table(table, path, fmt, compress, upsert, batch_size, log=lambda msg: click.echo(msg, err=True))
@@ -0,0 +1,266 @@
+"""
+Static asset build: bundled, minified, fingerprinted CSS and JS.
+
+Each bundle below is built from files under static/, minified, and written
+to ASSETS_DIR with a content hash in its name, next to .gz and .br copies:
+
+    <dir>/css/site.3b1f09c2d4e5.css
+    <dir>/css/site.3b1f09c2d4e5.css.gz
+    <dir>/css/site.3b1f09c2d4e5.css.br
+    <dir>/manifest.json                  {"files": {"css/site.css": "css/site.3b1f09c2d4e5.css"}, ...}
+
+Templates link them with asset_url("css/site.css"), which resolves the name
+through the manifest to /assets/<fingerprinted name>. Those URLs change
+whenever the content does, so they are served as immutable, and the
+precompressed copy the browser accepts is sent as-is. A bundle that hasn't
+been built yet is served from its sources, uncompressed and uncached.
+
+`flask build-assets` builds everything; with ASSETS_AUTO_BUILD the app does
+it at startup whenever the sources have changed since the last build.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import click
+from flask import abort, request, send_file, url_for, Response
+from werkzeug.security import safe_join
+
+logger = logging.getLogger("codecritical.assets")
+
+# Output name -> source files under static/
+BUNDLES = {
+    "css/site.css": ["css/styles.css", "css/dark-theme.css"],
+    "css/styles.css": ["css/styles.css"],
+    "css/steam-search.css": ["css/steam-search.css"],
+    "css/pygments.css": ["css/pygments.css"],
+    "js/scripts.js": ["js/scripts.js"],
+    "js/steam-search.js": ["js/steam-search.js"],
+}
+# Bump after changing how bundles are built so the next startup rebuilds
+BUILD_VERSION = "1"
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)(?!data:|https?:|//|/|#)([^'")]+)\1\s*\)""")
+
+
+class Assets:
+    def __init__(self, directory=None, static_folder=None, bundles=BUNDLES):
+        self.directory = directory
+        self.static_folder = static_folder
+        self.static_url_path = "/static"
+        self.bundles = bundles
+        self.manifest = {}
+
+    def init_app(self, app):
+        """
+        Read ASSETS_* settings, register /assets/<path>, the asset_url
+        template global and the build-assets command, and build if stale.
+        """
+        self.directory = app.config.get("ASSETS_DIR") or os.path.join(app.static_folder, "dist")
+        self.static_folder = app.static_folder
+        self.static_url_path = app.static_url_path
+        self.manifest = self.load_manifest()
+        app.extensions["assets"] = self
+        app.add_template_global(self.url_for, "asset_url")
+
+        if app.config.get("ASSETS_AUTO_BUILD") and self.manifest.get("sources") != self.sources_digest():
+            try:
+                self.build()
+            except Exception as e:
+                # Pages still work from the unbuilt sources
+                logger.exception("Asset build error: %s", e)
+
+        @app.route("/assets/<path:filename>")
+        def asset(filename):
+            return self.serve(filename)
+
+        @app.cli.command("build-assets")
+        def build_assets_command():
+            """Bundle, minify, fingerprint and precompress static CSS/JS."""
+            manifest = self.build()
+            for name, built in manifest["files"].items():
+                click.echo(f"{name} -> {built}")
+
+    def url_for(self, name):
+        """
+        URL for bundle name: its fingerprinted build if there is one, else
+        the unbuilt bundle, else a plain static file.
+        """
+        built = self.manifest.get("files", {}).get(name)
+        if built:
+            return url_for("asset", filename=built)
+        if name in self.bundles:
+            return url_for("asset", filename=name)
+        return url_for("static", filename=name)
+
+    def serve(self, filename):
+        if filename in self.manifest.get("built", ()):
+            path = safe_join(self.directory, filename)
+            if path and os.path.isfile(path):
+                return self._send_built(path, filename)
+        if filename in self.bundles:
+            # Not built yet (or built before this bundle existed)
+            response = Response(self.bundle_source(filename), mimetype=mimetype(filename))
+            response.cache_control.no_cache = True
+            return response
+        abort(404)
+
+    # ---- Build ---- #
+    def build(self):
+        """
+        Write every bundle and its compressed copies, then the manifest.
+        Files from the previous build are kept (pages rendered before a
+        deploy may still ask for them); older ones are deleted.
+        """
+        previous = self.load_manifest()
+        files = {}
+        for name in self.bundles:
+            data = minify(name, self.bundle_source(name)).encode()
+            built = fingerprint(name, data)
+            path = os.path.join(self.directory, built)
+            if not os.path.exists(path):
+                for suffix, compressed in compress(data).items():
+                    atomic_write(path + suffix, compressed)
+                atomic_write(path, data)
+            files[name] = built
+
+        manifest = {
+            "version": BUILD_VERSION,
+            "sources": self.sources_digest(),
+            "files": files,
+            # What /assets/ will serve: this build and the one before it
+            "built": sorted(set(files.values()) | set(previous.get("files", {}).values())),
+        }
+        atomic_write(self._manifest_path(), json.dumps(manifest, indent=2, sort_keys=True).encode())
+        self._prune(manifest["built"])
+        self.manifest = manifest
+        return manifest
+
+    def bundle_source(self, name):
+        parts = []
+        for source in self.bundles[name]:
+            with open(os.path.join(self.static_folder, source), encoding="utf-8") as f:
+                text = f.read()
+            if name.endswith(".css"):
+                text = self._rebase_urls(text, source)
+            parts.append(text)
+        # Keep a missing semicolon at the end of one script from joining it to the next
+        return (";\n" if name.endswith(".js") else "\n").join(parts)
+
+    def sources_digest(self):
+        digest = hashlib.sha256(BUILD_VERSION.encode())
+        for name in sorted(self.bundles):
+            digest.update(name.encode() + b"\x00")
+            for source in self.bundles[name]:
+                try:
+                    with open(os.path.join(self.static_folder, source), "rb") as f:
+                        digest.update(f.read())
+                except OSError:
+                    digest.update(b"\x00missing")
+        return digest.hexdigest()
+
+    def load_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # ---- Internals ---- #
+    def _manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _send_built(self, path, filename):
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings[name] and os.path.isfile(path + suffix):
+                encoding, path = name, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype(filename), max_age=IMMUTABLE_MAX_AGE,
+                             etag=os.path.basename(path), conditional=True)
+        if encoding:
+            response.content_encoding = encoding
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def _rebase_urls(self, css, source):
+        """
+        Point relative url()s at the source file's place under /static, since
+        the bundle is served from somewhere else.
+        """
+        base = os.path.dirname(source)
+
+        def rebase(match):
+            quote, target = match.groups()
+            path = os.path.normpath(os.path.join(base, target)).replace(os.sep, "/")
+            return f"url({quote}{self.static_url_path}/{path}{quote})"
+        return CSS_URL.sub(rebase, css)
+
+    def _prune(self, keep):
+        keep = {os.path.normpath(os.path.join(self.directory, name)) for name in keep}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                base = re.sub(r"\.(gz|br)$", "", path)
+                if name == "manifest.json" or name.startswith(".tmp-") or os.path.normpath(base) in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def minify(name, text):
+    # Minifiers are only needed when building
+    if name.endswith(".css"):
+        import rcssmin
+        return rcssmin.cssmin(text)
+    if name.endswith(".js"):
+        import rjsmin
+        return rjsmin.jsmin(text)
+    return text
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def compress(data):
+    """
+    {suffix: bytes} for each encoding available here; brotli is skipped if
+    the package isn't installed.
+    """
+    out = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return out
+    out[".br"] = brotli.compress(data, quality=11)
+    return out
+
+
+def mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def atomic_write(path, data):
+    # Write then rename so other workers never read a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,304 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import wraps
+from flask import current_app, has_app_context
+
+logger = logging.getLogger("codecritical.cache")
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_STALE_TTL = 600
+
+
+class CacheStats:
+    """
+    Counters used to size the cache: hits, misses, stale hits served while a
+    refresh runs, evictions, background refreshes and refresh errors.
+    """
+
+    FIELDS = ("hits", "misses", "stale_hits", "evictions", "refreshes", "errors")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for field in self.FIELDS:
+                setattr(self, field, 0)
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def as_dict(self):
+        with self._lock:
+            data = {field: getattr(self, field) for field in self.FIELDS}
+        lookups = data["hits"] + data["stale_hits"] + data["misses"]
+        data["hit_rate"] = round((data["hits"] + data["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return data
+
+
+class MemoryBackend:
+    """
+    In-process LRU store. Once max_entries is reached the least recently
+    used entry is dropped.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, expire_in):
+        """
+        Store an entry and return how many old entries were evicted.
+        """
+        evicted = 0
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """
+    Redis store shared by every gunicorn worker. Keys expire on their own
+    once the stale window has passed; LRU eviction is left to the server's
+    maxmemory-policy (allkeys-lru).
+    """
+
+    def __init__(self, url, prefix="codecritical:cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, entry, expire_in):
+        self.client.set(self.prefix + key, pickle.dumps(entry), ex=max(int(expire_in), 1))
+        return 0
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + "*"))
+
+
+class TTLCache:
+    """
+    TTL cache with stale-while-revalidate on top of a pluggable backend.
+
+    Entries are stored as (value, fresh_until, stale_until). A fresh entry is
+    returned as-is; a stale one is returned immediately while a background
+    thread reloads it; anything older is loaded synchronously.
+    """
+
+    def __init__(self, backend=None, stale_ttl=DEFAULT_STALE_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        entry = self.backend.get(key)
+        if entry is None or time.time() >= entry[1]:
+            return default
+        return entry[0]
+
+    def peek(self, key, default=None):
+        """
+        Return whatever is stored for key, fresh or stale, without counting
+        a lookup or triggering a refresh.
+        """
+        entry = self.backend.get(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl, stale_ttl=None):
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale_ttl)
+        evicted = self.backend.set(key, entry, ttl + stale_ttl)
+        if evicted:
+            self.stats.incr("evictions", evicted)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+        self.stats.reset()
+
+    def get_or_load(self, key, loader, ttl, stale_ttl=None):
+        """
+        Return the cached value for key, calling loader() on a miss.
+        """
+        entry = self.backend.get(key)
+        now = time.time()
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.stats.incr("hits")
+                return value
+            if now < stale_until:
+                self.stats.incr("stale_hits")
+                self._refresh_in_background(key, loader, ttl, stale_ttl)
+                return value
+
+        self.stats.incr("misses")
+        try:
+            value = loader()
+        except Exception as e:
+            # Loaders that hit an upstream limit (rate_limit.BudgetExceeded)
+            # answer with whatever was cached last, however old
+            if entry is None or not getattr(e, "serve_stale", False):
+                raise
+            self.stats.incr("stale_hits")
+            return entry[0]
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    def _refresh_in_background(self, key, loader, ttl, stale_ttl):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        # Loaders such as the RAWG/GiantBomb calls read current_app.config
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            # Refreshes can't spend the headroom kept for page loads
+            from utils.rate_limit import upstream_priority, BACKGROUND
+
+            try:
+                with app.app_context() if app is not None else nullcontext(), upstream_priority(BACKGROUND):
+                    value = loader()
+                self.set(key, value, ttl, stale_ttl)
+                self.stats.incr("refreshes")
+            except Exception as e:
+                # Keep serving the stale value until the next attempt
+                logger.warning("Cache refresh error for %s: %s", key, e)
+                self.stats.incr("errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def memoize(self, namespace, ttl, stale_ttl=None):
+        """
+        Decorator caching a function's return value per set of arguments.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                key = make_key(namespace, *args, **kwargs)
+                return self.get_or_load(key, lambda: func(*args, **kwargs), ttl, stale_ttl)
+
+            def refresh(*args, **kwargs):
+                # Reload unconditionally, e.g. from a background job
+                value = func(*args, **kwargs)
+                self.set(make_key(namespace, *args, **kwargs), value, ttl, stale_ttl)
+                return value
+
+            wrapper.uncached = func
+            wrapper.refresh = refresh
+            return wrapper
+
+        return decorator
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function, everyone else arriving before it finishes waits for and shares
+    its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "result": None, "error": None}
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+def make_key(namespace, *args, **kwargs):
+    parts = [str(a) for a in args]
+    parts += [f"{k}={kwargs[k]}" for k in sorted(kwargs)]
+    return namespace + ":" + ":".join(parts)
+
+
+def backend_from_env():
+    """
+    Pick the cache backend from CACHE_URL: redis://... selects Redis,
+    anything else keeps the in-process LRU.
+    """
+    url = os.getenv("CACHE_URL", "")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return MemoryBackend(int(os.getenv("CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+
+
+# Shared cache used by the upstream API modules
+cache = TTLCache(backend_from_env())
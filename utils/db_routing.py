@@ -0,0 +1,58 @@
+import sqlite3
+from functools import wraps
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, Select
+from sqlalchemy.engine import Engine
+
+# Applied to every SQLite connection so several local workers can share one
+# database file without "database is locked" errors. The busy timeout comes
+# from the connect timeout in config.engine_options.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs from read-only requests to the "replica" bind when
+    one is configured. Flushes and INSERT/UPDATE/DELETE statements always
+    go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_request_context()
+            and g.get("use_replica")
+            and "replica" in self._db.engines
+            and (clause is None or isinstance(clause, Select))
+        ):
+            return self._db.engines["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """
+    Mark a route's GET/HEAD requests as safe to serve from the read replica.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = request.method in ("GET", "HEAD")
+        return view(*args, **kwargs)
+
+    return wrapper
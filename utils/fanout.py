@@ -0,0 +1,41 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from flask import current_app, has_app_context
+
+# Shared by every request; upstream calls carry their own timeouts, so
+# work abandoned at a deadline still frees its thread soon after.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FANOUT_WORKERS", 16)),
+    thread_name_prefix="fanout"
+)
+
+
+def fetch_all(calls, deadline):
+    """
+    Run the callables in calls ({name: func}) in parallel and wait at most
+    deadline seconds in total. Returns (results, failed): results maps the
+    names that finished in time to their values; failed maps the rest to
+    the exception raised or "timeout".
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def run(func):
+        with app.app_context() if app is not None else nullcontext():
+            return func()
+
+    futures = {_executor.submit(run, func): name for name, func in calls.items()}
+    done, pending = wait(futures, timeout=deadline)
+
+    results, failed = {}, {}
+    for future in done:
+        name = futures[future]
+        error = future.exception()
+        if error is None:
+            results[name] = future.result()
+        else:
+            failed[name] = error
+    for future in pending:
+        future.cancel()
+        failed[futures[future]] = "timeout"
+    return results, failed
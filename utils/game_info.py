@@ -0,0 +1,326 @@
+"""
+Game metadata from Steam, RAWG and GiantBomb, merged into one GameInfo.
+
+Each provider turns its own payload into a GameInfo. game_info() asks the
+enabled providers in parallel and merges their answers field by field:
+FIELD_PRIORITY says whose value wins, and a provider that has nothing for a
+field (or failed) leaves it to the next one.
+
+Every provider keeps its own cache entries and TTL. Its upstream requests
+are paid for from the host's budget (utils/rate_limit.UpstreamBudget), so
+the RAWG and GiantBomb quotas hold however busy the site is. A provider
+that is out of budget or erroring answers with its last (stale) result for
+the game, or nothing.
+
+Set GAME_INFO_FIXTURES to a directory like fixtures/providers to use
+FakeProvider for everything, offline.
+"""
+import json
+import logging
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import partial
+from flask import current_app
+from utils import steam_api, rawg_api, giantbomb_api
+from utils.cache import cache, SingleFlight
+from utils.fanout import fetch_all
+from utils.metrics import register, Counter
+from utils.rate_limit import BudgetExceeded
+
+logger = logging.getLogger("codecritical.upstream")
+
+GameInfo = namedtuple("GameInfo", "name description release_date images platforms genres sources",
+                      defaults=(None, None, None, (), (), (), None))
+
+FIELDS = ("name", "description", "release_date", "images", "platforms", "genres")
+
+# Provider order per field, best first. Steam knows its own store page best;
+# RAWG and GiantBomb list console platforms and finer genres.
+FIELD_PRIORITY = {
+    "name": ("steam", "rawg", "giantbomb"),
+    "description": ("steam", "giantbomb", "rawg"),
+    "release_date": ("steam", "rawg", "giantbomb"),
+    "images": ("steam", "rawg", "giantbomb"),
+    "platforms": ("rawg", "giantbomb", "steam"),
+    "genres": ("rawg", "giantbomb", "steam"),
+}
+
+# Results outlive their TTL by this much, for when a provider is down or
+# out of quota
+STALE_TTL = 7 * 24 * 3600
+# Total wait for the providers on a page view
+LOOKUP_DEADLINE = float(os.getenv("GAME_INFO_DEADLINE", 1.5))
+
+lookups = register(Counter(
+    "game_info_lookups_total", "Game metadata lookups by provider and outcome.", ("provider", "result")))
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d %b, %Y", "%b %d, %Y", "%d %B, %Y", "%B %d, %Y")
+
+
+class Provider:
+    """
+    One metadata source. Subclasses implement fetch_raw (upstream requests,
+    each made through self.request) and normalize (payload -> GameInfo).
+    """
+    name = None
+    label = None
+    # Upstream host, for its request budget
+    host = None
+    ttl = 3600
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or self.ttl
+        self._flights = SingleFlight()
+
+    def enabled(self):
+        return True
+
+    def fetch_raw(self, appid, name):
+        raise NotImplementedError
+
+    def normalize(self, raw):
+        raise NotImplementedError
+
+    def request(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def lookup(self, appid, name=None):
+        """
+        GameInfo for appid from this provider, or None. Fresh results come
+        from the cache; otherwise the upstream is asked if its budget allows,
+        falling back to the stale result.
+        """
+        key = f"gameinfo:{self.name}:{appid}"
+        cached = cache.get(key)
+        if cached is not None:
+            lookups.inc(self.name, "hit")
+            return cached or None
+        return self._flights.do(key, lambda: self._load(key, appid, name))
+
+    def _load(self, key, appid, name):
+        try:
+            raw = self.fetch_raw(appid, name)
+        except BudgetExceeded:
+            lookups.inc(self.name, "limited")
+            return cache.peek(key) or None
+        except Exception as e:
+            logger.warning("%s API error: %s", self.label, e)
+            lookups.inc(self.name, "error")
+            return cache.peek(key) or None
+        info = self.normalize(raw) if raw else None
+        lookups.inc(self.name, "fetch" if info else "missing")
+        # False marks "not found" so it is cached too
+        cache.set(key, info or False, self.ttl, stale_ttl=STALE_TTL)
+        return info
+
+
+class SteamProvider(Provider):
+    name = "steam"
+    label = "Steam"
+    host = "store.steampowered.com"
+    ttl = steam_api.DETAILS_TTL
+
+    def fetch_raw(self, appid, name):
+        return self.request(steam_api.get_steam_game_details, appid)
+
+    def normalize(self, raw):
+        # raw is get_steam_game_details' shape
+        images = [raw.get("image_url")] + list(raw.get("screenshots") or [])
+        return GameInfo(
+            name=raw.get("name"),
+            description=raw.get("description"),
+            release_date=parse_date(raw.get("original_release_date")),
+            images=tuple(i for i in images if i),
+            platforms=tuple(raw.get("platforms") or ()),
+            genres=tuple(raw.get("genres") or ()),
+        )
+
+
+class RawgProvider(Provider):
+    name = "rawg"
+    label = "RAWG"
+    host = "api.rawg.io"
+    ttl = 24 * 3600
+
+    def enabled(self):
+        return bool(current_app.config.get("RAWG_API_KEY"))
+
+    def fetch_raw(self, appid, name):
+        if not name:
+            return None
+        match = best_match(self.request(rawg_api.search_games, name, page_size=5), name)
+        return self.request(rawg_api.fetch_game_details, match["id"]) if match else None
+
+    def normalize(self, raw):
+        images = [raw.get("background_image"), raw.get("background_image_additional")]
+        return GameInfo(
+            name=raw.get("name"),
+            description=raw.get("description_raw") or strip_tags(raw.get("description")),
+            release_date=parse_date(raw.get("released")),
+            images=tuple(i for i in images if i),
+            platforms=tuple(p["platform"]["name"] for p in raw.get("platforms") or () if p.get("platform")),
+            genres=tuple(g["name"] for g in raw.get("genres") or () if g.get("name")),
+        )
+
+
+class GiantBombProvider(Provider):
+    name = "giantbomb"
+    label = "GiantBomb"
+    host = "www.giantbomb.com"
+    ttl = 24 * 3600
+
+    def enabled(self):
+        return bool(current_app.config.get("GIANTBOMB_API_KEY"))
+
+    def fetch_raw(self, appid, name):
+        if not name:
+            return None
+        match = best_match(self.request(giantbomb_api.search_games, name, limit=5), name)
+        if not match:
+            return None
+        guid = match.get("guid") or f"3030-{match['id']}"
+        return self.request(giantbomb_api.fetch_game_details, guid)
+
+    def normalize(self, raw):
+        image = raw.get("image") or {}
+        return GameInfo(
+            name=raw.get("name"),
+            description=raw.get("deck") or strip_tags(raw.get("description")),
+            release_date=parse_date(raw.get("original_release_date")),
+            images=tuple(i for i in (image.get("super_url"), image.get("original_url")) if i),
+            platforms=tuple(p["name"] for p in raw.get("platforms") or () if p.get("name")),
+            genres=tuple(g["name"] for g in raw.get("genres") or () if g.get("name")),
+        )
+
+
+class FakeProvider(Provider):
+    """
+    Stand-in for a provider that answers from fixtures ({appid: payload in
+    the real provider's raw format}) instead of the network. Caching,
+    normalizing and, given an UpstreamBudget, budgeting are the real ones.
+    """
+
+    def __init__(self, real, fixtures, budget=None):
+        super().__init__(real.ttl)
+        self.real = real
+        self.name = real.name
+        self.label = real.label
+        self.host = real.host
+        self.budget = budget
+        self.fixtures = {str(k): v for k, v in fixtures.items()}
+        self.requests = 0
+
+    def request(self, func, *args, **kwargs):
+        if self.budget is not None:
+            self.budget.acquire(self.host)
+        return func(*args, **kwargs)
+
+    def fetch_raw(self, appid, name):
+        self.requests += 1
+        return self.request(self.fixtures.get, str(appid))
+
+    def normalize(self, raw):
+        return self.real.normalize(raw)
+
+
+class Providers:
+    def __init__(self, providers=None):
+        self.providers = providers or [SteamProvider(), RawgProvider(), GiantBombProvider()]
+
+    def init_app(self, app):
+        """
+        Switch to fixtures if GAME_INFO_FIXTURES is set. Fixture lookups
+        still spend the upstream budget, so limits can be tried offline.
+        """
+        providers = [SteamProvider(), RawgProvider(), GiantBombProvider()]
+        fixtures = app.config.get("GAME_INFO_FIXTURES")
+        if fixtures:
+            budget = app.extensions.get("upstream_budget")
+            providers = [FakeProvider(p, load_fixtures(fixtures, p.name), budget) for p in providers]
+        self.providers = providers
+        app.extensions["game_info"] = self
+
+    def get(self, name):
+        return next((p for p in self.providers if p.name == name), None)
+
+    def game_info(self, appid, name=None, known=None, deadline=LOOKUP_DEADLINE):
+        """
+        Merged GameInfo for a Steam appid. known maps provider names to
+        payloads already at hand (e.g. {"steam": details}), which are used
+        instead of asking that provider. RAWG and GiantBomb are searched by
+        name, taken from Steam if not given.
+        """
+        infos = {}
+        for provider_name, raw in (known or {}).items():
+            infos[provider_name] = self.get(provider_name).normalize(raw) if raw else None
+        if name is None and "steam" not in infos:
+            infos["steam"] = self.get("steam").lookup(appid)
+        if name is None and infos.get("steam"):
+            name = infos["steam"].name
+
+        calls = {p.name: partial(p.lookup, appid, name) for p in self.providers
+                 if p.name not in infos and p.enabled()}
+        if calls:
+            results, failed = fetch_all(calls, deadline)
+            infos.update(results)
+            for provider_name in failed:
+                lookups.inc(provider_name, "timeout")
+        return merge(infos)
+
+
+def merge(infos, priority=FIELD_PRIORITY):
+    """
+    One GameInfo from {provider: GameInfo or None}: each field comes from
+    the first provider in its priority order that has a value for it.
+    sources records which provider each field came from.
+    """
+    values, sources = {}, {}
+    for field in FIELDS:
+        for provider_name in priority[field]:
+            info = infos.get(provider_name)
+            value = getattr(info, field) if info else None
+            if value:
+                values[field], sources[field] = value, provider_name
+                break
+    return GameInfo(sources=sources, **values)
+
+
+def best_match(results, name):
+    """
+    The search result whose name matches name, ignoring case, punctuation
+    and spacing. A fuzzy match would risk merging a different game.
+    """
+    wanted = name_key(name)
+    return next((r for r in results or () if name_key(r.get("name")) == wanted), None)
+
+
+def name_key(name):
+    return re.sub(r"[^a-z0-9]+", "", (name or "").lower())
+
+
+def parse_date(value):
+    """
+    ISO date from the providers' date strings, or None for "Coming soon",
+    "Q3 2026" and the like.
+    """
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def strip_tags(html):
+    return re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", html or "")).strip() or None
+
+
+def load_fixtures(directory, name):
+    path = os.path.join(directory, f"{name}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -1,14 +1,20 @@
-import requests
+import os
 from flask import current_app
+from utils.cache import cache
+from utils.http_client import http
 from datetime import datetime
 
-BASE_URL = "https://www.giantbomb.com/api"
+# Overridable so benchmarks can point the app at a local fake
+BASE_URL = os.getenv("GIANTBOMB_API_URL", "https://www.giantbomb.com/api")
 
 HEADERS = {
     "User-Agent": "CodeCriticalBlog/1.0",
     "Accept": "application/json"
 }
 
+UPCOMING_TTL = 3600
+
+@cache.memoize("giantbomb:upcoming", ttl=UPCOMING_TTL)
 def fetch_upcoming_games(limit=5):
     """
     Fetch upcoming games from Giant Bomb API.
@@ -23,22 +29,22 @@ def fetch_upcoming_games(limit=5):
         "field_list": "id,name,original_release_date,image",
         "limit": limit
     }
-    response = requests.get(url, params=params, headers=HEADERS)
+    response = http.get(url, params=params, headers=HEADERS)
     response.raise_for_status()
     return response.json()["results"]
 
 def fetch_game_details(game_id):
     """
-    Fetch a single game by ID.
+    Fetch a single game by its guid ("3030-<id>").
     """
     api_key = current_app.config['GIANTBOMB_API_KEY']
     url = f"{BASE_URL}/game/{game_id}/"
     params = {
         "api_key": api_key,
         "format": "json",
-        "field_list": "id,name,description,original_release_date,image,platforms,genres"
+        "field_list": "id,guid,name,deck,description,original_release_date,image,platforms,genres"
     }
-    response = requests.get(url, params=params, headers=HEADERS)
+    response = http.get(url, params=params, headers=HEADERS)
     response.raise_for_status()
     return response.json()["results"]
 
@@ -52,9 +58,9 @@ def search_games(query, limit=10):
         "api_key": api_key,
         "format": "json",
         "filter": f"name:{query}",
-        "field_list": "id,name,original_release_date,image",
+        "field_list": "id,guid,name,original_release_date,image",
         "limit": limit
     }
-    response = requests.get(url, params=params, headers=HEADERS)
+    response = http.get(url, params=params, headers=HEADERS)
     response.raise_for_status()
     return response.json()["results"]
@@ -0,0 +1,197 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import observe_upstream
+from utils.rate_limit import BudgetExceeded
+
+# Statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HEADERS = {
+    "User-Agent": "CodeCriticalBlog/1.0",
+}
+
+
+def _outcome(status):
+    if status >= 500:
+        return "error"
+    if status == 429:
+        return "throttled"
+    return "ok"
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised without touching the network while a host's circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker. After failure_threshold consecutive failures the
+    circuit opens and calls fail fast for reset_timeout seconds, after which
+    a single trial request is let through (half-open).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self):
+        """
+        Give back a half-open trial that allow() granted but that never went
+        out (e.g. the request budget was spent).
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for Steam, RAWG and GiantBomb.
+
+    One requests.Session keeps a keep-alive connection pool per host. Every
+    call gets connect/read timeouts, a bounded number of retries with
+    jittered exponential backoff, and goes through the host's circuit breaker.
+    With a budget (utils/rate_limit.UpstreamBudget) attached, every attempt
+    the breaker lets through spends a token from the host's request budget.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.3, failure_threshold=5, reset_timeout=30):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self.budget = None
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # Retries are handled below so they can share the breaker bookkeeping
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def breaker_for(self, host):
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        breaker = self.breaker_for(host)
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            response = None
+            # Fail fast before spending a token: an open circuit shouldn't
+            # use up the host's quota
+            if not breaker.allow():
+                observe_upstream(host, 0.0, "circuit_open")
+                raise CircuitOpenError(f"Circuit open for {host}")
+            if self.budget is not None:
+                try:
+                    self._spend(host, kwargs.get("params"))
+                except BudgetExceeded:
+                    breaker.release()
+                    raise
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                observe_upstream(host, time.perf_counter() - started, "error")
+                breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+            else:
+                observe_upstream(host, time.perf_counter() - started, _outcome(response.status_code))
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code == 429 and self.budget is not None:
+                    self.budget.throttled(host, _retry_after(response))
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                response.close()
+
+            time.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    def _spend(self, host, params):
+        try:
+            self.budget.acquire(host, params)
+        except BudgetExceeded:
+            observe_upstream(host, 0.0, "budget")
+            raise
+
+    def _delay(self, attempt, response=None):
+        """
+        Full-jitter exponential backoff, honouring a numeric Retry-After.
+        """
+        retry_after = _retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, 10.0)
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    return float(value) if value and value.isdigit() else None
+
+
+http = UpstreamClient(
+    pool_size=int(os.getenv("UPSTREAM_POOL_SIZE", 10)),
+    connect_timeout=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.getenv("UPSTREAM_READ_TIMEOUT", 10)),
+    retries=int(os.getenv("UPSTREAM_RETRIES", 2)),
+)
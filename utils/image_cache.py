@@ -0,0 +1,322 @@
+"""
+Local proxy and thumbnail cache for game art (Steam headers, capsules).
+
+Each upstream image is fetched once, stored under its SHA-256, and resized
+and recompressed into the variants the templates use: carousel banners and
+typeahead thumbnails, as WebP for browsers that accept it and JPEG
+otherwise. Files live in IMAGE_CACHE_DIR, shared by every worker, and the
+least recently used ones are deleted once the cache outgrows
+IMAGE_CACHE_MAX_BYTES.
+
+    <dir>/src/ab/<sha1 of url>        content hash, or "missing"
+    <dir>/orig/cd/<sha256>            upstream bytes
+    <dir>/var/cd/<sha256>.thumb.webp  resized variants
+
+Variant URLs never change meaning, so they are served as immutable. Images
+the upstream doesn't have are remembered for IMAGE_MISSING_TTL seconds;
+templates link those straight to the placeholder, and the proxy answers
+with the placeholder rather than an error.
+"""
+import hashlib
+import io
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+from flask import request, send_file, url_for, abort
+from utils.assets import atomic_write
+from utils.cache import SingleFlight
+from utils.http_client import http
+from utils.metrics import register, Counter
+
+logger = logging.getLogger("codecritical.images")
+
+# Bounding boxes (2x the CSS size); images are never upscaled
+VARIANTS = {
+    "carousel": (920, 430),
+    "thumb": (200, 100),
+}
+FORMATS = {
+    "webp": ("image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DEFAULT_HOSTS = (
+    "cdn.akamai.steamstatic.com",
+    "shared.akamai.steamstatic.com",
+    "cdn.cloudflare.steamstatic.com",
+    "shared.cloudflare.steamstatic.com",
+    "steamcdn-a.akamaihd.net",
+)
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+PLACEHOLDER_MAX_AGE = 3600
+# Don't rewrite a file's mtime on every hit; LRU order only needs to be rough
+TOUCH_INTERVAL = 3600
+
+image_events = register(Counter(
+    "image_cache_events_total", "Image proxy cache events.", ("event",)))
+
+
+class MissingImage(Exception):
+    """
+    The upstream has no usable image at this URL.
+    """
+
+
+class ImageCache:
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 * 1024, missing_ttl=86400, hosts=DEFAULT_HOSTS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.missing_ttl = missing_ttl
+        self.hosts = set(hosts)
+        self.placeholder = None
+        self._placeholder_type = None
+        self._flights = SingleFlight()
+        self._size = None
+
+    def init_app(self, app):
+        """
+        Read IMAGE_* settings and register the /img/<variant> route.
+        """
+        self.cache_dir = app.config.get("IMAGE_CACHE_DIR") or os.path.join(app.instance_path, "image_cache")
+        self.max_bytes = app.config.get("IMAGE_CACHE_MAX_BYTES", self.max_bytes)
+        self.missing_ttl = app.config.get("IMAGE_MISSING_TTL", self.missing_ttl)
+        self.hosts = set(app.config.get("IMAGE_PROXY_HOSTS") or self.hosts)
+        self.placeholder = os.path.join(app.static_folder, "img", "placeholder.png")
+        self._placeholder_type = None
+        self._size = None
+        app.extensions["image_cache"] = self
+
+        @app.route("/img/<variant>")
+        def image_proxy(variant):
+            src = request.args.get("src", "")
+            if variant not in VARIANTS or not self.allowed(src):
+                abort(404)
+            fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+            try:
+                path = self.variant(src, variant, fmt)
+            except MissingImage:
+                return self._placeholder_response(PLACEHOLDER_MAX_AGE)
+            except Exception as e:
+                # Upstream trouble; don't let browsers hold on to the placeholder
+                logger.warning("Image proxy error for %s: %s", src, e)
+                return self._placeholder_response(60)
+            response = send_file(path, mimetype=FORMATS[fmt][0], max_age=IMMUTABLE_MAX_AGE,
+                                 etag=os.path.basename(path), conditional=True)
+            response.cache_control.immutable = True
+            response.vary.add("Accept")
+            return response
+
+    def allowed(self, src):
+        parts = urlsplit(src or "")
+        return parts.scheme in ("http", "https") and parts.netloc in self.hosts
+
+    def url_for(self, src, variant):
+        """
+        URL to use for src in the page: the proxied variant, the placeholder
+        if the image is known to be missing, or src itself for hosts the
+        proxy doesn't serve.
+        """
+        if not src or self.is_missing(src):
+            return url_for("static", filename="img/placeholder.png")
+        if not self.allowed(src):
+            return src
+        return url_for("image_proxy", variant=variant, src=src)
+
+    def is_missing(self, src):
+        """
+        True while src is remembered as missing, i.e. for IMAGE_MISSING_TTL
+        seconds after the upstream last didn't have it.
+        """
+        pointer = self._read_pointer(src)
+        return pointer is not None and pointer[0] == "missing" and pointer[2] < self.missing_ttl
+
+    def variant(self, src, variant, fmt):
+        """
+        Path to the cached variant of src, fetching and resizing on first
+        use. Raises MissingImage if the upstream has no usable image.
+        """
+        digest = self.original(src)
+        path = self._path("var", digest, f".{variant}.{fmt}")
+        if self._hit(path):
+            image_events.inc("hit")
+            return path
+
+        def render():
+            if not os.path.exists(path):
+                with open(self._path("orig", digest), "rb") as f:
+                    self._store(path, resize(f.read(), VARIANTS[variant], fmt))
+                image_events.inc("resize")
+            return path
+
+        image_events.inc("miss")
+        return self._flights.do(("var", digest, variant, fmt), render)
+
+    def original(self, src):
+        """
+        Content hash of src's upstream image, downloading it if it isn't
+        cached (or was evicted).
+        """
+        pointer = self._read_pointer(src)
+        if pointer is not None:
+            kind, value, age = pointer
+            if kind == "missing":
+                if age < self.missing_ttl:
+                    raise MissingImage(src)
+            elif os.path.exists(self._path("orig", value)):
+                return value
+        return self._flights.do(("orig", src), lambda: self._fetch(src))
+
+    def clear(self):
+        import shutil
+        if self.cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._size = None
+
+    # ---- Internals ---- #
+    def _fetch(self, src):
+        response = http.get(src, stream=True)
+        with response:
+            if response.status_code in (404, 410):
+                self._missing(src)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.status_code} from {urlsplit(src).netloc}")
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > MAX_SOURCE_BYTES:
+                    self._missing(src)
+            data = bytes(data)
+        if not is_image(data):
+            self._missing(src)
+        image_events.inc("fetch")
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path("orig", digest)
+        if not os.path.exists(path):
+            self._store(path, data)
+        self._write_pointer(src, digest)
+        return digest
+
+    def _missing(self, src):
+        image_events.inc("missing")
+        self._write_pointer(src, "missing")
+        raise MissingImage(src)
+
+    def _placeholder_response(self, max_age):
+        if self._placeholder_type is None:
+            # Sniffed from the file: placeholder.png actually holds JPEG data
+            self._placeholder_type = image_mimetype(self.placeholder)
+        response = send_file(self.placeholder, mimetype=self._placeholder_type, max_age=max_age)
+        response.vary.add("Accept")
+        return response
+
+    def _path(self, kind, key, suffix=""):
+        return os.path.join(self.cache_dir, kind, key[:2], key + suffix)
+
+    def _pointer_path(self, src):
+        return self._path("src", hashlib.sha1(src.encode()).hexdigest())
+
+    def _read_pointer(self, src):
+        """
+        (kind, value, age in seconds) for src, or None if it was never seen.
+        """
+        path = self._pointer_path(src)
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        return ("missing" if value == "missing" else "hash", value, age)
+
+    def _write_pointer(self, src, value):
+        atomic_write(self._pointer_path(src), value.encode())
+
+    def _hit(self, path):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        if time.time() - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return True
+
+    def _store(self, path, data):
+        atomic_write(path, data)
+        if self._size is None:
+            self._size = self._disk_usage()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _files(self):
+        for kind in ("orig", "var"):
+            for root, _, names in os.walk(os.path.join(self.cache_dir, kind)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self):
+        """
+        Delete least recently used files until the cache is back under 90%
+        of max_bytes. Another worker may be evicting too; missing files are
+        simply skipped. An evicted original is downloaded again if a new
+        variant of it is needed.
+        """
+        files = sorted(self._files())
+        size = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                image_events.inc("evicted")
+            except OSError:
+                pass
+            size -= file_size
+        self._size = size
+
+
+def is_image(data):
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+        return True
+    except Exception:
+        return False
+
+
+def image_mimetype(path):
+    from PIL import Image
+    with Image.open(path) as img:
+        return img.get_format_mimetype()
+
+
+def resize(data, box, fmt):
+    """
+    Fit data inside box (without upscaling) and encode it as fmt.
+    """
+    # Pillow is only needed once images are actually being resized
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", box)
+        keep_alpha = fmt == "webp" and img.mode in ("RGBA", "LA", "P")
+        img = img.convert("RGBA" if keep_alpha else "RGB")
+        img.thumbnail(box, Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, fmt.upper(), **FORMATS[fmt][1])
+        return out.getvalue()
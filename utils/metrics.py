@@ -0,0 +1,281 @@
+"""
+Request-level performance metrics in the Prometheus text format.
+
+Tracks per-route latency, SQL query counts and time per request, template
+render time, upstream calls per provider and cache hit rates, and serves
+them at /metrics. Metrics live in the worker process, so with several
+gunicorn workers each scrape sees the worker that answered it. /metrics
+and /cache/stats only answer clients in METRICS_ALLOW_IPS or sending
+"Authorization: Bearer <METRICS_TOKEN>".
+"""
+import bisect
+import hmac
+import io
+import ipaddress
+import logging
+import os
+import threading
+import time
+from flask import abort, g, request, has_request_context, jsonify, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.cache import cache
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+sql_logger = logging.getLogger("codecritical.sql")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Value computed at scrape time by callback, which returns
+    {label_values: value}. kind="counter" for totals kept elsewhere.
+    """
+
+    def __init__(self, name, help, labels=(), callback=None, kind="gauge"):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for label_values, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for label_values, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {series['count']}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {series['sum']}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+registry = []
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+def render_all():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+request_latency = register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("route", "method", "status")))
+db_queries_per_request = register(Histogram(
+    "db_queries_per_request", "SQL statements executed per request.", ("route",), COUNT_BUCKETS))
+db_time_per_request = register(Histogram(
+    "db_query_seconds_per_request", "Time spent in SQL per request.", ("route",)))
+slow_queries = register(Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("route",)))
+template_render = register(Histogram(
+    "template_render_seconds", "Jinja template render time.", ("template",)))
+upstream_latency = register(Histogram(
+    "upstream_request_duration_seconds", "Upstream API call latency.", ("provider", "outcome")))
+upstream_requests = register(Counter(
+    "upstream_requests_total", "Upstream API calls.", ("provider", "outcome")))
+register(Gauge(
+    "cache_events_total", "Upstream cache events by kind.", ("event",),
+    lambda: {(k,): v for k, v in cache.stats.as_dict().items() if k != "hit_rate"}, kind="counter"))
+register(Gauge(
+    "cache_hit_ratio", "Share of cache lookups served from cache.", (),
+    lambda: {(): cache.stats.as_dict()["hit_rate"]}))
+
+# Hosts reported under a friendlier provider label
+PROVIDERS = {
+    "store.steampowered.com": "steam",
+    "api.rawg.io": "rawg",
+    "www.giantbomb.com": "giantbomb",
+}
+
+
+def observe_upstream(host, seconds, outcome):
+    provider = PROVIDERS.get(host, host)
+    upstream_requests.inc(provider, outcome)
+    upstream_latency.observe(seconds, provider, outcome)
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _slow_query_ms():
+    return float(os.getenv("SLOW_QUERY_MS", 200))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    route = None
+    if has_request_context():
+        g.db_queries = g.get("db_queries", 0) + 1
+        g.db_time = g.get("db_time", 0.0) + elapsed
+        route = _route()
+    if elapsed * 1000 >= _slow_query_ms():
+        slow_queries.inc(route or "background")
+        sql_logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, route or "background", statement)
+
+
+def allow_ips(value):
+    """
+    Parse a comma-separated list of addresses and networks (METRICS_ALLOW_IPS).
+    """
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in (value or "").split(",") if part.strip()]
+
+
+def scrape_allowed(token, networks):
+    """
+    True if the current request may read /metrics or /cache/stats: it comes
+    from one of networks, or carries the bearer token.
+    """
+    header = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def init_app(app):
+    """
+    Install request hooks, the opt-in profiler and the /metrics and
+    /cache/stats endpoints.
+
+    Sending "X-Profile: <PROFILER_TOKEN>" runs the request under cProfile and
+    returns the stats instead of the page. It is off unless PROFILER_TOKEN
+    is set.
+
+    The endpoints answer 404 to clients outside METRICS_ALLOW_IPS (default
+    localhost) that don't send "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    networks = allow_ips(app.config.get("METRICS_ALLOW_IPS", "127.0.0.1,::1"))
+
+    def require_scrape_access():
+        if not scrape_allowed(app.config.get("METRICS_TOKEN"), networks):
+            abort(404)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+        token = app.config.get("PROFILER_TOKEN")
+        if token and request.headers.get("X-Profile") == token:
+            import cProfile
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        if "request_started" not in g:
+            return response
+        route = _route()
+        request_latency.observe(time.perf_counter() - g.request_started, route, request.method, response.status_code)
+        db_queries_per_request.observe(g.db_queries, route)
+        db_time_per_request.observe(g.db_time, route)
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            summary = f"{request.method} {request.full_path} -> {response.status_code}, " \
+                      f"{g.db_queries} queries in {g.db_time * 1000:.1f} ms\n\n"
+            return app.response_class(summary + out.getvalue(), mimetype="text/plain")
+        return response
+
+    @before_render_template.connect_via(app)
+    def template_started(sender, template, context, **extra):
+        g.setdefault("template_started", []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def template_finished(sender, template, context, **extra):
+        started = g.get("template_started")
+        if started:
+            template_render.observe(time.perf_counter() - started.pop(), template.name or "string")
+
+    @app.route("/metrics")
+    def metrics():
+        require_scrape_access()
+        return app.response_class(render_all(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/cache/stats")
+    def cache_stats():
+        require_scrape_access()
+        stats = cache.stats.as_dict()
+        stats["entries"] = len(cache.backend)
+        return jsonify(stats)
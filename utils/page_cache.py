@@ -0,0 +1,137 @@
+import hashlib
+import time
+from flask import current_app, g, request, make_response, jsonify
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from utils.cache import cache
+
+# Table of version stamps, registered by track_model_changes
+_versions_table = None
+
+
+def versions(scopes):
+    """
+    {scope: last-change timestamp} for scopes such as "posts" or
+    "reviews:570". Cached pages embed them in their key, so bumping a scope
+    invalidates them. The stamps live in the database, so a commit in one
+    worker, job or CLI process invalidates pages in every other. A scope
+    that was never bumped is 0.
+    """
+    table = _versions_table
+    rows = current_app.extensions["sqlalchemy"].session.execute(
+        select(table.c.scope, table.c.version).where(table.c.scope.in_(scopes)))
+    found = {scope: value for scope, value in rows}
+    return {s: found.get(s, 0.0) for s in scopes}
+
+
+def version(scope):
+    return versions([scope])[scope]
+
+
+def bump(*scopes, connection=None):
+    """
+    Invalidate everything cached under scopes. Writes through connection
+    when given (a flush, so the stamps commit with the data), otherwise in
+    a transaction of its own.
+    """
+    if not scopes:
+        return
+    now = time.time()
+    if connection is None:
+        with current_app.extensions["sqlalchemy"].engine.begin() as connection:
+            _write_versions(connection, scopes, now)
+    else:
+        _write_versions(connection, scopes, now)
+
+
+def _write_versions(connection, scopes, now):
+    table = _versions_table
+    rows = [{"scope": scope, "version": now} for scope in sorted(set(scopes))]
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        connection.execute(stmt.on_conflict_do_update(index_elements=["scope"], set_={"version": stmt.excluded.version}), rows)
+        return
+    for row in rows:
+        if not connection.execute(update(table).where(table.c.scope == row["scope"]).values(version=now)).rowcount:
+            connection.execute(insert(table), row)
+
+
+def _fragment_key(name, stamps):
+    return f"fragment:{name}:" + ":".join(f"{v:.6f}" for v in stamps.values())
+
+
+def cached_fragment(name, scopes, ttl, render):
+    """
+    Return rendered HTML for name, calling render() only when no copy exists
+    for the current versions of scopes.
+    """
+    return cache.get_or_load(_fragment_key(name, versions(scopes)), render, ttl, stale_ttl=0)
+
+
+def cached_page(scopes, ttl, render, max_age=60):
+    """
+    Serve a whole GET page from the cache, keyed by path, query string and
+    the versions of scopes. Adds ETag, Last-Modified and Cache-Control, and
+    answers 304 when the client's copy is current.
+    """
+    stamps = versions(scopes)
+    key = _fragment_key(f"page:{request.full_path}", stamps)
+    g.pop("page_ttl", None)
+    body = cache.get_or_load(key, render, ttl, stale_ttl=0)
+    # render() asked for a shorter life, e.g. it was missing upstream data
+    short_ttl = g.pop("page_ttl", None)
+    if short_ttl is not None and short_ttl < ttl:
+        cache.set(key, body, short_ttl, stale_ttl=0)
+        max_age = min(max_age, short_ttl)
+    response = make_response(body)
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    last_modified = max(stamps.values())
+    if last_modified:
+        response.last_modified = int(last_modified)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def limit_page_ttl(ttl):
+    """
+    Called from a cached_page render: keep the page being rendered for at
+    most ttl seconds.
+    """
+    g.page_ttl = min(ttl, g.get("page_ttl", ttl))
+
+
+def json_with_etag(data, max_age):
+    """
+    JSON response with a content-hash ETag; answers 304 when the client's
+    If-None-Match already matches.
+    """
+    response = jsonify(data)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def track_model_changes(scopes_for, versions_table):
+    """
+    Bump versions automatically when a commit touches models.
+    scopes_for(obj) returns the scopes an added/changed/deleted object
+    invalidates; versions_table (scope, version) stores the stamps.
+    """
+    global _versions_table
+    _versions_table = versions_table
+
+    @event.listens_for(Session, "after_flush")
+    def invalidate(session, flush_context):
+        scopes = set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            scopes.update(scopes_for(obj))
+        if scopes:
+            # Part of the flushed transaction: a rollback keeps the old stamps
+            bump(*scopes, connection=session.connection())
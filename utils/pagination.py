@@ -0,0 +1,65 @@
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 50
+
+
+def encode_cursor(date, row_id):
+    # An undated row has an empty date part
+    raw = f"{date.isoformat() if date else ''}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor back into (datetime or None, id). Returns None for a
+    missing or malformed cursor, which callers treat as "first page".
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date) if date else None, int(row_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def clamp_per_page(per_page, default=DEFAULT_PER_PAGE, maximum=MAX_PER_PAGE):
+    if per_page is None:
+        return default
+    return max(1, min(per_page, maximum))
+
+
+def keyset_page(query, date_col, id_col, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """
+    One page of query ordered newest first on (date_col, id_col), starting
+    after cursor. Returns (items, next_cursor); next_cursor is None on the
+    last page. Unlike OFFSET, the cost doesn't grow with the page number.
+
+    Undated rows come last, newest id first. They are read separately so
+    both parts stay index scans whichever end a database sorts NULLs to.
+    """
+    position = decode_cursor(cursor)
+    items = []
+    if position is None or position[0] is not None:
+        dated = query.filter(date_col.isnot(None))
+        if position is not None:
+            date, row_id = position
+            dated = dated.filter(or_(date_col < date, and_(date_col == date, id_col < row_id)))
+        items = dated.order_by(date_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    if len(items) <= per_page:
+        undated = query.filter(date_col.is_(None))
+        if position is not None and position[0] is None:
+            undated = undated.filter(id_col < position[1])
+        items += undated.order_by(id_col.desc()).limit(per_page + 1 - len(items)).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, date_col.key), getattr(last, id_col.key))
+    return items, next_cursor
@@ -0,0 +1,79 @@
+"""
+Render pipeline for post bodies, run when a post is saved.
+
+Content is Markdown (raw HTML inside it is allowed, so older HTML posts
+keep working). It is rendered with Pygments-highlighted code blocks,
+sanitized, and stored on the post with a plain-text excerpt, word count and
+reading time. content_hash covers the source and RENDER_VERSION, so a post
+is only re-rendered when either changes; bump RENDER_VERSION after changing
+anything below and run `flask render-posts`.
+"""
+import hashlib
+import html
+import math
+import re
+
+RENDER_VERSION = "1"
+EXCERPT_LENGTH = 280
+WORDS_PER_MINUTE = 230
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "codehilite", "tables", "sane_lists"]
+MARKDOWN_CONFIG = {"codehilite": {"guess_lang": False, "css_class": "codehilite"}}
+
+# nh3's defaults plus the class attributes Pygments emits
+ALLOWED_ATTRIBUTES = {
+    "div": {"class"},
+    "span": {"class"},
+    "code": {"class"},
+    "pre": {"class"},
+}
+
+
+def content_hash(content):
+    return hashlib.sha256(f"{RENDER_VERSION}\x00{content or ''}".encode()).hexdigest()
+
+
+def render_markdown(content):
+    # Markdown, Pygments and nh3 are only loaded where posts are written
+    import markdown
+    import nh3
+    raw = markdown.markdown(content or "", extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_CONFIG)
+    attributes = {tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()}
+    for tag, attrs in ALLOWED_ATTRIBUTES.items():
+        attributes.setdefault(tag, set()).update(attrs)
+    return nh3.clean(raw, attributes=attributes, link_rel="noopener noreferrer")
+
+
+def plain_text(rendered):
+    """
+    Prose from rendered HTML, without code blocks.
+    """
+    import nh3
+    text = nh3.clean(rendered, tags=set(), clean_content_tags={"pre", "script", "style"})
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:.-") + "…"
+
+
+def render_post(post, force=False):
+    """
+    Fill post's rendered columns from its content. Returns False (and does
+    nothing) if they are already current.
+    """
+    digest = content_hash(post.content)
+    if not force and post.content_hash == digest:
+        return False
+    rendered = render_markdown(post.content)
+    text = plain_text(rendered)
+    words = len(re.findall(r"\w+", text))
+    post.content_html = rendered
+    post.excerpt = excerpt(text)
+    post.word_count = words
+    post.reading_minutes = max(1, math.ceil(words / WORDS_PER_MINUTE))
+    post.content_hash = digest
+    return True
@@ -0,0 +1,165 @@
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, DateTime, event, text
+from sqlalchemy.engine import make_url
+from utils.pagination import clamp_per_page
+
+# Databases with a full-text index behind search_posts; there's no
+# unindexed fallback
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+PER_PAGE = 10
+# Ranked results can't use keyset pagination; cap how deep OFFSET may go
+MAX_PAGE = 50
+
+# Markers wrapped around matches by snippet()/ts_headline(); swapped for
+# <mark> once the rest of the text has been escaped
+START, STOP = "\x02", "\x03"
+
+# SQLite: external-content FTS5 table kept in sync with post by triggers
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5("
+    "title, subtitle, content, content='post', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN "
+    "INSERT INTO post_fts(rowid, title, subtitle, content) VALUES (new.id, new.title, new.subtitle, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, subtitle, content) "
+    "VALUES ('delete', old.id, old.title, old.subtitle, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE ON post BEGIN "
+    "INSERT INTO post_fts(post_fts, rowid, title, subtitle, content) "
+    "VALUES ('delete', old.id, old.title, old.subtitle, old.content); "
+    "INSERT INTO post_fts(rowid, title, subtitle, content) VALUES (new.id, new.title, new.subtitle, new.content); END",
+    "INSERT INTO post_fts(post_fts) VALUES ('rebuild')",
+]
+
+# Postgres: weighted tsvector kept current by the database as a generated
+# column, with a GIN index
+POSTGRES_DDL = [
+    "ALTER TABLE post ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(subtitle, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_post_search_vector ON post USING gin (search_vector)",
+]
+
+SQLITE_QUERY = """
+    SELECT post.id, post.title, post.subtitle, post.author, post.date_posted,
+           bm25(post_fts, 10.0, 5.0, 1.0) AS rank,
+           snippet(post_fts, 2, :start, :stop, '…', 16) AS highlight
+    FROM post_fts JOIN post ON post.id = post_fts.rowid
+    WHERE post_fts MATCH :query
+    ORDER BY rank, post.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_QUERY = """
+    SELECT post.id, post.title, post.subtitle, post.author, post.date_posted,
+           ts_rank_cd(post.search_vector, q) AS rank,
+           ts_headline('english', post.content, q,
+                       'StartSel=' || :start || ', StopSel=' || :stop || ', MaxFragments=2, MaxWords=24, MinWords=8') AS highlight
+    FROM post, to_tsquery('english', :query) AS q
+    WHERE post.search_vector @@ q
+    ORDER BY rank DESC, post.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def install(table):
+    """
+    Create the search structures whenever the post table is created
+    (db.create_all); the Alembic migration does the same for existing
+    databases.
+    """
+    for statement in SQLITE_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS post_fts").execute_if(dialect="sqlite"))
+
+
+def check_database(config):
+    """
+    Refuse to start on a database search_posts can't serve, rather than
+    answering every search with a 500. Checks SQLALCHEMY_DATABASE_URI and
+    every bind (searches run on the read replica).
+    """
+    urls = [config.get("SQLALCHEMY_DATABASE_URI")]
+    for bind in (config.get("SQLALCHEMY_BINDS") or {}).values():
+        urls.append(bind.get("url") if isinstance(bind, dict) else bind)
+    for url in filter(None, urls):
+        backend = make_url(url).get_backend_name()
+        if backend not in SUPPORTED_DIALECTS:
+            raise RuntimeError(f"Post search needs SQLite (FTS5) or PostgreSQL; "
+                               f"{make_url(url).render_as_string(hide_password=True)} is {backend}")
+
+
+def fts5_query(query):
+    """
+    Turn free text into a safe FTS5 expression: every word must match,
+    the last one as a prefix so results follow the user's typing.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+def tsquery(query):
+    """
+    The Postgres counterpart of fts5_query: every word must match, the
+    last one as a prefix.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " & ".join(words[:-1] + [words[-1] + ":*"])
+
+
+def highlight(raw):
+    if not raw:
+        return Markup("")
+    return Markup(str(escape(raw)).replace(START, "<mark>").replace(STOP, "</mark>"))
+
+
+def search_posts(session, query, page=1, per_page=10):
+    """
+    Ranked full-text search over post title, subtitle and content.
+    Returns (results, has_more); each result is a dict with the post's list
+    columns plus rank and an HTML-safe highlight. Other databases raise
+    NotImplementedError (create_app refuses them, see check_database).
+    """
+    query = (query or "").strip()[:200]
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        sql, match = POSTGRES_QUERY, tsquery(query)
+    elif dialect == "sqlite":
+        sql, match = SQLITE_QUERY, fts5_query(query)
+    else:
+        # An unindexed LIKE '%word%' scan is not an acceptable substitute
+        raise NotImplementedError(f"Post search needs SQLite (FTS5) or PostgreSQL, not {dialect}")
+    if not match:
+        return [], False
+
+    rows = session.execute(text(sql).columns(date_posted=DateTime), {
+        "query": match, "start": START, "stop": STOP,
+        "limit": per_page + 1, "offset": (page - 1) * per_page
+    }).mappings().all()
+
+    results = []
+    for row in rows[:per_page]:
+        result = dict(row)
+        result["highlight"] = highlight(row["highlight"])
+        results.append(result)
+    return results, len(rows) > per_page
+
+
+def search_page(session, args):
+    """
+    search_posts for a request's ?q=, ?page= and ?per_page=, as
+    (query, page, per_page, results, has_more).
+    """
+    query = args.get("q", "")
+    page = max(1, min(args.get("page", 1, type=int), MAX_PAGE))
+    per_page = clamp_per_page(args.get("per_page", type=int), default=PER_PAGE)
+    results, has_more = search_posts(session, query, page, per_page)
+    return query, page, per_page, results, has_more and page < MAX_PAGE
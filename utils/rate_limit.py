@@ -0,0 +1,407 @@
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from utils.metrics import register, Counter, Gauge
+
+logger = logging.getLogger("codecritical.upstream")
+
+
+class RateLimiter:
+    """
+    Token bucket per key (e.g. client IP): up to rate requests per period
+    seconds, refilled continuously. State is per process, so with several
+    workers the effective limit is rate times the worker count.
+    """
+
+    def __init__(self, rate=5, period=60, max_keys=10000):
+        self.rate = rate
+        self.period = period
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.rate = app.config.get("SUBMISSION_RATE", self.rate)
+        self.period = app.config.get("SUBMISSION_PERIOD", self.period)
+        self._buckets.clear()
+
+    def allow(self, key):
+        now = time.monotonic()
+        refill = self.rate / self.period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, refill)
+            return allowed
+
+    def _prune(self, now, refill):
+        # Full buckets carry no information; drop them
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * refill >= self.rate:
+                del self._buckets[key]
+
+
+# ---- Upstream Budget ---- #
+# Token buckets per upstream host, shared by every worker through Redis, plus
+# daily request quotas per API key. utils/http_client spends a token before
+# each request it sends.
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# host, provider, default "requests/seconds", daily quota setting, API key
+# query parameter. RAWG's free tier is 20,000 requests a month; GiantBomb
+# allows 200 requests per resource an hour.
+UPSTREAM_HOSTS = (
+    ("store.steampowered.com", "steam", "200/300", None, None),
+    ("api.rawg.io", "rawg", "60/60", "RAWG_DAILY_QUOTA", "key"),
+    ("www.giantbomb.com", "giantbomb", "200/3600", "GIANTBOMB_DAILY_QUOTA", "api_key"),
+)
+# After a Redis error, buckets stay in-process this long before retrying it
+REDIS_RETRY_INTERVAL = 30
+
+_priority = ContextVar("upstream_priority", default=INTERACTIVE)
+_budgets = weakref.WeakSet()
+
+budget_events = register(Counter(
+    "upstream_budget_total", "Upstream request budget decisions.", ("provider", "priority", "outcome")))
+register(Gauge(
+    "upstream_quota_used", "Requests counted against today's API quota.", ("provider",),
+    lambda: {(p,): used for b in _budgets for p, (used, _) in b.quota_usage().items()}))
+register(Gauge(
+    "upstream_quota_limit", "Daily API quota.", ("provider",),
+    lambda: {(p,): limit for b in _budgets for p, (_, limit) in b.quota_usage().items()}))
+
+# Atomic take on a Redis hash {tokens, updated}. Uses the server's clock so
+# workers on different machines agree. Returns {allowed, seconds to wait}.
+TAKE_SCRIPT = """
+local rate, period, reserve = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or rate
+local updated = tonumber(state[2]) or now
+tokens = math.min(rate, tokens + math.max(0, now - updated) * rate / period)
+local allowed, wait = 0, 0
+if tokens - 1 >= reserve then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (reserve + 1 - tokens) * period / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(period * 2))
+return {allowed, tostring(wait)}
+"""
+
+# Put the bucket `seconds` of refill into debt, e.g. after a 429. Debts
+# don't stack: a burst of 429s leaves the bucket at one Retry-After's debt,
+# and a bucket already that far down is left alone. Returns 1 if changed.
+PENALIZE_SCRIPT = """
+local rate, period, seconds = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or rate
+local updated = tonumber(state[2]) or now
+tokens = math.min(rate, tokens + math.max(0, now - updated) * rate / period)
+local debt = -seconds * rate / period
+if tokens <= debt then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(debt), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(period * 2 + seconds))
+return 1
+"""
+
+# Count one request against today's quota unless that would pass limit
+QUOTA_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used >= tonumber(ARGV[1]) then
+    return -1
+end
+used = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], 2 * 86400)
+return used
+"""
+
+
+class BudgetExceeded(Exception):
+    """
+    No request token for this host within the caller's wait, or its quota
+    is used up. Nothing was sent upstream.
+    """
+    # TTLCache answers with an expired entry rather than failing
+    serve_stale = True
+
+
+class QuotaExceeded(BudgetExceeded):
+    """
+    The API key's daily quota is used up.
+    """
+
+
+@contextmanager
+def upstream_priority(level):
+    """
+    Upstream requests inside the block are made at level (BACKGROUND for
+    refresh jobs, which then can't use the headroom kept for page loads).
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class HostBudget:
+    def __init__(self, provider, rate, period, daily_quota=None, key_param=None):
+        """
+        rate requests per period seconds; daily_quota requests per UTC day
+        per API key, read from the key_param query parameter.
+        """
+        self.provider = provider
+        self.rate = rate
+        self.period = period
+        self.daily_quota = daily_quota
+        self.key_param = key_param
+
+
+class MemoryBuckets:
+    """
+    In-process stand-in for the Redis scripts above.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, period, reserve):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate, now))
+            tokens = min(rate, tokens + (now - updated) * rate / period)
+            if tokens - 1 >= reserve:
+                self._buckets[key] = (tokens - 1, now)
+                return True, 0.0
+            self._buckets[key] = (tokens, now)
+            return False, (reserve + 1 - tokens) * period / rate
+
+    def penalize(self, key, rate, period, seconds):
+        now = time.monotonic()
+        debt = -seconds * rate / period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate, now))
+            if min(rate, tokens + (now - updated) * rate / period) <= debt:
+                return False
+            self._buckets[key] = (debt, now)
+            return True
+
+    def count(self, key, limit):
+        with self._lock:
+            used = self._counts.get(key, 0)
+            if used >= limit:
+                return None
+            self._counts[key] = used + 1
+            return used + 1
+
+    def used(self, key):
+        with self._lock:
+            return self._counts.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._counts.clear()
+
+
+class RedisBuckets:
+    def __init__(self, url, prefix="codecritical:budget:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+        self._penalize = self.client.register_script(PENALIZE_SCRIPT)
+        self._count = self.client.register_script(QUOTA_SCRIPT)
+
+    def take(self, key, rate, period, reserve):
+        allowed, wait = self._take(keys=[self.prefix + key], args=[rate, period, reserve])
+        return bool(allowed), float(wait)
+
+    def penalize(self, key, rate, period, seconds):
+        return bool(self._penalize(keys=[self.prefix + key], args=[rate, period, seconds]))
+
+    def count(self, key, limit):
+        used = self._count(keys=[self.prefix + key], args=[limit])
+        return None if used < 0 else used
+
+    def used(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class UpstreamBudget:
+    """
+    Request budget per upstream host, shared by all workers when REDIS_URL
+    is set. Without Redis (or while it is unreachable) each process keeps
+    its own buckets and quotas, scaled down by the worker count so the
+    total still fits.
+
+    Page loads (INTERACTIVE) may wait up to max_wait for a token;
+    BACKGROUND work waits longer but must leave background_reserve of the
+    bucket, and of each day's quota, for page loads.
+    """
+
+    def __init__(self, hosts=None, store=None, max_wait=1.0, background_wait=30.0,
+                 background_reserve=0.2, processes=1):
+        self.hosts = dict(hosts or {})
+        self.store = store
+        self.fallback = MemoryBuckets()
+        self.max_wait = max_wait
+        self.background_wait = background_wait
+        self.background_reserve = background_reserve
+        self.processes = max(1, processes)
+        self._redis_down_until = 0
+        self._key_digests = {}
+        _budgets.add(self)
+
+    def init_app(self, app):
+        """
+        Read the per-provider limits and quotas from the config and attach
+        to the shared HTTP client.
+        """
+        from utils.http_client import http
+
+        url = app.config.get("UPSTREAM_BUDGET_REDIS_URL")
+        self.store = RedisBuckets(url) if url else None
+        self.fallback.clear()
+        self.max_wait = app.config.get("UPSTREAM_MAX_WAIT", self.max_wait)
+        self.processes = max(1, app.config.get("WEB_CONCURRENCY", 1))
+        self.hosts, self._key_digests = {}, {}
+        for host, provider, default, quota_setting, key_param in UPSTREAM_HOSTS:
+            rate, period = parse_rate(app.config.get(f"{provider.upper()}_RATE_LIMIT") or default)
+            quota = app.config.get(quota_setting) if quota_setting else None
+            self.hosts[host] = HostBudget(provider, rate, period, quota, key_param)
+            # Report the configured key's usage even before this process uses it
+            api_key = app.config.get(f"{provider.upper()}_API_KEY")
+            if quota and api_key:
+                self._quota_key(host, api_key)
+        http.budget = self
+        app.extensions["upstream_budget"] = self
+
+    def acquire(self, host, params=None):
+        """
+        Spend one request from host's budget, waiting for a token if the
+        caller's priority allows. Raises BudgetExceeded otherwise. Hosts
+        without a budget are free.
+        """
+        budget = self.hosts.get(host)
+        if budget is None:
+            return
+        level = current_priority()
+        background = level == BACKGROUND
+        rate = budget.rate / self._share()
+        reserve = rate * self.background_reserve if background else 0
+        deadline = time.monotonic() + (self.background_wait if background else self.max_wait)
+        waited = False
+        while True:
+            allowed, wait = self._call("take", f"bucket:{host}", rate, budget.period, reserve)
+            if allowed:
+                break
+            if time.monotonic() + wait > deadline:
+                budget_events.inc(budget.provider, level, "denied")
+                raise BudgetExceeded(f"No request budget for {host}")
+            waited = True
+            time.sleep(wait)
+        if budget.daily_quota:
+            self._count_quota(host, budget, params, background)
+        budget_events.inc(budget.provider, level, "waited" if waited else "granted")
+
+    def throttled(self, host, retry_after=None):
+        """
+        The host answered 429: stop every worker for retry_after seconds
+        (or one period's worth of refill), counted from now. Repeated 429s
+        don't extend the pause beyond that.
+        """
+        budget = self.hosts.get(host)
+        if budget is None:
+            return
+        rate = budget.rate / self._share()
+        seconds = retry_after if retry_after else budget.period / rate
+        if self._call("penalize", f"bucket:{host}", rate, budget.period, seconds):
+            budget_events.inc(budget.provider, current_priority(), "throttled")
+
+    def quota_usage(self):
+        """
+        {provider: (requests used today, daily quota)} over the API keys
+        this process knows about.
+        """
+        usage = {}
+        for host, budget in self.hosts.items():
+            if budget.daily_quota:
+                used = sum(self._call("used", key) for key in self._quota_keys(host))
+                usage[budget.provider] = (used, budget.daily_quota)
+        return usage
+
+    # ---- Internals ---- #
+    def _shared(self):
+        return self.store is not None and time.monotonic() >= self._redis_down_until
+
+    def _share(self):
+        # In-process buckets each get a slice of the real limit
+        return 1 if self._shared() else self.processes
+
+    def _count_quota(self, host, budget, params, background):
+        limit = budget.daily_quota / self._share()
+        if background:
+            limit *= 1 - self.background_reserve
+        key = self._quota_key(host, (params or {}).get(budget.key_param, ""))
+        if self._call("count", key, int(limit)) is None:
+            budget_events.inc(budget.provider, current_priority(), "quota_exceeded")
+            raise QuotaExceeded(f"Daily {budget.provider} quota used up")
+
+    def _quota_key(self, host, api_key):
+        # Only a hash of the key is stored
+        digest = hashlib.sha1(str(api_key).encode()).hexdigest()[:12]
+        self._key_digests.setdefault(host, set()).add(digest)
+        return f"quota:{host}:{digest}:{datetime.now(timezone.utc):%Y-%m-%d}"
+
+    def _quota_keys(self, host):
+        return [f"quota:{host}:{digest}:{datetime.now(timezone.utc):%Y-%m-%d}" for digest in self._key_digests.get(host, ())]
+
+    def _call(self, method, *args):
+        if self._shared():
+            try:
+                return getattr(self.store, method)(*args)
+            except Exception as e:
+                logger.warning("Upstream budget Redis error: %s", e)
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+        return getattr(self.fallback, method)(*args)
+
+
+def parse_rate(value):
+    """
+    (requests, seconds) from "requests/seconds".
+    """
+    requests, period = str(value).split("/")
+    return int(requests), float(period)
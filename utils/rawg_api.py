@@ -1,15 +1,22 @@
-import requests
+import os
 from flask import current_app
+from utils.cache import cache
+from utils.http_client import http
 
-BASE_URL = "https://api.rawg.io/api"
+# Overridable so benchmarks can point the app at a local fake
+BASE_URL = os.getenv("RAWG_API_URL", "https://api.rawg.io/api")
 
+UPCOMING_TTL = 3600
+
+@cache.memoize("rawg:upcoming", ttl=UPCOMING_TTL)
 def fetch_upcoming_games(page_size=5):
     """
     Fetch upcoming games using the RAWG API.
     """
     api_key = current_app.config['RAWG_API_KEY']
-    url = f"{BASE_URL}/games?key={api_key}&dates=2025-01-01,2025-12-31&ordering=released&page_size={page_size}"
-    response = requests.get(url)
+    url = f"{BASE_URL}/games"
+    params = {"key": api_key, "dates": "2025-01-01,2025-12-31", "ordering": "released", "page_size": page_size}
+    response = http.get(url, params=params)
     response.raise_for_status()
     return response.json()['results']
 
@@ -18,8 +25,8 @@ def fetch_game_details(game_id):
     Fetch detailed information for a single game.
     """
     api_key = current_app.config['RAWG_API_KEY']
-    url = f"{BASE_URL}/games/{game_id}?key={api_key}"
-    response = requests.get(url)
+    url = f"{BASE_URL}/games/{game_id}"
+    response = http.get(url, params={"key": api_key})
     response.raise_for_status()
     return response.json()
 
@@ -28,7 +35,8 @@ def search_games(query, page_size=10):
     Search for games by name.
     """
     api_key = current_app.config['RAWG_API_KEY']
-    url = f"{BASE_URL}/games?key={api_key}&search={query}&page_size={page_size}"
-    response = requests.get(url)
+    url = f"{BASE_URL}/games"
+    params = {"key": api_key, "search": query, "page_size": page_size}
+    response = http.get(url, params=params)
     response.raise_for_status()
     return response.json()['results']
@@ -0,0 +1,150 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+MAX_PREFIX = 12
+MIN_SIMILARITY = 0.3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text):
+    padded = "  " + " ".join(tokenize(text)) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory name index for the local game catalog.
+
+    Every word is indexed by its prefixes (up to MAX_PREFIX characters) so
+    typeahead queries resolve with a few set intersections. Names are also
+    indexed by trigram, which catches typos when no prefix matches.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self._names = {}
+        self._words = {}
+        self._grams = {}
+        self.prefixes = defaultdict(set)
+        self.trigram_postings = defaultdict(set)
+        self.loaded_until = None
+        self.last_refresh = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, name, doc):
+        with self._lock:
+            self.remove(doc_id)
+            self.docs[doc_id] = doc
+            self._names[doc_id] = name
+            self._words[doc_id] = words = tuple(tokenize(name))
+            for token in set(words):
+                for i in range(1, min(len(token), MAX_PREFIX) + 1):
+                    self.prefixes[token[:i]].add(doc_id)
+            grams = trigrams(name)
+            self._grams[doc_id] = len(grams)
+            for gram in grams:
+                self.trigram_postings[gram].add(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            name = self._names.pop(doc_id, None)
+            if name is None:
+                return
+            del self.docs[doc_id]
+            del self._grams[doc_id]
+            for token in set(self._words.pop(doc_id)):
+                for i in range(1, min(len(token), MAX_PREFIX) + 1):
+                    self._discard(self.prefixes, token[:i], doc_id)
+            for gram in trigrams(name):
+                self._discard(self.trigram_postings, gram, doc_id)
+
+    @staticmethod
+    def _discard(postings, key, doc_id):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(doc_id)
+            if not ids:
+                del postings[key]
+
+    def replace(self, other):
+        """
+        Take over other's contents in one step, so searches see either the
+        old index or the new one, never one that is half loaded.
+        """
+        with self._lock:
+            self.docs, self._names, self._words, self._grams = other.docs, other._names, other._words, other._grams
+            self.prefixes, self.trigram_postings = other.prefixes, other.trigram_postings
+            self.loaded_until = other.loaded_until
+            self.last_refresh = other.last_refresh
+
+    def clear(self):
+        with self._lock:
+            self.docs.clear()
+            self._names.clear()
+            self._words.clear()
+            self._grams.clear()
+            self.prefixes.clear()
+            self.trigram_postings.clear()
+            self.loaded_until = None
+            self.last_refresh = 0
+
+    def search(self, query, limit=10, min_similarity=MIN_SIMILARITY):
+        """
+        Return up to limit docs ranked best first. Every query word must
+        prefix-match a word of the name; if nothing does, fall back to
+        names with at least min_similarity trigram similarity.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            scored = self._prefix_candidates(query, tokens)
+            if not scored:
+                scored = self._trigram_candidates(query, min_similarity)
+            best = heapq.nlargest(limit, scored, key=lambda pair: pair[0])
+            return [self.docs[doc_id] for _, doc_id in best]
+
+    def _prefix_candidates(self, query, tokens):
+        postings = [self.prefixes.get(t[:MAX_PREFIX], set()) for t in tokens]
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:]) if postings[0] else set()
+
+        query = " ".join(tokens)
+        scored = []
+        for doc_id in candidates:
+            words = self._words[doc_id]
+            name = " ".join(words)
+            # Tokens longer than MAX_PREFIX were only matched on their start
+            if not all(any(w.startswith(t) for w in words) for t in tokens):
+                continue
+            score = sum(3 if t in words else 1 for t in tokens)
+            if name == query:
+                score += 10
+            elif name.startswith(query):
+                score += 5
+            # Prefer shorter names on ties ("Portal" before "Portal Stories: Mel")
+            scored.append((score - len(name) / 1000, doc_id))
+        return scored
+
+    def _trigram_candidates(self, query, min_similarity):
+        grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for doc_id in self.trigram_postings.get(gram, ()):
+                shared[doc_id] += 1
+        scored = []
+        for doc_id, count in shared.items():
+            similarity = count / (len(grams) + self._grams[doc_id] - count)
+            if similarity >= min_similarity:
+                scored.append((similarity, doc_id))
+        return scored
@@ -1,20 +1,44 @@
-import requests
+import logging
+import os
+import threading
 from flask import current_app
+from utils.cache import cache, SingleFlight
+from utils.http_client import http
 
-BASE_URL = "https://store.steampowered.com/api"
+logger = logging.getLogger("codecritical.upstream")
 
+# Overridable so benchmarks can point the app at a local fake
+BASE_URL = os.getenv("STEAM_API_URL", "https://store.steampowered.com/api")
+
+# Cache lifetimes per endpoint (seconds). The featured list rotates every few
+# minutes, while app details barely change during a day. The featured list
+# itself is fetched only by tasks.refresh_featured and stored in the
+# database; FEATURED_TTL bounds how long pages keep a rendered copy.
+FEATURED_TTL = 300
+DETAILS_TTL = 3600
+SEARCH_TTL = 600
+
+SEARCH_MAX_RESULTS = 25
+SEARCH_MAX_QUERY_LENGTH = 100
+
+PLATFORMS = (("windows", "Windows"), ("mac", "macOS"), ("linux", "Linux"))
+MAX_SCREENSHOTS = 4
+
+_search_flight = SingleFlight()
+
+@cache.memoize("steam:appdetails", ttl=DETAILS_TTL)
 def get_steam_game_details(appid):
     """
     Fetch detailed information for a single Steam game.
     Returns a dict with safe keys for template.
     """
-    url = f"https://store.steampowered.com/api/appdetails"
+    url = f"{BASE_URL}/appdetails"
     params = {
         "appids": appid,
         "cc": "us",
         "l": "en"
     }
-    response = requests.get(url, params=params)
+    response = http.get(url, params=params)
     response.raise_for_status()
     data = response.json()
 
@@ -33,7 +57,10 @@ def get_steam_game_details(appid):
         "name": name,
         "description": description,
         "original_release_date": release_date,
-        "image_url": image_url
+        "image_url": image_url,
+        "platforms": [label for key, label in PLATFORMS if game_data.get("platforms", {}).get(key)],
+        "genres": [g["description"] for g in game_data.get("genres", []) if g.get("description")],
+        "screenshots": [s["path_full"] for s in game_data.get("screenshots", [])[:MAX_SCREENSHOTS] if s.get("path_full")]
     }
 
 def get_featured_games():
@@ -41,8 +68,8 @@ def get_featured_games():
     Fetch featured games from Steam store.
     Returns list of dicts with keys: appid, name, image_url, discounted
     """
-    url = "https://store.steampowered.com/api/featuredcategories"
-    response = requests.get(url)
+    url = f"{BASE_URL}/featuredcategories"
+    response = http.get(url)
     response.raise_for_status()
     data = response.json()
 
@@ -71,4 +98,80 @@ def get_featured_games():
     return games
 
 
+def normalize_query(query):
+    """
+    Lowercase, collapse whitespace and bound the length so equivalent
+    keystrokes share one cache entry.
+    """
+    return " ".join(query.lower().split())[:SEARCH_MAX_QUERY_LENGTH]
+
+
+def _fetch_search(query):
+    url = f"{BASE_URL}/storesearch/"
+    params = {"term": query, "l": "english", "cc": "us"}
+    response = http.get(url, params=params)
+    response.raise_for_status()
+
+    results = []
+    for item in response.json().get("items", [])[:SEARCH_MAX_RESULTS]:
+        price = item.get("price")
+        results.append({
+            "name": item.get("name", "Unknown Game"),
+            "appid": item.get("id", ""),
+            "image": item.get("tiny_image") or "",
+            "price": price.get("final_formatted", "Free / Unknown") if price else "Free / Unknown"
+        })
+    return results
+
+
+def _load_search(query):
+    key = f"steam:search:{query}"
+    # Identical in-flight queries share one upstream request
+    loader = lambda: _search_flight.do(key, lambda: _fetch_search(query))
+    return cache.get_or_load(key, loader, SEARCH_TTL)
+
+
+def _matches(name, tokens):
+    words = name.lower().split()
+    return all(any(w.startswith(t) for w in words) for t in tokens)
+
+
+def _prefix_results(query):
+    """
+    Answer from the longest cached prefix of query, filtered down to names
+    that still match. Returns None if no prefix is cached.
+    """
+    tokens = query.split()
+    for end in range(len(query) - 1, 0, -1):
+        cached = cache.peek(f"steam:search:{query[:end].rstrip()}")
+        if cached is not None:
+            return [r for r in cached if _matches(r["name"], tokens)]
+    return None
+
+
+def search_store(query, limit=10):
+    """
+    Search the Steam store by name.
+    Returns (results, complete). complete is False when the results were
+    derived from a cached prefix while the exact query loads in the background.
+    """
+    query = normalize_query(query)
+    limit = max(1, min(int(limit), SEARCH_MAX_RESULTS))
+    if not query:
+        return [], True
+
+    if cache.peek(f"steam:search:{query}") is None:
+        partial = _prefix_results(query)
+        if partial is not None:
+            if not _search_flight.in_flight(f"steam:search:{query}"):
+                threading.Thread(target=_warm_search, args=(query,), daemon=True).start()
+            return partial[:limit], False
+
+    return _load_search(query)[:limit], True
+
 
+def _warm_search(query):
+    try:
+        _load_search(query)
+    except Exception as e:
+        logger.warning("Steam search warm-up error: %s", e)
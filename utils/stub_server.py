@@ -0,0 +1,99 @@
+"""
+Local stand-in for Steam/RAWG/GiantBomb so upstream code can be exercised
+offline, in tests and in benchmarks.
+
+    with StubServer() as stub:
+        stub.route("/api/appdetails", {"10": {"success": False}})
+        stub.route("/slow", {}, delay=2)
+        stub.route("/flaky", {}, status=503)
+        requests.get(stub.url + "/api/appdetails")
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class StubServer:
+    """
+    Threaded HTTP server answering GET requests from a route table. A route
+    is either a fixed (status, body, delay) response or a callable taking
+    the query dict and returning a body. Every request is recorded.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, path, body=None, status=200, delay=0, headers=None):
+        self.routes[path] = {"body": body, "status": status, "delay": delay, "headers": headers or {}}
+
+    def hits(self, path):
+        with self._lock:
+            return sum(1 for p, _ in self.requests if p == path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                with stub._lock:
+                    stub.requests.append((parts.path, query))
+
+                route = stub.routes.get(parts.path)
+                if route is None:
+                    self._send(404, {"error": "not found"})
+                    return
+                if route["delay"]:
+                    time.sleep(route["delay"])
+                body = route["body"]
+                if callable(body):
+                    body = body(query)
+                self._send(route["status"], body, route["headers"])
+
+            def _send(self, status, body, headers=None):
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,323 @@
+"""
+Write-behind buffer for user submissions (contact messages, reviews).
+
+Requests only validate and enqueue; a background thread commits whatever
+has accumulated every flush_interval seconds, or sooner once batch_size
+rows are waiting, as one transaction. Everything pending is flushed when
+the process exits (atexit, plus gunicorn's worker_exit hook).
+
+Rows that don't fit in the bounded buffer, or that can't be written while
+the database is unreachable, are appended to a spool file and replayed on
+the next flush. A worker claims the spool by renaming it to
+<spool>.<pid>.<token> and records how many of its lines are committed in a
+BatchJobState row, in the same transaction as the rows, so a replay cut
+short resumes where it stopped; files left by dead workers are taken over.
+A batch that fails for any other reason is retried row by row, and rows
+that still fail go to <spool>.dead instead of being retried forever.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import DateTime
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+logger = logging.getLogger("codecritical.writes")
+
+
+class WriteBehind:
+    # Model keeping replay progress per claimed spool file (name, last_id)
+    progress_model = "BatchJobState"
+
+    def __init__(self, db, batch_size=100, flush_interval=1.0, max_pending=10000, spool_path=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spool_path = spool_path
+        self.app = None
+        self._queue = queue.Queue(max_pending)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._thread = None
+        self._thread_stop = False
+        self._pid = None
+        atexit.register(self.close)
+
+    def init_app(self, app):
+        """
+        Read WRITE_BEHIND_* settings. An interval of 0 disables the
+        background thread, leaving flushes to flush()/close().
+        """
+        self.app = app
+        self.batch_size = app.config.get("WRITE_BEHIND_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get("WRITE_BEHIND_INTERVAL", self.flush_interval)
+        self.spool_path = app.config.get("WRITE_BEHIND_SPOOL") or os.path.join(
+            app.instance_path, "write_behind.ndjson")
+        max_pending = app.config.get("WRITE_BEHIND_MAX_PENDING", self.max_pending)
+        if max_pending != self.max_pending:
+            self.max_pending = max_pending
+            self._queue = queue.Queue(max_pending)
+        app.extensions["write_behind"] = self
+
+    def submit(self, model, values):
+        """
+        Queue a row for model. values must be complete; timestamps should be
+        set by the caller so they reflect submission time, not commit time.
+        """
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((model.__name__, values))
+        except queue.Full:
+            self._spool([(model.__name__, values)])
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """
+        Commit everything queued or spooled. Returns the number of rows
+        written.
+        """
+        with self._flush_lock, self.app.app_context():
+            written = 0
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                committed, left = self._write(batch)
+                written += committed
+                if left:
+                    self._spool(left)
+            for path in self._claim_spools():
+                replayed, finished = self._replay(path)
+                written += replayed
+                if not finished:
+                    break
+            return written
+
+    def close(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._wake.set()
+            self._thread_stop = True
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self.app is not None:
+            self.flush()
+
+    # ---- Internals ---- #
+    def _ensure_thread(self):
+        if not self.flush_interval:
+            return
+        # A forked worker doesn't inherit the parent's thread
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread_stop = False
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._thread_stop:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Write-behind flush failed: %s", e)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _models(self):
+        return {mapper.class_.__name__: mapper.class_ for mapper in self.db.Model.registry.mappers}
+
+    def _write(self, batch, token=None, done=0):
+        """
+        Commit batch; if that fails, retry it row by row and dead-letter the
+        rows that fail on their own. With token, progress through a spool
+        file (done lines before this batch) is committed along with the
+        rows. Returns (rows written, rows left because the database is
+        unreachable).
+        """
+        progress = (lambda lines: (token, done + lines)) if token else (lambda lines: None)
+        try:
+            self._commit(batch, progress(len(batch)))
+            return len(batch), []
+        except Exception as e:
+            self.db.session.rollback()
+            if _transient(e):
+                logger.error("Write-behind batch of %d failed, will retry: %s", len(batch), e)
+                return 0, batch
+            logger.error("Write-behind batch of %d failed, retrying row by row: %s", len(batch), e)
+
+        written = 0
+        for i, row in enumerate(batch):
+            try:
+                self._commit([row], progress(i + 1))
+                written += 1
+            except Exception as e:
+                self.db.session.rollback()
+                if _transient(e):
+                    return written, batch[i:]
+                self._dead_letter(row, e)
+                if token:
+                    self._commit([], progress(i + 1))
+        return written, []
+
+    def _commit(self, batch, progress=None):
+        """
+        Insert batch in one transaction, along with progress as
+        (spool token, lines done) when replaying a spool file.
+        """
+        models = self._models()
+        # ORM inserts so per-row hooks (rating summaries, page cache
+        # invalidation) still run, but in a single transaction
+        self.db.session.add_all(models[name](**values) for name, values in batch)
+        if progress is not None:
+            self._set_progress(*progress)
+        self.db.session.commit()
+
+    def _spool(self, batch):
+        lines = "".join(
+            json.dumps({"model": name, "values": values}, default=_encode) + "\n" for name, values in batch
+        )
+        self._append(self.spool_path, lines)
+
+    def _dead_letter(self, row, error):
+        name, values = row
+        logger.error("Write-behind dropped a %s row to %s.dead: %s", name, self.spool_path, error)
+        self._append(f"{self.spool_path}.dead", json.dumps(
+            {"model": name, "values": values, "error": repr(error)}, default=_encode) + "\n")
+
+    def _append(self, path, lines):
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ---- Spool replay ---- #
+    def _claim_spools(self):
+        """
+        Spool files this process should replay: the current spool, renamed
+        so no other worker replays it too, files it claimed earlier but
+        couldn't finish, and files claimed by workers that have died.
+        """
+        if not self.spool_path:
+            return []
+        pid = os.getpid()
+        with self._spool_lock:
+            try:
+                os.rename(self.spool_path, f"{self.spool_path}.{pid}.{uuid.uuid4().hex}")
+            except FileNotFoundError:
+                pass
+
+        claimed = []
+        for path in sorted(glob.glob(glob.escape(self.spool_path) + ".*")):
+            owner, _, token = path[len(self.spool_path) + 1:].partition(".")
+            if not owner.isdigit():
+                continue
+            if int(owner) != pid:
+                if _alive(int(owner)):
+                    continue
+                # Keeping the token keeps the progress already recorded
+                taken = f"{self.spool_path}.{pid}.{token or uuid.uuid4().hex}"
+                try:
+                    os.rename(path, taken)
+                except FileNotFoundError:
+                    # Another worker got there first
+                    continue
+                logger.warning("Write-behind took over %s from a dead worker", path)
+                path = taken
+            claimed.append(path)
+        return claimed
+
+    def _replay(self, path):
+        """
+        Commit a claimed spool file's rows, skipping the lines already
+        recorded as done. Returns (rows written, whether the file is
+        finished); an unreachable database leaves the rest for next time.
+        """
+        token = path.rsplit(".", 1)[1]
+        models = self._models()
+        written = 0
+        done = self._progress(token)
+        with open(path, encoding="utf-8") as f:
+            lines = islice((line for line in f if line.strip()), done, None)
+            while True:
+                records = [json.loads(line) for line in islice(lines, self.batch_size)]
+                if not records:
+                    break
+                batch = [(r["model"], _decode(models[r["model"]], r["values"])) for r in records]
+                committed, left = self._write(batch, token, done)
+                written += committed
+                if left:
+                    return written, False
+                done += len(batch)
+        os.remove(path)
+        self._clear_progress(token)
+        return written, True
+
+    def _progress(self, token):
+        state = self.db.session.get(self._models()[self.progress_model], f"write_behind:{token}")
+        return state.last_id if state else 0
+
+    def _set_progress(self, token, lines):
+        model = self._models()[self.progress_model]
+        name = f"write_behind:{token}"
+        state = self.db.session.get(model, name)
+        if state is None:
+            state = model(name=name, last_id=0)
+            self.db.session.add(state)
+        state.last_id = lines
+
+    def _clear_progress(self, token):
+        model = self._models()[self.progress_model]
+        self.db.session.query(model).filter_by(name=f"write_behind:{token}").delete()
+        self.db.session.commit()
+
+
+def _transient(error):
+    # Connection trouble or a locked database: the same rows may well
+    # succeed later. Anything else (constraints, bad values) won't.
+    return isinstance(error, (OperationalError, InterfaceError)) or getattr(error, "connection_invalidated", False)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't spool {type(value).__name__}")
+
+
+def _decode(model, values):
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime) and isinstance(values.get(column.name), str):
+            values[column.name] = datetime.fromisoformat(values[column.name])
+    return values